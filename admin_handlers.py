@@ -1,14 +1,27 @@
+import asyncio
+import html
 import logging
-from telegram import Update
+import time
+import tracemalloc
+from telegram import Update, InlineKeyboardMarkup
+from telegram.error import BadRequest
 from telegram.ext import ContextTypes, ConversationHandler
 from telegram.constants import ParseMode
 
 from config import *
 from data_manager import (get_player_data, get_secret_missions_data, save_player_data,
                           get_missions_data, save_missions_data, get_message_recipients,
-                          save_recipients_data)
-from utils import is_admin, get_player_status
+                          save_recipients_data, get_roster)
+from utils import is_admin, get_player_status, notify_players
 from keyboards import *
+from callback_codec import decode
+from message_log import read_page, player_thread, npc_thread
+import scenario
+import comm_policy
+import memory_report
+from loop_monitor import monitor as loop_monitor
+from roster_io import (PLAYER_FIELDS, build_import_plan, format_import_plan, apply_import_plan, export_csv,
+                       export_json, to_plain)
 
 logger = logging.getLogger(__name__)
 
@@ -54,19 +67,15 @@ async def admin_deactivate_player_start(update: Update, context: ContextTypes.DE
 async def process_player_action_selection(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.callback_query
     await query.answer()
-    action_type_from_cb = query.data.split("_")[0]
+    action_type_from_cb, args = decode(query.data)
     admin_markup = get_admin_panel_keyboard()
 
-    if query.data.endswith("_cancel"):
+    if action_type_from_cb.endswith("_cancel"):
         await query.edit_message_text("Action cancelled.")
         await query.message.reply_text("Admin Panel:", reply_markup=admin_markup)
         return ConversationHandler.END
 
-    try:
-        player_id = int(query.data.split("_")[-1])
-    except (IndexError, ValueError):
-        await query.edit_message_text("Invalid selection.")
-        return SELECT_PLAYER_FOR_ACTION
+    player_id = args[0]
 
     action = context.user_data.get('admin_action')
     if not action or action != action_type_from_cb:
@@ -137,16 +146,13 @@ async def set_player_status_select_player(update: Update, context: ContextTypes.
     query = update.callback_query
     await query.answer()
 
-    if query.data.endswith("_cancel"):
+    action, args = decode(query.data)
+    if action == "setstatus_cancel":
         await query.edit_message_text("Set status cancelled.")
         await query.message.reply_text("Admin Panel:", reply_markup=get_admin_panel_keyboard())
         return ConversationHandler.END
 
-    try:
-        player_id = int(query.data.split("_")[-1])
-    except (IndexError, ValueError):
-        await query.edit_message_text("Invalid selection.")
-        return SELECT_PLAYER_FOR_STATUS
+    player_id = args[0]
 
     player_data = get_player_data()
     if player_id not in player_data:
@@ -176,31 +182,18 @@ async def set_player_status_select_new_status(update: Update, context: ContextTy
         await query.message.reply_text("Admin Panel:", reply_markup=admin_markup)
         return ConversationHandler.END
 
-    if query.data.endswith("_cancel"):
+    action, args = decode(query.data)
+    if action == "setstatus_cancel":
         await query.edit_message_text("Set status cancelled.")
         await query.message.reply_text("Admin Panel:", reply_markup=admin_markup)
         return ConversationHandler.END
 
-    try:
-        parts = query.data.split("_")
-        new_status_encoded = "_".join(parts[2:])
-        selected_status = None
-
-        for s_val in VALID_PLAYER_STATUSES:
-            encoded_valid_s = s_val.replace('(', '').replace(')', '').replace(' ', '_').lower()
-            if encoded_valid_s == new_status_encoded:
-                selected_status = s_val
-                break
-
-        if not selected_status:
-            logger.error(f"Invalid status encoding '{new_status_encoded}' from callback '{query.data}'.")
-            await query.edit_message_text("Invalid status selected. Please try again.")
-            return SELECT_NEW_STATUS
-    except (IndexError, ValueError) as e:
-        logger.error(f"Error parsing status from cb: {query.data} - {e}")
-        await query.edit_message_text("Error processing. Start over.")
-        await query.message.reply_text("Admin Panel:", reply_markup=admin_markup)
-        return ConversationHandler.END
+    action_player_id, status_index = args
+    if action_player_id != player_id or not 0 <= status_index < len(VALID_PLAYER_STATUSES):
+        logger.error(f"Invalid status selection {args} for player {player_id}.")
+        await query.edit_message_text("Invalid status selected. Please try again.")
+        return SELECT_NEW_STATUS
+    selected_status = VALID_PLAYER_STATUSES[status_index]
 
     player_data[player_id]["status"] = selected_status
     if save_player_data():
@@ -234,16 +227,13 @@ async def secret_mission_select_player(update: Update, context: ContextTypes.DEF
     query = update.callback_query
     await query.answer()
 
-    if query.data.endswith("_cancel"):
+    action, args = decode(query.data)
+    if action == "secretmission_cancel":
         await query.edit_message_text("Set secret mission cancelled.")
         await query.message.reply_text("Admin Panel:", reply_markup=get_admin_panel_keyboard())
         return ConversationHandler.END
 
-    try:
-        player_id = int(query.data.split("_")[-1])
-    except (IndexError, ValueError):
-        await query.edit_message_text("Invalid selection.")
-        return SELECT_PLAYER_FOR_SECRET_MISSION
+    player_id = args[0]
 
     player_data = get_player_data()
     if player_id not in player_data:
@@ -278,23 +268,21 @@ async def secret_mission_choose_mission(update: Update, context: ContextTypes.DE
         await query.message.reply_text("Admin Panel:", reply_markup=admin_markup)
         return ConversationHandler.END
 
-    if query.data.endswith("_cancel_selection"):
+    action, args = decode(query.data)
+    if action == "secretmission_cancel":
         await query.edit_message_text("Set secret mission cancelled.")
         await query.message.reply_text("Admin Panel:", reply_markup=admin_markup)
         return ConversationHandler.END
 
-    if query.data == "secretmission_none":
+    if action == "secretmission_none":
         await query.edit_message_text("No secret missions defined. Action cancelled.")
         await query.message.reply_text("Admin Panel:", reply_markup=admin_markup)
         return ConversationHandler.END
 
     try:
-        parts = query.data.split("_")
-        action_player_id = int(parts[2])
-        mission_id_to_set = "_".join(parts[3:]) if len(parts) > 3 else "clear"
-
-        if len(parts) > 3 and parts[3] == "clear":
-            mission_id_to_set = "clear"
+        # Mission IDs travel as one argument, so IDs with underscores (or "clear") are unambiguous.
+        action_player_id = args[0]
+        mission_id_to_set = args[1] if action == "secretmission_set" else None
 
         if action_player_id != player_id:
             await query.edit_message_text("Player ID mismatch. Start over.")
@@ -303,7 +291,7 @@ async def secret_mission_choose_mission(update: Update, context: ContextTypes.DE
 
         p_name = player_data[player_id].get('character_name', player_id)
 
-        if mission_id_to_set == "clear":
+        if action == "secretmission_clear":
             player_data[player_id]['secret_mission_id'] = None
             if save_player_data():
                 await query.edit_message_text(f"Secret mission cleared for {p_name}.")
@@ -334,7 +322,7 @@ async def secret_mission_choose_mission(update: Update, context: ContextTypes.DE
                 await query.message.reply_text("Select new secret mission:", reply_markup=kb)
             return CHOOSE_SECRET_MISSION
     except Exception as e:
-        logger.error(f"Error processing secret mission selection: {e}. Data: {query.data}")
+        logger.error(f"Error processing secret mission selection: {e}. Data: {action}{args}")
         await query.edit_message_text("Error setting secret mission. Start over.")
 
     await query.message.reply_text("Admin Panel:", reply_markup=admin_markup)
@@ -343,6 +331,184 @@ async def secret_mission_choose_mission(update: Update, context: ContextTypes.DE
     return ConversationHandler.END
 
 
+# Bulk action handlers
+# Roster filters cycle in this order; keys are data_manager.player_matches_filter keys.
+ROSTER_FILTERS = [("all", "All"), ("active", "Active"), ("inactive", "Inactive"), ("secret", "Has secret mission")] + [
+    (f"status_{index}", status_val) for index, status_val in enumerate(VALID_PLAYER_STATUSES)]
+
+
+def _apply_bulk_change(player_ids: set, changes: dict) -> list[int] | None:
+    """Applies `changes` to the given players with a single save.
+
+    Returns the ids of players that actually changed, or None if saving failed
+    (in which case every player is rolled back).
+    """
+    player_data = get_player_data()
+    previous = {}
+    for pid in player_ids:
+        p_info = player_data.get(pid)
+        if p_info is None or all(p_info.get(field) == value for field, value in changes.items()):
+            continue
+        previous[pid] = {field: p_info.get(field) for field in changes}
+        p_info.update(changes)
+    if not previous:
+        return []
+    if not save_player_data():
+        for pid, old_values in previous.items():
+            player_data[pid].update(old_values)
+        return None
+    return sorted(previous)
+
+
+def _bulk_selection_view(context: ContextTypes.DEFAULT_TYPE, note: str = "") -> tuple[str, InlineKeyboardMarkup]:
+    bulk = context.user_data['bulk']
+    filter_key, filter_label = ROSTER_FILTERS[bulk['filter']]
+    player_data = get_player_data()
+    shown = [(pid, player_data[pid]) for pid in get_roster(filter_key)]
+    bulk['shown'] = [pid for pid, _ in shown]
+    bulk['selected'] &= set(player_data)
+    text = (f"{note}\n\n" if note else "") + (
+        f"Bulk actions. Selected: {len(bulk['selected'])}. Shown: {len(shown)} ({filter_label}).\n"
+        f"Tap players to select them, then choose an action.")
+    return text, get_bulk_selection_keyboard(shown, bulk['selected'], filter_label, bulk['page'])
+
+
+async def _show_bulk_selection(query, context: ContextTypes.DEFAULT_TYPE, note: str = "") -> int:
+    text, keyboard = _bulk_selection_view(context, note)
+    try:
+        await query.edit_message_text(text, reply_markup=keyboard)
+    except BadRequest as e:
+        if "not modified" not in str(e).lower():
+            raise
+    return BULK_SELECT_PLAYERS
+
+
+async def admin_bulk_start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    if not is_admin(update.effective_user.id):
+        await update.message.reply_text("No permission.")
+        return ConversationHandler.END
+
+    if not get_player_data():
+        await update.message.reply_text("No players found.")
+        return ConversationHandler.END
+
+    context.user_data['bulk'] = {"selected": set(), "filter": 0, "page": 0, "shown": []}
+    text, keyboard = _bulk_selection_view(context)
+    await update.message.reply_text(text, reply_markup=keyboard)
+    return BULK_SELECT_PLAYERS
+
+
+async def bulk_select_players(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    query = update.callback_query
+    await query.answer()
+    bulk = context.user_data.get('bulk')
+    action, args = decode(query.data)
+
+    if bulk is None or action == "bulk_cancel":
+        context.user_data.pop('bulk', None)
+        await query.edit_message_text("Bulk action cancelled." if bulk is not None else "Bulk session expired. Start over.")
+        await query.message.reply_text("Admin Panel:", reply_markup=get_admin_panel_keyboard())
+        return ConversationHandler.END
+
+    if action == "bulk_toggle":
+        bulk['selected'] ^= {args[0]}
+    elif action == "bulk_page":
+        bulk['page'] = args[0]
+    elif action == "bulk_filter":
+        bulk['filter'] = (bulk['filter'] + 1) % len(ROSTER_FILTERS)
+        bulk['page'] = 0
+    elif action == "bulk_all":
+        bulk['selected'] |= set(bulk['shown'])
+    elif action == "bulk_none":
+        bulk['selected'].clear()
+    elif action == "bulk_action":
+        action = args[0]
+        if not bulk['selected']:
+            return await _show_bulk_selection(query, context, "Select at least one player first.")
+        if action == "status":
+            await query.edit_message_text(f"Set status for {len(bulk['selected'])} players:",
+                                          reply_markup=get_bulk_status_keyboard())
+            return BULK_CHOOSE_STATUS
+        if action == "secret":
+            await query.edit_message_text(f"Set secret mission for {len(bulk['selected'])} players:",
+                                          reply_markup=get_bulk_secret_mission_keyboard())
+            return BULK_CHOOSE_SECRET_MISSION
+        if action in ("activate", "deactivate"):
+            changed = _apply_bulk_change(bulk['selected'], {"is_active": action == "activate"})
+            if changed is None:
+                return await _show_bulk_selection(query, context, "Error saving data. Nothing was changed.")
+            notice = ("You have been activated for the mission. Godspeed!" if action == "activate"
+                      else "Your account has been deactivated by the Game Master.")
+            delivered = await notify_players(context.bot, changed, notice)
+            return await _show_bulk_selection(
+                query, context, f"{action.capitalize()}d {len(changed)} players ({len(bulk['selected']) - len(changed)} "
+                                f"already {action}d). Notified: {delivered}.")
+    return await _show_bulk_selection(query, context)
+
+
+async def bulk_choose_status(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    query = update.callback_query
+    await query.answer()
+    bulk = context.user_data.get('bulk')
+    if bulk is None:
+        await query.edit_message_text("Bulk session expired. Start over.")
+        return ConversationHandler.END
+    action, args = decode(query.data)
+    if action == "bulkstatus_back":
+        return await _show_bulk_selection(query, context)
+
+    try:
+        selected_status = VALID_PLAYER_STATUSES[args[0]]
+    except IndexError:
+        logger.error(f"Invalid bulk status selection {args}.")
+        return await _show_bulk_selection(query, context, "Invalid status selected.")
+
+    changed = _apply_bulk_change(bulk['selected'], {"status": selected_status})
+    if changed is None:
+        return await _show_bulk_selection(query, context, "Error saving status. Nothing was changed.")
+    return await _show_bulk_selection(query, context, f"Status set to {selected_status} for {len(changed)} players.")
+
+
+async def bulk_choose_secret_mission(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    query = update.callback_query
+    await query.answer()
+    bulk = context.user_data.get('bulk')
+    if bulk is None:
+        await query.edit_message_text("Bulk session expired. Start over.")
+        return ConversationHandler.END
+    action, args = decode(query.data)
+    if action == "bulksm_back":
+        return await _show_bulk_selection(query, context)
+
+    secret_missions_data = get_secret_missions_data()
+    if action == "bulksm_clear":
+        mission_id = None
+    else:
+        mission_id = args[0]
+        if mission_id not in secret_missions_data:
+            return await _show_bulk_selection(query, context, f"Invalid secret mission ID: {mission_id}.")
+
+    changed = _apply_bulk_change(bulk['selected'], {"secret_mission_id": mission_id})
+    if changed is None:
+        return await _show_bulk_selection(query, context, "Error saving player data. Nothing was changed.")
+    if mission_id is None:
+        delivered = await notify_players(context.bot, changed, "Your secret mission has been cleared by the Game Master.")
+        note = f"Secret mission cleared for {len(changed)} players. Notified: {delivered}."
+    else:
+        sm_title = secret_missions_data[mission_id].get("title", mission_id)
+        delivered = await notify_players(context.bot, changed,
+                                         f"You have a new secret mission: **{sm_title}**. Check `/character` for details.",
+                                         parse_mode=ParseMode.MARKDOWN)
+        note = f"Secret mission '{sm_title}' set for {len(changed)} players. Notified: {delivered}."
+    return await _show_bulk_selection(query, context, note)
+
+
+async def bulk_cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    context.user_data.pop('bulk', None)
+    await update.message.reply_text("Bulk action cancelled.", reply_markup=get_admin_panel_keyboard())
+    return ConversationHandler.END
+
+
 # Broadcast handlers
 async def admin_broadcast_start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     if not is_admin(update.effective_user.id):
@@ -356,14 +522,14 @@ async def admin_broadcast_start(update: Update, context: ContextTypes.DEFAULT_TY
 async def broadcast_choose_target(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.callback_query
     await query.answer()
-    target = query.data.split("_")[-1]
+    action, args = decode(query.data)
 
-    if target == "cancel":
+    if action == "broadcast_cancel":
         await query.edit_message_text("Broadcast cancelled.")
         await query.message.reply_text("Admin Panel:", reply_markup=get_admin_panel_keyboard())
         return ConversationHandler.END
 
-    context.user_data['broadcast_target'] = target
+    context.user_data['broadcast_target'] = args[0]
     await query.edit_message_text("Enter sender name (or 'default' for Game Master):")
     return TYPE_BROADCAST_SENDER_NAME
 
@@ -391,7 +557,7 @@ async def broadcast_confirm_send(update: Update, context: ContextTypes.DEFAULT_T
     await query.answer()
     admin_markup = get_admin_panel_keyboard()
 
-    if query.data == "broadcast_confirm_no":
+    if decode(query.data)[0] == "broadcast_confirm_no":
         await query.edit_message_text("Broadcast cancelled.")
         await query.message.reply_text("Admin Panel:", reply_markup=admin_markup)
         return ConversationHandler.END
@@ -447,16 +613,13 @@ async def direct_message_select_player(update: Update, context: ContextTypes.DEF
     query = update.callback_query
     await query.answer()
 
-    if query.data.endswith("_cancel"):
+    action, args = decode(query.data)
+    if action == "dmselect_cancel":
         await query.edit_message_text("DM cancelled.")
         await query.message.reply_text("Admin Panel:", reply_markup=get_admin_panel_keyboard())
         return ConversationHandler.END
 
-    try:
-        player_id = int(query.data.split("_")[-1])
-    except (IndexError, ValueError):
-        await query.edit_message_text("Invalid selection.")
-        return SELECT_DM_PLAYER
+    player_id = args[0]
 
     player_data = get_player_data()
     if player_id not in player_data:
@@ -492,7 +655,7 @@ async def direct_message_confirm_send(update: Update, context: ContextTypes.DEFA
     await query.answer()
     admin_markup = get_admin_panel_keyboard()
 
-    if query.data == "dm_confirm_no":
+    if decode(query.data)[0] == "dm_confirm_no":
         await query.edit_message_text("DM cancelled.")
         await query.message.reply_text("Admin Panel:", reply_markup=admin_markup)
         return ConversationHandler.END
@@ -521,44 +684,57 @@ async def direct_message_confirm_send(update: Update, context: ContextTypes.DEFA
 
 
 # List players command
+def _roster_page_view(filter_index: int, page: int) -> tuple[str, InlineKeyboardMarkup]:
+    filter_key, filter_label = ROSTER_FILTERS[filter_index]
+    player_data = get_player_data()
+    secret_missions_data = get_secret_missions_data()
+    roster = get_roster(filter_key)
+    pages = max(1, -(-len(roster) // ROSTER_PAGE_SIZE))
+    page = min(max(page, 0), pages - 1)
+
+    entries = [f"<b>Player List</b> ({filter_label}: {len(roster)} of {len(player_data)}), page {page + 1}/{pages}\n"]
+    for pid in roster[page * ROSTER_PAGE_SIZE:(page + 1) * ROSTER_PAGE_SIZE]:
+        p_info = player_data[pid]
+        act_stat = "Active" if p_info.get("is_active") else "Inactive"
+        game_stat = p_info.get("status", STATUS_UNDEFINED)
+        sm_id = p_info.get("secret_mission_id")
+        sm_title = secret_missions_data.get(sm_id, {}).get("title", "None") if sm_id else "None"
+        entries.append(f"- <b>{html.escape(str(p_info.get('character_name', 'N/A')))}</b> (ID: <code>{pid}</code>)\n"
+                       f"  Act: {act_stat}, Status: {html.escape(str(game_stat))}\n"
+                       f"  SM: {html.escape(sm_title[:25])}")
+    if not roster:
+        entries.append("No players match this filter.")
+    return "\n".join(entries), get_roster_page_keyboard(filter_index, filter_label, page, pages, len(ROSTER_FILTERS))
+
+
 async def admin_list_players_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     if not is_admin(update.effective_user.id):
         await update.message.reply_text("No permission.")
         return
 
-    player_data = get_player_data()
-    secret_missions_data = get_secret_missions_data()
-
-    if not player_data:
+    if not get_player_data():
         await update.message.reply_text("Player list empty.")
         return
 
-    msg_parts = ["**Player List:**\n"]
-    sorted_players = sorted(player_data.items(), key=lambda item: item[1].get('character_name', ''))
+    text, keyboard = _roster_page_view(0, 0)
+    await update.message.reply_text(text, parse_mode=ParseMode.HTML, reply_markup=keyboard)
 
-    for pid, pInf in sorted_players:
-        act_stat = "Active" if pInf.get("is_active") else "Inactive"
-        game_stat = pInf.get("status", STATUS_UNDEFINED)
-        sm_id = pInf.get("secret_mission_id")
-        sm_title = secret_missions_data.get(sm_id, {}).get("title", "None") if sm_id else "None"
-        msg_parts.append(
-            f"- **{pInf.get('character_name', 'N/A')}** (ID: `{pid}`)\n  Act: {act_stat}, Status: {game_stat}\n  SM: {sm_title[:25]}"
-        )
 
-    full_msg = "\n".join(msg_parts)
+async def roster_page_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    query = update.callback_query
+    if not is_admin(update.effective_user.id):
+        await query.answer("No permission.")
+        return
+    await query.answer()
 
-    if len(full_msg) > 4096:
-        current_chunk = ""
-        for part in msg_parts:
-            if len(current_chunk) + len(part) > 4090:
-                await update.message.reply_text(current_chunk, parse_mode=ParseMode.MARKDOWN)
-                current_chunk = part
-            else:
-                current_chunk += "\n" + part
-        if current_chunk:
-            await update.message.reply_text(current_chunk, parse_mode=ParseMode.MARKDOWN)
-    else:
-        await update.message.reply_text(full_msg, parse_mode=ParseMode.MARKDOWN)
+    # Pressing the page counter re-renders the current page
+    filter_index, page = decode(query.data)[1]
+    text, keyboard = _roster_page_view(filter_index % len(ROSTER_FILTERS), page)
+    try:
+        await query.edit_message_text(text, parse_mode=ParseMode.HTML, reply_markup=keyboard)
+    except BadRequest as e:
+        if "not modified" not in str(e).lower():
+            raise
 
 
 # Update mission command
@@ -731,6 +907,302 @@ async def admin_recipients_command(update: Update, context: ContextTypes.DEFAULT
         await update.message.reply_text("Invalid action. Use 'add', 'remove', or 'list'.")
 
 
+# Import/export handlers
+def _content_snapshot() -> tuple[dict, dict, dict]:
+    # Copies taken on the event loop, so worker threads never see data mid-update.
+    players = {pid: dict(p_info) for pid, p_info in get_player_data().items()}
+    return players, to_plain(get_missions_data()), to_plain(get_secret_missions_data())
+
+
+async def admin_import_start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    if not is_admin(update.effective_user.id):
+        await update.message.reply_text("No permission.")
+        return ConversationHandler.END
+
+    await update.message.reply_text(
+        "Send the file to import:\n"
+        "- CSV: roster, one player per row with a telegram_user_id column plus any of "
+        f"{', '.join(PLAYER_FIELDS)}. Empty cells are left unchanged.\n"
+        "- JSON: a list of players, or an object with players, missions and/or secret_missions "
+        "(the /admin_export format).\n"
+        "Send /cancel to abort.")
+    return IMPORT_WAIT_FILE
+
+
+async def import_receive_file(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    document = update.message.document
+    if document.file_size and document.file_size > IMPORT_MAX_BYTES:
+        await update.message.reply_text(f"File too large (limit {IMPORT_MAX_BYTES // 1024} KB).")
+        return IMPORT_WAIT_FILE
+
+    telegram_file = await document.get_file()
+    data = bytes(await telegram_file.download_as_bytearray())
+    players, missions, secret_missions = _content_snapshot()
+    plan = await asyncio.to_thread(build_import_plan, document.file_name, data, players, missions, secret_missions)
+
+    if (plan.missions or plan.secret_missions) and USE_CONTENT_SNAPSHOT:
+        plan.error("Missions are served from the content snapshot; edit the mission files and recompile instead.")
+    summary = format_import_plan(plan, players)
+    if plan.errors:
+        await update.message.reply_text(summary + "\n\nFix the file and send it again, or /cancel.")
+        return IMPORT_WAIT_FILE
+    if plan.empty:
+        await update.message.reply_text(summary, reply_markup=get_admin_panel_keyboard())
+        return ConversationHandler.END
+
+    context.user_data['import_plan'] = plan
+    await update.message.reply_text(summary, reply_markup=get_confirmation_keyboard("import_confirm_yes",
+                                                                                     "import_confirm_no"))
+    return IMPORT_CONFIRM
+
+
+async def import_confirm(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    query = update.callback_query
+    await query.answer()
+    admin_markup = get_admin_panel_keyboard()
+    plan = context.user_data.pop('import_plan', None)
+
+    if decode(query.data)[0] == "import_confirm_no" or plan is None:
+        await query.edit_message_text("Import cancelled." if plan else "Import data missing. Start over.")
+    elif apply_import_plan(plan):
+        await query.edit_message_text(
+            f"Import applied: {len(plan.player_changes)} players, {len(plan.missions)} missions, "
+            f"{len(plan.secret_missions)} secret missions.")
+    else:
+        await query.edit_message_text("Error saving data. Nothing was imported.")
+
+    await query.message.reply_text("Admin Panel:", reply_markup=admin_markup)
+    return ConversationHandler.END
+
+
+async def import_cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    context.user_data.pop('import_plan', None)
+    await update.message.reply_text("Import cancelled.", reply_markup=get_admin_panel_keyboard())
+    return ConversationHandler.END
+
+
+async def admin_export_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    if not is_admin(update.effective_user.id):
+        await update.message.reply_text("No permission.")
+        return
+
+    export_format = context.args[0].lower() if context.args else "json"
+    if export_format not in ("json", "csv"):
+        await update.message.reply_text("Usage: /admin_export [json|csv]\njson: roster, missions and secret missions. "
+                                        "csv: roster only.")
+        return
+
+    players, missions, secret_missions = _content_snapshot()
+    if export_format == "csv":
+        data = await asyncio.to_thread(export_csv, players)
+        caption = f"Roster: {len(players)} players."
+    else:
+        data = await asyncio.to_thread(export_json, players, missions, secret_missions)
+        caption = f"Roster: {len(players)} players, {len(missions)} missions, {len(secret_missions)} secret missions."
+    file_name = f"eventide_export_{time.strftime('%Y%m%d_%H%M%S')}.{export_format}"
+    await update.message.reply_document(document=data, filename=file_name, caption=caption)
+
+
+# Message history commands
+HISTORY_TEXT_LIMIT = 300
+
+
+def _split_page_arg(args: list[str]) -> tuple[list[str], int | None]:
+    if len(args) > 1 and args[-1].isdigit():
+        return args[:-1], int(args[-1])
+    return args, None
+
+
+def format_history_page(title: str, records: list[dict], page: int, pages: int) -> str:
+    lines = [f"{title} (page {page}/{pages}, newest page first)"]
+    for record in records:
+        sent_at = time.strftime("%Y-%m-%d %H:%M", time.localtime(record["ts"]))
+        text = record["text"]
+        if len(text) > HISTORY_TEXT_LIMIT:
+            text = text[:HISTORY_TEXT_LIMIT - 1] + "…"
+        lines.append(f"\n[{sent_at}] {record['sender_name']} (ID:{record['sender_id']}, {record['sender_status']}) "
+                     f"→ {record['recipient_name']}:\n{text}")
+    return "\n".join(lines)
+
+
+async def _reply_history(update: Update, thread: str, title: str, page: int | None) -> None:
+    records, pages = read_page(thread, page or 1)
+    if not records:
+        if page and page > 1:
+            await update.message.reply_text(f"{title}: page {page} does not exist (pages: {pages}).")
+        else:
+            await update.message.reply_text(f"{title}: no messages.")
+        return
+    await update.message.reply_text(format_history_page(title, records, page or 1, pages))
+
+
+async def admin_history_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    if not is_admin(update.effective_user.id):
+        await update.message.reply_text("No permission.")
+        return
+
+    args, page = _split_page_arg(context.args)
+    if not args:
+        await update.message.reply_text("Usage: /admin_history <player_ID or character name> [page]")
+        return
+
+    player_data = get_player_data()
+    target = " ".join(args)
+    pid = int(target) if target.isdigit() else None
+    if pid is None:
+        for candidate_id, p_info in player_data.items():
+            if p_info.get("character_name", "").casefold() == target.casefold():
+                pid = candidate_id
+                break
+    if pid is None:
+        await update.message.reply_text(f"Player '{target}' not found.")
+        return
+
+    name = player_data.get(pid, {}).get("character_name", pid)
+    await _reply_history(update, player_thread(pid), f"History of {name}", page)
+
+
+async def admin_history_npc_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    if not is_admin(update.effective_user.id):
+        await update.message.reply_text("No permission.")
+        return
+
+    args, page = _split_page_arg(context.args)
+    if not args:
+        await update.message.reply_text("Usage: /admin_history_npc <NPC name or its beginning> [page]")
+        return
+
+    # A unique prefix of a current recipient is enough; removed NPCs still answer to their full name.
+    name = " ".join(args)
+    matches = [r for r in get_message_recipients() if r.casefold().startswith(name.casefold())]
+    if len(matches) == 1:
+        name = matches[0]
+    elif len(matches) > 1 and name not in matches:
+        await update.message.reply_text("Several recipients match:\n" + "\n".join(f"- {r}" for r in matches))
+        return
+
+    await _reply_history(update, npc_thread(name), f"Messages to {name}", page)
+
+
+def format_scenario_status() -> str:
+    sc = scenario.scenario
+    if sc.started_at is None:
+        state = "not started"
+    else:
+        elapsed = int(time.time() - sc.started_at)
+        state = (f"{'running' if sc.running else 'stopped'}, started "
+                 f"{elapsed // 3600}:{elapsed % 3600 // 60:02d}:{elapsed % 60:02d} ago")
+    lines = [f"🎬 Scenario: {state}",
+             f"Events: {len(sc.events)} loaded, {len(sc.fired)} fired, {len(sc.skipped)} skipped, "
+             f"{sc.pending_count} scheduled"]
+    upcoming = sc.pending()
+    if upcoming:
+        lines.append("\nNext:")
+        now = time.time()
+        for due, event_id in upcoming:
+            lines.append(f"- {event_id} ({sc.events[event_id]['action']}) in {max(0, int(due - now))}s")
+    return "\n".join(lines)
+
+
+async def admin_scenario_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    if not is_admin(update.effective_user.id):
+        await update.message.reply_text("No permission.")
+        return
+
+    sub = context.args[0].lower() if context.args else "status"
+    if sub == "load":
+        errors = scenario.scenario.load_events()
+        if errors:
+            await update.message.reply_text("Scenario file rejected:\n" + "\n".join(errors[:20]))
+            return
+        scenario.scenario.rebuild_heap()
+        scenario.scenario.arm(context.application)
+    elif sub == "start":
+        errors = scenario.start_scenario(context.application)
+        if errors:
+            await update.message.reply_text("Scenario not started:\n" + "\n".join(errors[:20]))
+            return
+    elif sub == "stop":
+        scenario.stop_scenario(context.application)
+    elif sub == "reset":
+        scenario.reset_scenario(context.application)
+    elif sub != "status":
+        await update.message.reply_text("Usage: /admin_scenario [status|load|start|stop|reset]")
+        return
+    await update.message.reply_text(format_scenario_status())
+
+
+async def admin_policy_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    if not is_admin(update.effective_user.id):
+        await update.message.reply_text("No permission.")
+        return
+
+    sub = context.args[0].lower() if context.args else "show"
+    if sub == "reload":
+        errors = comm_policy.load_policy()
+        if errors:
+            await update.message.reply_text("Policy not reloaded, the current one stays active:\n" + "\n".join(errors[:20]))
+            return
+    elif sub != "show":
+        await update.message.reply_text("Usage: /admin_policy [show|reload]")
+        return
+    await update.message.reply_text(comm_policy.format_policy())
+
+
+async def admin_memory_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    if not is_admin(update.effective_user.id):
+        await update.message.reply_text("No permission.")
+        return
+
+    sub = context.args[0].lower() if context.args else "report"
+    stamp = time.strftime('%Y%m%d_%H%M%S')
+    if sub == "start":
+        started = memory_report.start_tracing()
+        await update.message.reply_text(
+            "Allocation tracing started. Use /admin_memory snapshot now and /admin_memory diff later."
+            if started else "Allocation tracing is already on.")
+    elif sub == "stop":
+        memory_report.stop_tracing()
+        await update.message.reply_text("Allocation tracing stopped, snapshots dropped.")
+    elif sub in ("snapshot", "diff"):
+        if not tracemalloc.is_tracing():
+            await update.message.reply_text("Allocation tracing is off. Start it with /admin_memory start.")
+            return
+        snapshot = await asyncio.to_thread(memory_report.take_snapshot)
+        if sub == "snapshot":
+            text = await asyncio.to_thread(memory_report.format_top, snapshot)
+        elif len(memory_report.snapshots) < 2:
+            await update.message.reply_text("First snapshot taken. Run /admin_memory diff again later to compare.")
+            return
+        else:
+            text = await asyncio.to_thread(memory_report.format_diff)
+        caption = await asyncio.to_thread(memory_report.summary, context.application)
+        await update.message.reply_document(document=text.encode("utf-8"), filename=f"memory_{sub}_{stamp}.txt",
+                                            caption=caption)
+    elif sub == "report":
+        # Deep sizes walk every player and cached page, so the report is built off the event loop
+        report = await asyncio.to_thread(memory_report.build_report, context.application)
+        caption = await asyncio.to_thread(memory_report.summary, context.application)
+        await update.message.reply_document(document=report.encode("utf-8"), filename=f"memory_report_{stamp}.txt",
+                                            caption=caption)
+    else:
+        await update.message.reply_text("Usage: /admin_memory [report|start|stop|snapshot|diff]")
+
+
+async def admin_loop_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    if not is_admin(update.effective_user.id):
+        await update.message.reply_text("No permission.")
+        return
+
+    sub = context.args[0].lower() if context.args else "show"
+    if sub == "reset":
+        loop_monitor.reset()
+    elif sub != "show":
+        await update.message.reply_text("Usage: /admin_loop [show|reset]")
+        return
+    await update.message.reply_text(loop_monitor.format_report())
+
+
 # Cancel admin action
 async def cancel_admin_action(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     query = update.callback_query
@@ -0,0 +1,96 @@
+import asyncio
+import logging
+import os
+import pathlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from telegram import InputFile
+
+from config import *
+
+logger = logging.getLogger(__name__)
+
+# (path, mtime_ns) -> bytes, least recently used first. A file edited on disk gets a new
+# mtime and therefore a new key; the stale version ages out of the LRU.
+_cache = OrderedDict()
+_cache_bytes = 0
+# Reads in flight, so concurrent requests for the same file share one read
+_pending = {}
+_executor = ThreadPoolExecutor(max_workers=ASSET_READ_WORKERS, thread_name_prefix="assets")
+
+stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def resolve_local_path(image_url: str | None) -> str | None:
+    """Absolute path for a local image reference such as "./assets/x.png"; None for URLs and empty values."""
+    if not image_url or image_url.startswith("http"):
+        return None
+    return os.path.join(BASE_DIR, image_url.lstrip("./"))
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _store(key: tuple, data: bytes) -> None:
+    global _cache_bytes
+    if len(data) > ASSET_CACHE_MAX_BYTES:
+        return
+    _cache[key] = data
+    _cache_bytes += len(data)
+    while _cache_bytes > ASSET_CACHE_MAX_BYTES:
+        _, evicted = _cache.popitem(last=False)
+        _cache_bytes -= len(evicted)
+        stats["evictions"] += 1
+
+
+async def load_asset(path: str) -> bytes | None:
+    """File contents from the cache, or read in the asset thread pool. None if the file does not exist."""
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    key = (path, mtime)
+    data = _cache.get(key)
+    if data is not None:
+        _cache.move_to_end(key)
+        stats["hits"] += 1
+        return data
+
+    future = _pending.get(key)
+    if future is None:
+        stats["misses"] += 1
+        future = asyncio.get_running_loop().run_in_executor(_executor, _read_file, path)
+        _pending[key] = future
+        try:
+            data = await future
+        except FileNotFoundError:
+            return None
+        finally:
+            del _pending[key]
+        _store(key, data)
+        return data
+    try:
+        return await future
+    except FileNotFoundError:
+        return None
+
+
+def local_file_uri(path: str) -> str:
+    """file:// URI of a file under BASE_DIR as the self-hosted Bot API server sees it."""
+    return pathlib.Path(BOT_API_LOCAL_BASE_DIR, os.path.relpath(path, BASE_DIR)).as_uri()
+
+
+async def load_input_file(path: str) -> InputFile | str | None:
+    """An upload-ready InputFile wrapping the cached bytes (no copy), or None if the file does not exist.
+
+    In BOT_API_LOCAL_MODE the file is not read at all: the server gets its file:// URI and reads it itself.
+    """
+    if BOT_API_LOCAL_MODE:
+        return local_file_uri(path) if os.path.isfile(path) else None
+    data = await load_asset(path)
+    if data is None:
+        return None
+    return InputFile(data, filename=os.path.basename(path))
@@ -0,0 +1,555 @@
+import argparse
+import asyncio
+import glob
+import logging
+import os
+import tempfile
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+import codec
+from callback_codec import encode
+
+
+def make_players(count: int) -> list[dict]:
+    players = []
+    for i in range(count):
+        pid = 100000000 + i
+        players.append({
+            "telegram_user_id": pid,
+            "character_name": f"Игрок {i} / Player {i}",
+            "character_role": "Инфильтратор",
+            "character_bio": "Родился на Марсе, вырос на орбитальной станции. " * 3,
+            "character_image_url": f"./assets/character/profile/player_profile_{i % 5 + 1}.png",
+            "character_image_file_id": None,
+            "is_active": i % 3 != 0,
+            "status": "Active (on mission)",
+            "secret_mission_id": "sm_elli_override" if i % 7 == 0 else None,
+            "current_mission_id": "default_mission",
+            "ver": "1.0.0"
+        })
+    return players
+
+
+def _best_of(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_codec(sizes: list[int], repeat: int) -> None:
+    backends = ["json"]
+    if codec.orjson is not None:
+        backends.append("orjson")
+    if codec.msgspec is not None:
+        backends.append("msgspec")
+
+    print(f"{'players':>8} {'backend':>8} {'format':>8} {'size KB':>9} {'save ms':>9} {'load ms':>9}")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "player_data.json")
+        for size in sizes:
+            players = make_players(size)
+            for backend in backends:
+                for fmt in codec.VALID_FORMATS:
+                    save_time = _best_of(lambda: codec.write_json(path, players, fmt, backend), repeat)
+                    load_time = _best_of(lambda: codec.read_json(path, backend), repeat)
+                    size_kb = os.path.getsize(path) / 1024
+                    print(f"{size:>8} {backend:>8} {fmt:>8} {size_kb:>9.0f} "
+                          f"{save_time * 1000:>9.1f} {load_time * 1000:>9.1f}")
+
+
+# --- FAKE BOT API ---
+# Stand-ins that record Bot API calls so handler code can be driven without network access.
+BENCH_USER_ID = 1
+
+
+class FakeBot:
+    def __init__(self):
+        self.calls = Counter()
+        self.keyboard_message = None
+        self._file_counter = 0
+        self._message_counter = 0
+
+    def _new_message(self, photo: bool, reply_markup=None) -> "FakeMessage":
+        message = FakeMessage(self, photo)
+        if reply_markup is not None:
+            self.keyboard_message = message
+        return message
+
+    def new_photo(self) -> list:
+        self._file_counter += 1
+        return [SimpleNamespace(file_id=f"fake-file-{self._file_counter}")]
+
+    async def send_message(self, chat_id, text, reply_markup=None, **kwargs):
+        self.calls["sendMessage"] += 1
+        return self._new_message(False, reply_markup)
+
+    async def send_photo(self, chat_id, photo, reply_markup=None, **kwargs):
+        self.calls["sendPhoto"] += 1
+        return self._new_message(True, reply_markup)
+
+    async def send_media_group(self, chat_id, media, **kwargs):
+        self.calls["sendMediaGroup"] += 1
+        return [self._new_message(True) for _ in media]
+
+    async def delete_messages(self, chat_id, message_ids, **kwargs):
+        self.calls["deleteMessages"] += 1
+        return True
+
+
+class FakeMessage:
+    chat_id = BENCH_USER_ID
+
+    def __init__(self, bot: FakeBot, photo: bool):
+        self.bot = bot
+        bot._message_counter += 1
+        self.message_id = bot._message_counter
+        self.photo = bot.new_photo() if photo else []
+
+    async def delete(self):
+        self.bot.calls["deleteMessage"] += 1
+        return True
+
+    async def reply_text(self, text, reply_markup=None, **kwargs):
+        return await self.bot.send_message(self.chat_id, text, reply_markup=reply_markup)
+
+
+class FakeCallbackQuery:
+    def __init__(self, bot: FakeBot, data: str, message: FakeMessage):
+        self.bot = bot
+        self.data = data
+        self.message = message
+        self.from_user = SimpleNamespace(id=BENCH_USER_ID)
+
+    async def answer(self, *args, **kwargs):
+        self.bot.calls["answerCallbackQuery"] += 1
+        return True
+
+    async def edit_message_text(self, text, reply_markup=None, **kwargs):
+        self.bot.calls["editMessageText"] += 1
+        return self.message
+
+    async def edit_message_media(self, media, reply_markup=None, **kwargs):
+        from telegram.error import BadRequest
+        self.bot.calls["editMessageMedia"] += 1
+        if not self.message.photo:
+            # As the Bot API: a text message cannot be edited into a media one
+            raise BadRequest("Bad Request: there is no media in the message to edit")
+        self.message.photo = self.bot.new_photo()
+        return self.message
+
+
+def _lore_navigation_path(lore: dict) -> list[tuple]:
+    # Depth-first walk over every lore page (as key paths; () is the main menu),
+    # pressing "Back" after each leaf like a reader would.
+    path = []
+
+    def visit(keys: tuple, node, parent_keys: tuple):
+        path.append(keys)
+        if isinstance(node, dict):
+            for key in node.get("sections", {}):
+                visit(keys + (key,), node["sections"][key], keys)
+                path.append(keys)
+        path.append(parent_keys)
+
+    for key, item in lore.items():
+        if isinstance(item, dict) and "title" in item or key == "introduction":
+            visit((key,), item, ())
+    return path
+
+
+def _has_image(lore: dict, keys: tuple) -> bool:
+    if not keys:
+        return False
+    node = lore
+    for index, key in enumerate(keys):
+        node = node[key] if index == 0 else node["sections"][key]
+    container = lore if keys == ("introduction",) else node
+    return isinstance(container, dict) and ("image_url" in container or "image_file_id" in container)
+
+
+def bench_lore_navigation() -> None:
+    import data_manager
+    import lore_handlers
+
+    data_manager.load_data()
+    data_manager.player_data[BENCH_USER_ID] = {"telegram_user_id": BENCH_USER_ID, "is_active": True}
+    lore_handlers.save_lore_data = lambda: True
+    lore = data_manager.get_lore_data()
+    path = _lore_navigation_path(lore)
+
+    async def run() -> Counter:
+        bot = FakeBot()
+        context = SimpleNamespace(bot=bot, chat_data={})
+        bot.keyboard_message = FakeMessage(bot, photo=False)
+        for keys in path:
+            callback = encode("lore", *keys) if keys else encode("lore_menu")
+            query = FakeCallbackQuery(bot, callback, bot.keyboard_message)
+            handler = lore_handlers.lore_callback if keys else lore_handlers.lore_main_menu_trigger_callback
+            await handler(SimpleNamespace(callback_query=query, effective_user=query.from_user), context)
+        return bot.calls
+
+    calls = asyncio.run(run())
+    answers = calls.pop("answerCallbackQuery", 0)
+    total = sum(calls.values())
+    legacy_total = sum(2 + _has_image(lore, keys) if keys else 1 for keys in path)
+    print(f"Lore navigation: {len(path)} button presses ({answers} callback answers not counted)")
+    for method, count in sorted(calls.items()):
+        print(f"  {method:<18} {count:>6}")
+    print(f"  API calls per navigation: {total / len(path):.2f} "
+          f"(delete + resend flow: {legacy_total / len(path):.2f})")
+
+
+def bench_lore_album(album_size: int, pages: int) -> None:
+    import data_manager
+    import lore_handlers
+    from config import BASE_DIR
+
+    data_manager.load_data()
+    data_manager.player_data[BENCH_USER_ID] = {"telegram_user_id": BENCH_USER_ID, "is_active": True}
+    lore_handlers.save_lore_data = lambda: True
+    image_urls = ["./" + os.path.relpath(path, BASE_DIR)
+                  for path in sorted(glob.glob(os.path.join(BASE_DIR, "assets", "**", "*.png"), recursive=True))]
+    if len(image_urls) < 2:
+        print("Lore album benchmark needs at least two PNG files under assets/.")
+        return
+
+    # Turns the first top-level lore pages into albums, in memory only.
+    lore = data_manager.get_lore_data()
+    album_keys = [key for key, item in lore.items() if isinstance(item, dict) and "title" in item][:pages]
+    for key in album_keys:
+        lore[key]["images"] = [{"image_url": image_urls[i % len(image_urls)]} for i in range(album_size)]
+
+    async def view_albums() -> Counter:
+        bot = FakeBot()
+        context = SimpleNamespace(bot=bot, chat_data={})
+        bot.keyboard_message = FakeMessage(bot, photo=False)
+        for key in album_keys:
+            query = FakeCallbackQuery(bot, encode("lore", key), bot.keyboard_message)
+            await lore_handlers.lore_callback(SimpleNamespace(callback_query=query, effective_user=query.from_user),
+                                              context)
+        bot.calls.pop("answerCallbackQuery", None)
+        return bot.calls
+
+    print(f"Lore albums: {len(album_keys)} pages with {album_size} images each")
+    for label in ["cold (uploads)", "warm (cached file_ids)"]:
+        start = time.perf_counter()
+        calls = asyncio.run(view_albums())
+        elapsed = time.perf_counter() - start
+        album_calls = calls["sendMediaGroup"] + calls["sendPhoto"]
+        print(f"  {label:<24} API calls per view {sum(calls.values()) / len(album_keys):.2f} "
+              f"({album_calls / len(album_keys):.2f} for the album), {elapsed * 1000:.1f} ms")
+    print(f"  one photo per call would need {album_size + 2:.2f} API calls per view")
+
+
+def bench_lore_search(repeat: int) -> None:
+    import data_manager
+    from lore_search import LoreSearchIndex
+
+    data_manager.load_data()
+    lore = data_manager.get_lore_data()
+
+    index = LoreSearchIndex()
+    start = time.perf_counter()
+    index.update(lore)
+    build_time = time.perf_counter() - start
+    start = time.perf_counter()
+    index.update(lore)
+    noop_update_time = time.perf_counter() - start
+
+    queries = ["марс", "марсиан", "технокр", "война ELLI", "лифт", "elli", "совет земли", "ко"]
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query in queries:
+            index.search(query)
+    per_query = (time.perf_counter() - start) / (repeat * len(queries))
+
+    print(f"Lore search: {len(index.nodes)} pages, {len(index.postings)} terms")
+    print(f"  full build            {build_time * 1000:>8.2f} ms")
+    print(f"  unchanged re-update   {noop_update_time * 1000:>8.2f} ms")
+    print(f"  search (avg)          {per_query * 1e6:>8.1f} us")
+
+
+def _bench_update(bot, update_id: int, text: str | None = None, data: str | None = None):
+    from telegram import Update
+
+    chat = {"id": BENCH_USER_ID, "type": "private"}
+    user = {"id": BENCH_USER_ID, "is_bot": False, "first_name": "Bench"}
+    if data is not None:
+        message = {"message_id": 1, "date": 0, "chat": chat, "text": "menu"}
+        payload = {"callback_query": {"id": str(update_id), "from": user, "chat_instance": "1", "data": data,
+                                      "message": message}}
+    else:
+        message = {"message_id": update_id, "date": 0, "chat": chat, "from": user, "text": text}
+        if text.startswith("/"):
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+        payload = {"message": message}
+    return Update.de_json({"update_id": update_id, **payload}, bot)
+
+
+def bench_routing(repeat: int) -> None:
+    from telegram import User
+    from telegram.ext import ApplicationBuilder
+    from handler_registry import register_handlers
+    from routing import Router
+
+    application = ApplicationBuilder().token("1:bench").build()
+    # Offline stand-in for getMe, needed by command parsing
+    application.bot._bot_user = User(id=1, first_name="Bench", is_bot=True, username="bench_bot")
+    register_handlers(application)
+    routed = [handler for group in sorted(application.handlers) if group >= 0
+              for handler in application.handlers[group]]
+    # The same registration with every Router expanded back into one PTB handler per route
+    legacy = [expanded for handler in routed
+              for expanded in (handler.as_handlers() if isinstance(handler, Router) else [handler])]
+
+    bot = application.bot
+    samples = [("lore page", _bench_update(bot, 1, data=encode("lore", "introduction"))),
+               ("main menu button", _bench_update(bot, 2, text="🎯 My mission")),
+               ("player command", _bench_update(bot, 3, text="/character")),
+               ("admin button", _bench_update(bot, 4, text="Manage Recipients")),
+               ("admin command", _bench_update(bot, 5, text="/admin_policy reload")),
+               ("roster page", _bench_update(bot, 6, data=encode("roster", 0, 3))),
+               ("unmatched text", _bench_update(bot, 7, text="hello there"))]
+
+    def dispatch(handlers, update) -> int:
+        # What Application.process_update does per group: the first handler whose check passes wins.
+        for position, handler in enumerate(handlers):
+            check = handler.check_update(update)
+            if check is not None and check is not False:
+                return position
+        return -1
+
+    print(f"Handlers in dispatch order: {len(legacy)} without routers, {len(routed)} with routers")
+    print(f"{'update':<18} {'checked':>8} {'legacy us':>10} {'checked':>8} {'router us':>10}")
+    for label, update in samples:
+        results = []
+        for handlers in (legacy, routed):
+            position = dispatch(handlers, update)
+            elapsed = _best_of(lambda: [dispatch(handlers, update) for _ in range(repeat)], 3)
+            checked = position + 1 if position >= 0 else len(handlers)
+            results.append((checked, elapsed / repeat * 1e6))
+        (legacy_checked, legacy_us), (routed_checked, routed_us) = results
+        print(f"{label:<18} {legacy_checked:>8} {legacy_us:>10.2f} {routed_checked:>8} {routed_us:>10.2f}")
+
+
+# --- FAKE BOT API SERVER ---
+# A local HTTP server speaking just enough of the Bot API for Bot.initialize(), sendMessage and the
+# media methods. Media calls are held open for body size / upload bandwidth, like a slow upload link.
+class FakeBotApiServer:
+    def __init__(self, upload_bytes_per_second: float):
+        from bot_api import MEDIA_ENDPOINTS
+
+        self.media_endpoints = MEDIA_ENDPOINTS
+        self.upload_bytes_per_second = upload_bytes_per_second
+        self.bytes_received = 0
+        # Media calls that referenced a file:// path instead of uploading it (self-hosted server in --local mode)
+        self.local_file_refs = 0
+        self.server = None
+        self.port = None
+
+    async def start(self) -> "FakeBotApiServer":
+        self.server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/bot"
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                endpoint = request_line.split()[1].decode().rsplit("/", 1)[-1]
+                self.bytes_received += len(body)
+                if endpoint in self.media_endpoints and (b"file://" in body or b"file%3A%2F%2F" in body):
+                    self.local_file_refs += 1
+                elif endpoint in self.media_endpoints:
+                    await asyncio.sleep(len(body) / self.upload_bytes_per_second)
+                payload = codec.dumps({"ok": True, "result": self._result(endpoint)})
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                             b"Content-Length: " + str(len(payload)).encode() + b"\r\n\r\n" + payload)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _result(self, endpoint: str):
+        if endpoint == "getMe":
+            return {"id": 1, "is_bot": True, "first_name": "Bench", "username": "bench_bot"}
+        message = {"message_id": 1, "date": 0, "chat": {"id": BENCH_USER_ID, "type": "private"}}
+        if endpoint in self.media_endpoints:
+            message["photo"] = [{"file_id": "fake", "file_unique_id": "fake", "width": 1, "height": 1}]
+        return [message] if endpoint == "sendMediaGroup" else message
+
+
+def _percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def bench_bot_pools(uploads: int, upload_kb: int, bandwidth_kb: int, text_calls: int) -> None:
+    from telegram import Bot
+    from telegram.error import TelegramError
+    from telegram.request import HTTPXRequest
+    from bot_api import build_request
+    from config import BOT_CONTROL_POOL_SIZE, BOT_MEDIA_POOL_SIZE, BOT_CONTROL_TIMEOUT, BOT_MEDIA_TIMEOUT
+
+    photo = os.urandom(upload_kb * 1024)
+    # One log line per HTTP request would drown the table
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    async def measure(request) -> tuple[list[float], list[float], int, float]:
+        server = await FakeBotApiServer(bandwidth_kb * 1024).start()
+        bot = Bot("1:bench", base_url=server.base_url, request=request)
+        latencies = {"idle": [], "burst": []}
+        failures = 0
+
+        async def text_calls_during(label: str) -> None:
+            nonlocal failures
+            for _ in range(text_calls):
+                start = time.perf_counter()
+                try:
+                    await bot.send_message(BENCH_USER_ID, "ping")
+                    latencies[label].append(time.perf_counter() - start)
+                except TelegramError:
+                    failures += 1
+                await asyncio.sleep(0.02)
+
+        async def upload() -> None:
+            try:
+                await bot.send_photo(BENCH_USER_ID, photo)
+            except TelegramError:
+                pass
+
+        async with bot:
+            await text_calls_during("idle")
+            start = time.perf_counter()
+            burst = [asyncio.create_task(upload()) for _ in range(uploads)]
+            await asyncio.sleep(0.05)
+            await text_calls_during("burst")
+            await asyncio.gather(*burst)
+            burst_time = time.perf_counter() - start
+        await server.stop()
+        return latencies["idle"], latencies["burst"], failures, burst_time
+
+    # The single pool gets as many connections as the two split pools together
+    shared = HTTPXRequest(connection_pool_size=BOT_CONTROL_POOL_SIZE + BOT_MEDIA_POOL_SIZE,
+                          read_timeout=BOT_MEDIA_TIMEOUT, write_timeout=BOT_CONTROL_TIMEOUT,
+                          media_write_timeout=BOT_MEDIA_TIMEOUT, pool_timeout=BOT_CONTROL_TIMEOUT)
+    print(f"Upload burst: {uploads} photos of {upload_kb} KB at {bandwidth_kb} KB/s each, "
+          f"{text_calls} sendMessage calls before and during it")
+    print(f"{'pools':<34} {'idle p50':>9} {'burst p50':>10} {'burst p95':>10} {'failed':>7} {'burst s':>8}")
+    for label, request in [(f"shared ({BOT_CONTROL_POOL_SIZE + BOT_MEDIA_POOL_SIZE} connections)", shared),
+                           (f"split ({BOT_CONTROL_POOL_SIZE} control + {BOT_MEDIA_POOL_SIZE} media)",
+                            build_request())]:
+        idle, burst, failures, burst_time = asyncio.run(measure(request))
+        burst_p50 = f"{_percentile(burst, 0.5) * 1000:.1f}" if burst else "-"
+        burst_p95 = f"{_percentile(burst, 0.95) * 1000:.1f}" if burst else "-"
+        print(f"{label:<34} {_percentile(idle, 0.5) * 1000:>9.1f} {burst_p50:>10} {burst_p95:>10} "
+              f"{failures:>7} {burst_time:>8.1f}")
+    print("  latencies in ms; \"burst s\" is the time until the last upload finished")
+
+
+def bench_local_mode(image_kb: int, sends: int, bandwidth_kb: int) -> None:
+    from telegram import Bot
+    import assets
+
+    # One large "lore art" file, sent as the lore and character handlers do: through assets.load_input_file
+    with tempfile.TemporaryDirectory(dir=assets.BASE_DIR) as directory:
+        path = os.path.join(directory, "lore_art.png")
+        with open(path, "wb") as f:
+            f.write(os.urandom(image_kb * 1024))
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+
+        async def send_all(local_mode: bool) -> tuple[float, int, int, int]:
+            assets.BOT_API_LOCAL_MODE = local_mode
+            assets._cache.clear()
+            assets._cache_bytes = 0
+            server = await FakeBotApiServer(bandwidth_kb * 1024).start()
+            async with Bot("1:bench", base_url=server.base_url, local_mode=local_mode) as bot:
+                start = time.perf_counter()
+                for _ in range(sends):
+                    await bot.send_photo(BENCH_USER_ID, await assets.load_input_file(path))
+                elapsed = time.perf_counter() - start
+            await server.stop()
+            return elapsed, server.bytes_received, server.local_file_refs, assets._cache_bytes
+
+        print(f"Lore art: {sends} sends of a {image_kb} KB image, {bandwidth_kb} KB/s simulated upload link")
+        print(f"{'mode':<22} {'ms/send':>9} {'KB sent/send':>13} {'file refs':>10} {'cached KB':>10}")
+        for label, local_mode in [("upload (public API)", False), ("local mode", True)]:
+            elapsed, received, refs, cached = asyncio.run(send_all(local_mode))
+            print(f"{label:<22} {elapsed / sends * 1000:>9.1f} {received / sends / 1024:>13.1f} {refs:>10} "
+                  f"{cached / 1024:>10.0f}")
+        assets.BOT_API_LOCAL_MODE = False
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Eventide bot micro-benchmarks.")
+    subparsers = parser.add_subparsers(dest="suite", required=True)
+
+    codec_parser = subparsers.add_parser("codec", help="JSON load/save times per backend and format.")
+    codec_parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    codec_parser.add_argument("--repeat", type=int, default=3)
+
+    subparsers.add_parser("lore-navigation", help="Bot API calls per lore button press, using a fake bot.")
+
+    album_parser = subparsers.add_parser("lore-album", help="Bot API calls per lore album view, using a fake bot.")
+    album_parser.add_argument("--size", type=int, default=4, help="Images per album.")
+    album_parser.add_argument("--pages", type=int, default=5)
+
+    search_parser = subparsers.add_parser("lore-search", help="Lore search index build and query times.")
+    search_parser.add_argument("--repeat", type=int, default=1000)
+
+    routing_parser = subparsers.add_parser("routing", help="Per-update handler dispatch cost, with and without routers.")
+    routing_parser.add_argument("--repeat", type=int, default=10000)
+
+    pools_parser = subparsers.add_parser("bot-pools", help="sendMessage latency during an upload burst, against a "
+                                                          "local fake Bot API, with shared and split request pools.")
+    pools_parser.add_argument("--uploads", type=int, default=80)
+    pools_parser.add_argument("--upload-kb", type=int, default=128)
+    pools_parser.add_argument("--bandwidth-kb", type=int, default=128, help="Simulated upload speed per connection.")
+    pools_parser.add_argument("--text-calls", type=int, default=30)
+
+    local_parser = subparsers.add_parser("local-mode", help="Sending local images by upload vs. by file:// path "
+                                                          "(self-hosted Bot API --local), against a local fake server.")
+    local_parser.add_argument("--image-kb", type=int, default=4096)
+    local_parser.add_argument("--sends", type=int, default=10)
+    local_parser.add_argument("--bandwidth-kb", type=int, default=8192, help="Simulated upload speed.")
+
+    args = parser.parse_args(argv)
+    if args.suite == "codec":
+        bench_codec(args.sizes, args.repeat)
+    elif args.suite == "lore-navigation":
+        bench_lore_navigation()
+    elif args.suite == "lore-album":
+        bench_lore_album(args.size, args.pages)
+    elif args.suite == "lore-search":
+        bench_lore_search(args.repeat)
+    elif args.suite == "routing":
+        bench_routing(args.repeat)
+    elif args.suite == "bot-pools":
+        bench_bot_pools(args.uploads, args.upload_kb, args.bandwidth_kb, args.text_calls)
+    elif args.suite == "local-mode":
+        bench_local_mode(args.image_kb, args.sends, args.bandwidth_kb)
+
+
+if __name__ == "__main__":
+    main()
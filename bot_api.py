@@ -0,0 +1,95 @@
+import asyncio
+import logging
+
+from telegram.error import TimedOut
+from telegram.ext import Application
+from telegram.request import BaseRequest, HTTPXRequest
+
+from config import *
+
+logger = logging.getLogger(__name__)
+
+# Bot API methods that can carry a file upload (or make Telegram fetch one); they get the media pool
+MEDIA_ENDPOINTS = frozenset({
+    "sendPhoto", "sendMediaGroup", "sendDocument", "sendVideo", "sendAnimation", "sendAudio", "sendVoice",
+    "sendVideoNote", "sendSticker", "editMessageMedia", "setChatPhoto", "uploadStickerFile",
+})
+
+
+class SplitRequest(BaseRequest):
+    """Sends media calls through their own connection pool and bounded queue, everything else through another.
+
+    With one pool, a burst of photo uploads holds every connection for seconds and quick calls such as
+    sendMessage or answerCallbackQuery wait behind them. Here uploads take at most `max_uploads`
+    connections of the media pool at a time; up to `queue_limit` more wait in line (FIFO), and any
+    beyond that fail right away with TimedOut, which the photo senders already answer with a text fallback.
+    File downloads (the only GET requests) count as media too.
+    """
+
+    def __init__(self, control: BaseRequest, media: BaseRequest, max_uploads: int, queue_limit: int):
+        self.control = control
+        self.media = media
+        self.queue_limit = queue_limit
+        self._upload_slots = asyncio.Semaphore(max_uploads)
+        self.waiting = 0
+        self.stats = {"uploads": 0, "queued": 0, "rejected": 0, "max_waiting": 0}
+
+    @property
+    def read_timeout(self) -> float | None:
+        return self.control.read_timeout
+
+    async def initialize(self) -> None:
+        await asyncio.gather(self.control.initialize(), self.media.initialize())
+
+    async def shutdown(self) -> None:
+        await asyncio.gather(self.control.shutdown(), self.media.shutdown())
+
+    async def do_request(self, url: str, method: str, request_data=None,
+                         read_timeout=BaseRequest.DEFAULT_NONE, write_timeout=BaseRequest.DEFAULT_NONE,
+                         connect_timeout=BaseRequest.DEFAULT_NONE, pool_timeout=BaseRequest.DEFAULT_NONE):
+        timeouts = {"read_timeout": read_timeout, "write_timeout": write_timeout,
+                    "connect_timeout": connect_timeout, "pool_timeout": pool_timeout}
+        if method != "GET" and url.rsplit("/", 1)[-1] not in MEDIA_ENDPOINTS:
+            return await self.control.do_request(url, method, request_data, **timeouts)
+
+        if self._upload_slots.locked():
+            if self.waiting >= self.queue_limit:
+                self.stats["rejected"] += 1
+                raise TimedOut(f"Upload queue is full ({self.queue_limit} waiting)")
+            self.stats["queued"] += 1
+        self.waiting += 1
+        self.stats["max_waiting"] = max(self.stats["max_waiting"], self.waiting)
+        try:
+            await self._upload_slots.acquire()
+        finally:
+            self.waiting -= 1
+        try:
+            self.stats["uploads"] += 1
+            return await self.media.do_request(url, method, request_data, **timeouts)
+        finally:
+            self._upload_slots.release()
+
+
+def build_request() -> SplitRequest:
+    """The request object for the bot's API calls (getUpdates keeps PTB's own single-connection request)."""
+    control = HTTPXRequest(connection_pool_size=BOT_CONTROL_POOL_SIZE, read_timeout=BOT_CONTROL_TIMEOUT,
+                           write_timeout=BOT_CONTROL_TIMEOUT, connect_timeout=BOT_CONTROL_TIMEOUT,
+                           pool_timeout=BOT_CONTROL_TIMEOUT)
+    # The upload queue already limits uploads to the pool size, so the pool itself never makes them wait
+    media = HTTPXRequest(connection_pool_size=BOT_MEDIA_POOL_SIZE, read_timeout=BOT_MEDIA_TIMEOUT,
+                         write_timeout=BOT_MEDIA_TIMEOUT, media_write_timeout=BOT_MEDIA_TIMEOUT,
+                         connect_timeout=BOT_CONTROL_TIMEOUT, pool_timeout=BOT_MEDIA_TIMEOUT)
+    return SplitRequest(control, media, max_uploads=BOT_MEDIA_POOL_SIZE, queue_limit=BOT_UPLOAD_QUEUE_LIMIT)
+
+
+def application_builder():
+    """Application.builder() with the bot token, the split request pools and the Bot API server settings;
+    callers add mode-specific options."""
+    builder = Application.builder().token(BOT_TOKEN).request(build_request())
+    if BOT_API_BASE_URL:
+        builder = builder.base_url(BOT_API_BASE_URL)
+    if BOT_API_BASE_FILE_URL:
+        builder = builder.base_file_url(BOT_API_BASE_FILE_URL)
+    if BOT_API_LOCAL_MODE:
+        builder = builder.local_mode(True)
+    return builder
@@ -0,0 +1,186 @@
+import base64
+import binascii
+import hashlib
+import hmac
+
+from config import BOT_TOKEN, CALLBACK_SECRET
+
+# --- WIRE FORMAT ---
+# base64url(action code | args | tag), at most 64 characters (Telegram's callback_data limit),
+# so at most 48 bytes before encoding. Every argument starts with a one-byte type:
+#   ARG_INT  zigzag varint            ARG_NONE  nothing
+#   ARG_STR  length byte + UTF-8      ARG_REF   first 4 bytes of the string's BLAKE2b digest
+# Strings are only sent as references when the inline form does not fit; a reference is resolved
+# through the table filled when it was encoded, or, after a restart, through the vocabularies.
+# The tag is a truncated HMAC-SHA256 of everything before it, so clients cannot forge buttons.
+
+# Action names and their codes. Append only: a code's position is what old buttons carry.
+ACTIONS = (
+    "lore_menu", "lore",
+    "activate", "deactivate", "activate_cancel", "deactivate_cancel",
+    "setstatus", "setstatus_set", "setstatus_cancel",
+    "secretmission", "secretmission_set", "secretmission_clear", "secretmission_none", "secretmission_cancel",
+    "bulk_toggle", "bulk_page", "bulk_filter", "bulk_all", "bulk_none", "bulk_action", "bulk_cancel",
+    "bulkstatus", "bulkstatus_back", "bulksm_set", "bulksm_clear", "bulksm_back",
+    "roster",
+    "broadcast_target", "broadcast_cancel", "broadcast_confirm_yes", "broadcast_confirm_no",
+    "dmselect", "dmselect_cancel", "dm_confirm_yes", "dm_confirm_no",
+    "import_confirm_yes", "import_confirm_no",
+)
+_ACTION_CODES = {name: code for code, name in enumerate(ACTIONS)}
+
+MAX_RAW_BYTES = 48
+TAG_BYTES = 6
+REF_BYTES = 4
+ARG_INT, ARG_STR, ARG_REF, ARG_NONE = range(4)
+
+_key = hashlib.sha256(("callback-data:" + (CALLBACK_SECRET or BOT_TOKEN)).encode("utf-8")).digest()
+# digest -> string for ARG_REF arguments. Cleared when full, like _decoded: vocabulary strings come back
+# on the next miss, other references stop resolving, as they would after a restart.
+_refs = {}
+_REFS_LIMIT = 16384
+_vocabularies = []
+# callback_data -> (action, args); the router and the handler that follows it decode each press once
+_decoded = {}
+_DECODED_LIMIT = 4096
+
+
+class CallbackDataError(ValueError):
+    pass
+
+
+def register_vocabulary(source) -> None:
+    """source() returns strings that may appear as references, used to resolve buttons made before a restart."""
+    _vocabularies.append(source)
+
+
+def _digest(value: str) -> bytes:
+    return hashlib.blake2b(value.encode("utf-8"), digest_size=REF_BYTES).digest()
+
+
+def _put_varint(out: bytearray, value: int) -> None:
+    value = (value << 1) ^ (value >> 63) if value < 0 else value << 1
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _pack(code: int, args: tuple, min_ref_length: int | None) -> bytearray:
+    out = bytearray((code,))
+    for arg in args:
+        if arg is None:
+            out.append(ARG_NONE)
+        elif isinstance(arg, int):
+            out.append(ARG_INT)
+            _put_varint(out, arg)
+        else:
+            raw = str(arg).encode("utf-8")
+            if len(raw) > 255 or (min_ref_length is not None and len(raw) >= min_ref_length):
+                digest = _digest(str(arg))
+                if digest not in _refs and len(_refs) >= _REFS_LIMIT:
+                    _refs.clear()
+                _refs[digest] = str(arg)
+                out.append(ARG_REF)
+                out += digest
+            else:
+                out.append(ARG_STR)
+                out.append(len(raw))
+                out += raw
+    return out
+
+
+def encode(action: str, *args) -> str:
+    """callback_data for an action with int, str or None arguments. Raises CallbackDataError if it cannot fit."""
+    code = _ACTION_CODES[action]
+    body = _pack(code, args, None)
+    if len(body) + TAG_BYTES > MAX_RAW_BYTES:
+        body = _pack(code, args, REF_BYTES + 2)
+        if len(body) + TAG_BYTES > MAX_RAW_BYTES:
+            raise CallbackDataError(f"Too many arguments for callback data: {action}{args}")
+    body += hmac.new(_key, body, hashlib.sha256).digest()[:TAG_BYTES]
+    return base64.urlsafe_b64encode(body).rstrip(b"=").decode("ascii")
+
+
+def _resolve_ref(digest: bytes) -> str | None:
+    value = _refs.get(digest)
+    if value is None:
+        for source in _vocabularies:
+            for candidate in source():
+                _refs[_digest(candidate)] = candidate
+        value = _refs.get(digest)
+    return value
+
+
+def _unpack(body: bytes) -> tuple[str, tuple] | None:
+    if body[0] >= len(ACTIONS):
+        return None
+    args = []
+    pos, end = 1, len(body)
+    while pos < end:
+        kind = body[pos]
+        pos += 1
+        if kind == ARG_INT:
+            value = shift = 0
+            while True:
+                byte = body[pos]
+                pos += 1
+                value |= (byte & 0x7F) << shift
+                shift += 7
+                if byte < 0x80:
+                    break
+            args.append((value >> 1) ^ -(value & 1))
+        elif kind == ARG_STR:
+            length = body[pos]
+            args.append(body[pos + 1:pos + 1 + length].decode("utf-8"))
+            pos += 1 + length
+        elif kind == ARG_REF:
+            value = _resolve_ref(bytes(body[pos:pos + REF_BYTES]))
+            if value is None:
+                return None
+            args.append(value)
+            pos += REF_BYTES
+        elif kind == ARG_NONE:
+            args.append(None)
+        else:
+            return None
+    return ACTIONS[body[0]], tuple(args)
+
+
+def decode(data: str | None) -> tuple[str, tuple] | None:
+    """(action, args) for callback_data made by encode(); None for forged, stale or foreign data."""
+    if not data:
+        return None
+    result = _decoded.get(data)
+    if result is not None:
+        return result
+    try:
+        raw = base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+    except (binascii.Error, ValueError):
+        return None
+    if len(raw) <= TAG_BYTES:
+        return None
+    body, tag = raw[:-TAG_BYTES], raw[-TAG_BYTES:]
+    if not hmac.compare_digest(tag, hmac.new(_key, body, hashlib.sha256).digest()[:TAG_BYTES]):
+        return None
+    try:
+        result = _unpack(body)
+    except (IndexError, UnicodeDecodeError):
+        result = None
+    if result is None:
+        return None
+    if len(_decoded) >= _DECODED_LIMIT:
+        _decoded.clear()
+    _decoded[data] = result
+    return result
+
+
+def pattern(*actions: str):
+    """CallbackQueryHandler pattern accepting buttons of the given actions."""
+    wanted = frozenset(actions)
+
+    def matches(data) -> bool:
+        result = decode(data) if isinstance(data, str) else None
+        return result is not None and result[0] in wanted
+
+    return matches
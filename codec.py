@@ -0,0 +1,88 @@
+import json
+import logging
+import os
+import sys
+
+logger = logging.getLogger(__name__)
+
+# --- BACKEND SELECTION ---
+# orjson is preferred, msgspec is the second choice, stdlib json is always available.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+if orjson is not None:
+    BACKEND = "orjson"
+elif msgspec is not None:
+    BACKEND = "msgspec"
+else:
+    BACKEND = "json"
+
+FORMAT_COMPACT = "compact"
+FORMAT_PRETTY = "pretty"
+VALID_FORMATS = [FORMAT_COMPACT, FORMAT_PRETTY]
+
+# Exceptions raised by any backend on malformed input.
+# orjson.JSONDecodeError already subclasses json.JSONDecodeError.
+DecodeError = (json.JSONDecodeError, msgspec.DecodeError) if msgspec is not None else (json.JSONDecodeError,)
+
+if msgspec is not None:
+    _msgspec_encoder = msgspec.json.Encoder()
+    _msgspec_decoder = msgspec.json.Decoder()
+
+
+def loads(data: bytes | str, backend: str | None = None):
+    backend = backend or BACKEND
+    if backend == "orjson":
+        return orjson.loads(data)
+    if backend == "msgspec":
+        return _msgspec_decoder.decode(data)
+    return json.loads(data)
+
+
+def dumps(obj, fmt: str = FORMAT_COMPACT, backend: str | None = None) -> bytes:
+    backend = backend or BACKEND
+    pretty = fmt == FORMAT_PRETTY
+    if backend == "orjson":
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0)
+    if backend == "msgspec":
+        encoded = _msgspec_encoder.encode(obj)
+        return msgspec.json.format(encoded, indent=2) if pretty else encoded
+    if pretty:
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def read_json(path: str, backend: str | None = None):
+    with open(path, 'rb') as f:
+        return loads(f.read(), backend)
+
+
+def write_json(path: str, obj, fmt: str = FORMAT_COMPACT, backend: str | None = None) -> None:
+    # Encode first so a serialization error never truncates the existing file.
+    data = dumps(obj, fmt, backend)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def reformat_file(path: str, fmt: str) -> None:
+    write_json(path, read_json(path), fmt)
+    logger.info(f"Rewrote {path} in {fmt} format using {BACKEND}.")
+
+
+if __name__ == "__main__":
+    # Usage: python codec.py <compact|pretty> <file> [<file> ...]
+    # Switch data files to the pretty format for hand editing and back to compact afterwards.
+    logging.basicConfig(format="%(message)s", level=logging.INFO)
+    if len(sys.argv) < 3 or sys.argv[1] not in VALID_FORMATS:
+        exit(f"Usage: python codec.py <{'|'.join(VALID_FORMATS)}> <file> [<file> ...]")
+    for file_path in sys.argv[2:]:
+        reformat_file(file_path, sys.argv[1])
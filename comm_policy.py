@@ -0,0 +1,168 @@
+import logging
+
+from config import *
+from codec import read_json, DecodeError
+from gm_inbox import (CATEGORY_LABELS, CATEGORY_MESSAGE, CATEGORY_ELLI_ALERT, CATEGORY_TECHNOCRAT_ALERT,
+                      CATEGORY_DEAD)
+
+logger = logging.getLogger(__name__)
+
+# --- ACTIONS ---
+ACTION_DELIVER = "deliver"      # GM gets the message, a player recipient gets it too
+ACTION_INTERCEPT = "intercept"  # only the GM gets it (as gm_text), the sender sees reply
+ACTION_FAKE_ACK = "fake_ack"    # nobody gets it, the sender sees the normal "delivered" reply
+ACTION_DROP = "drop"            # nobody gets it, the sender sees reply
+ACTION_DELAY = "delay"          # delivered after "delay" seconds
+ACTION_REDIRECT = "redirect"    # delivered to the NPC named in "redirect_to" instead
+ACTIONS = [ACTION_DELIVER, ACTION_INTERCEPT, ACTION_FAKE_ACK, ACTION_DROP, ACTION_DELAY, ACTION_REDIRECT]
+
+RECIPIENT_NPC = "npc"
+RECIPIENT_PLAYER = "player"
+WILDCARD = "*"
+
+DELIVERED_REPLY = "Message delivered. Please wait for a response."
+DELIVER_GM_TEXT = "--- Msg from {sender_name}(ID:{sender_id},Status:{sender_status}) to {recipient} ---\nMessage:\n{text}"
+TEMPLATE_FIELDS = {"sender_name": "", "sender_id": 0, "sender_status": "", "recipient": "", "original_recipient": "",
+                   "text": ""}
+
+# Rules are matched first to last; omitted keys match anything. Used when COMM_POLICY_FILE does not exist.
+DEFAULT_POLICY = [
+    {"sender": STATUS_ARRESTED, "action": ACTION_INTERCEPT, "category": CATEGORY_ELLI_ALERT,
+     "gm_text": "ELLI ALERT: Arrested {sender_name}(ID:{sender_id}) attempted comm.\nTo:{recipient}\nMsg:{text}",
+     "reply": "You are under arrest. All communication attempts are being monitored by ELLI. Await further instructions."},
+    {"sender": STATUS_HACKED, "action": ACTION_INTERCEPT, "category": CATEGORY_TECHNOCRAT_ALERT,
+     "gm_text": "TECHNOCRAT ALERT: Hacked {sender_name}(ID:{sender_id}) sent.\nOriginal To:{recipient}\nIntercepted:{text}",
+     "reply": "Message sent - wait."},
+    {"sender": STATUS_DEAD, "action": ACTION_INTERCEPT, "category": CATEGORY_DEAD,
+     "gm_text": "INFO: DEAD Player {sender_name}(ID:{sender_id}) tried to send to {recipient}: {text}",
+     "reply": "No response... silence on the airwaves..."},
+    {"action": ACTION_DELIVER},
+]
+
+# --- COMPILED TABLE ---
+# Statuses and recipient types are interned to small ints; the table holds the index of the winning
+# rule for every (sender status, recipient type, recipient status) cell, so resolving a message is two
+# dict lookups and one list index. Unknown statuses share the last status code; NPC recipients have
+# no status and use the code after it.
+_STATUS_CODES = {status: code for code, status in enumerate(VALID_PLAYER_STATUSES)}
+_UNKNOWN_STATUS = len(VALID_PLAYER_STATUSES)
+_NO_STATUS = _UNKNOWN_STATUS + 1
+_TYPE_CODES = {RECIPIENT_NPC: 0, RECIPIENT_PLAYER: 1}
+_N_SENDER = _UNKNOWN_STATUS + 1
+_N_TYPES = len(_TYPE_CODES)
+_N_RECIPIENT = _NO_STATUS + 1
+
+_rules = []
+_table = []
+hits = []
+policy_source = None
+
+
+def _check_rule(rule, number: int) -> str | None:
+    if not isinstance(rule, dict):
+        return f"Rule {number}: must be an object."
+    action = rule.get("action")
+    if action not in ACTIONS:
+        return f"Rule {number}: unknown action {action!r}."
+    for key in ("sender", "recipient_status"):
+        value = rule.get(key, WILDCARD)
+        if value != WILDCARD and value not in _STATUS_CODES:
+            return f"Rule {number}: invalid {key} {value!r}."
+    if rule.get("recipient", WILDCARD) not in (WILDCARD, *_TYPE_CODES):
+        return f"Rule {number}: recipient must be \"npc\", \"player\" or \"*\"."
+    if rule.get("category", CATEGORY_MESSAGE) not in CATEGORY_LABELS:
+        return f"Rule {number}: unknown category {rule.get('category')!r}."
+    if action == ACTION_DELAY and not isinstance(rule.get("delay"), (int, float)):
+        return f"Rule {number}: delay needs a number of seconds."
+    if action == ACTION_REDIRECT and not rule.get("redirect_to"):
+        return f"Rule {number}: redirect needs redirect_to."
+    try:
+        rule.get("gm_text", DELIVER_GM_TEXT).format(**TEMPLATE_FIELDS)
+    except (KeyError, IndexError, ValueError) as e:
+        return f"Rule {number}: bad gm_text placeholder {e}."
+    return None
+
+
+def _matches(rule: dict, sender: int, recipient_type: int, recipient_status: int) -> bool:
+    wanted = rule.get("sender", WILDCARD)
+    if wanted != WILDCARD and _STATUS_CODES[wanted] != sender:
+        return False
+    wanted = rule.get("recipient", WILDCARD)
+    if wanted != WILDCARD and _TYPE_CODES[wanted] != recipient_type:
+        return False
+    wanted = rule.get("recipient_status", WILDCARD)
+    return wanted == WILDCARD or _STATUS_CODES[wanted] == recipient_status
+
+
+def compile_policy(rules: list) -> tuple[list, list[str]]:
+    """Returns (table, errors). Every cell must be covered, so a policy without a catch-all rule is rejected."""
+    if not isinstance(rules, list):
+        return [], ["Policy must be a list of rules."]
+    errors = [problem for number, rule in enumerate(rules, start=1) if (problem := _check_rule(rule, number))]
+    if errors:
+        return [], errors
+    table = []
+    for sender in range(_N_SENDER):
+        for recipient_type in range(_N_TYPES):
+            for recipient_status in range(_N_RECIPIENT):
+                winner = next((index for index, rule in enumerate(rules)
+                               if _matches(rule, sender, recipient_type, recipient_status)), None)
+                if winner is None:
+                    return [], ["Some messages match no rule; end the policy with a catch-all {\"action\": \"deliver\"}."]
+                table.append(winner)
+    return table, []
+
+
+def load_policy() -> list[str]:
+    """(Re)reads COMM_POLICY_FILE, or the built-in policy if it does not exist. Keeps the old policy on errors;
+    called once at startup and by /admin_policy reload."""
+    global _rules, _table, hits, policy_source
+    try:
+        rules, source = read_json(COMM_POLICY_FILE), COMM_POLICY_FILE
+    except FileNotFoundError:
+        rules, source = DEFAULT_POLICY, "built-in"
+    except DecodeError as e:
+        logger.error(f"Communication policy from {COMM_POLICY_FILE} rejected: invalid JSON: {e}")
+        return [f"Invalid JSON in {COMM_POLICY_FILE}: {e}"]
+    if isinstance(rules, dict):
+        rules = rules.get("rules")
+    table, errors = compile_policy(rules)
+    if errors:
+        logger.error(f"Communication policy from {source} rejected: {'; '.join(errors)}")
+        return errors
+    _rules, _table, hits, policy_source = rules, table, [0] * len(rules), source
+    logger.info(f"Communication policy loaded from {source}: {len(rules)} rules.")
+    return []
+
+
+def resolve(sender_status: str, recipient_type: str, recipient_status: str | None) -> dict:
+    """The rule that applies to one message; counts the hit."""
+    sender = _STATUS_CODES.get(sender_status, _UNKNOWN_STATUS)
+    target = _NO_STATUS if recipient_status is None else _STATUS_CODES.get(recipient_status, _UNKNOWN_STATUS)
+    index = _table[(sender * _N_TYPES + _TYPE_CODES[recipient_type]) * _N_RECIPIENT + target]
+    hits[index] += 1
+    return _rules[index]
+
+
+def format_policy() -> str:
+    lines = [f"📜 Communication policy ({policy_source}, {len(_rules)} rules):"]
+    for number, (rule, count) in enumerate(zip(_rules, hits), start=1):
+        match = (f"{rule.get('sender', WILDCARD)} → {rule.get('recipient', WILDCARD)}"
+                 f"[{rule.get('recipient_status', WILDCARD)}]")
+        extra = ""
+        if rule["action"] == ACTION_DELAY:
+            extra = f" {rule['delay']}s"
+        elif rule["action"] == ACTION_REDIRECT:
+            extra = f" to {rule['redirect_to']}"
+        lines.append(f"{number}. {match}: {rule['action']}{extra} — {count} hits")
+    return "\n".join(lines)
+
+
+def _use_default_policy() -> None:
+    global _rules, _table, hits, policy_source
+    _table, _ = compile_policy(DEFAULT_POLICY)
+    _rules, hits, policy_source = DEFAULT_POLICY, [0] * len(DEFAULT_POLICY), "built-in"
+
+
+# The built-in policy is active until load_policy() succeeds, so an invalid file never leaves the table empty
+_use_default_policy()
@@ -6,6 +6,8 @@ load_dotenv()
 
 # --- CONFIGURATION ---
 BOT_TOKEN = os.getenv("BOT_TOKEN", "YOUR_TELEGRAM_BOT_TOKEN")
+# Key for signing inline button data; derived from BOT_TOKEN when unset
+CALLBACK_SECRET = os.getenv("CALLBACK_SECRET")
 DM_CHAT_ID_STR = os.getenv("DM_CHAT_ID")
 DM_CHAT_ID = int(DM_CHAT_ID_STR) if DM_CHAT_ID_STR and DM_CHAT_ID_STR.isdigit() else None
 
@@ -18,6 +20,94 @@ MISSIONS_FILE = os.path.join(BASE_DIR, os.getenv("MISSIONS_FILE_PATH", "data/mis
 RECIPIENTS_FILE = os.path.join(BASE_DIR, os.getenv("RECIPIENTS_FILE_PATH", "data/recipients_data.json"))
 SECRET_MISSIONS_FILE = os.path.join(BASE_DIR, os.getenv("SECRET_MISSIONS_FILE_PATH", "data/secret_missions_data.json"))
 
+# Append-only history of relayed messages and its per-thread offset indexes
+MESSAGE_LOG_FILE = os.path.join(BASE_DIR, os.getenv("MESSAGE_LOG_PATH", "data/message_log.jsonl"))
+MESSAGE_INDEX_DIR = os.path.join(BASE_DIR, os.getenv("MESSAGE_INDEX_DIR", "data/message_index"))
+
+# Optional override of the built-in communication interception rules (see comm_policy.py)
+COMM_POLICY_FILE = os.path.join(BASE_DIR, os.getenv("COMM_POLICY_FILE_PATH", "data/comm_policy.json"))
+
+# Scripted game events and the scheduler's persisted cursor
+SCENARIO_FILE = os.path.join(BASE_DIR, os.getenv("SCENARIO_FILE_PATH", "data/scenario.json"))
+SCENARIO_STATE_FILE = os.path.join(BASE_DIR, os.getenv("SCENARIO_STATE_PATH", "data/scenario_state.json"))
+
+# Read-only content (lore, missions, secret missions) compiled into a memory-mapped snapshot
+CONTENT_SNAPSHOT_FILE = os.path.join(BASE_DIR, os.getenv("CONTENT_SNAPSHOT_PATH", "data/content.snapshot"))
+USE_CONTENT_SNAPSHOT = os.getenv("USE_CONTENT_SNAPSHOT", "false").lower() in ["true", "1", "yes", "on"]
+
+# Local images are kept in memory after the first read, up to this many bytes in total
+ASSET_CACHE_MAX_BYTES = int(os.getenv("ASSET_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+ASSET_READ_WORKERS = 4
+
+# On-disk JSON format: "compact" for production, "pretty" (indented) for hand editing
+DATA_FORMAT = os.getenv("DATA_FORMAT", "compact").lower()
+
+# --- WEBHOOK ---
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+WEBHOOK_SECRET_TOKEN = os.getenv("WEBHOOK_SECRET_TOKEN")
+
+# Worker process count for "main.py sharded"
+SHARD_WORKERS = int(os.getenv("SHARD_WORKERS", "4"))
+
+# --- BOT API SERVER ---
+# A self-hosted telegram-bot-api server instead of api.telegram.org, e.g. BOT_API_BASE_URL=http://localhost:8081/bot
+BOT_API_BASE_URL = os.getenv("BOT_API_BASE_URL")
+# Defaults to the base URL with /bot replaced by /file/bot
+BOT_API_BASE_FILE_URL = os.getenv("BOT_API_BASE_FILE_URL") or (
+    BOT_API_BASE_URL[:-len("bot")] + "file/bot" if BOT_API_BASE_URL and BOT_API_BASE_URL.endswith("/bot") else None)
+# For a server started with --local on the same filesystem: local images are sent as file:// paths, not uploaded
+BOT_API_LOCAL_MODE = os.getenv("BOT_API_LOCAL_MODE", "false").lower() in ["true", "1", "yes", "on"]
+# Where the server sees this directory, if it runs in another container with the files mounted elsewhere
+BOT_API_LOCAL_BASE_DIR = os.getenv("BOT_API_LOCAL_BASE_DIR", BASE_DIR)
+
+# --- BOT API CONNECTIONS ---
+# Quick calls (messages, callback answers, edits) and media uploads use separate HTTP connection pools.
+# At most BOT_MEDIA_POOL_SIZE uploads run at once; up to BOT_UPLOAD_QUEUE_LIMIT more wait, the rest fail fast.
+BOT_CONTROL_POOL_SIZE = int(os.getenv("BOT_CONTROL_POOL_SIZE", "32"))
+BOT_MEDIA_POOL_SIZE = int(os.getenv("BOT_MEDIA_POOL_SIZE", "8"))
+BOT_UPLOAD_QUEUE_LIMIT = int(os.getenv("BOT_UPLOAD_QUEUE_LIMIT", "64"))
+# Seconds; also the longest a quick call waits for a free connection
+BOT_CONTROL_TIMEOUT = 10.0
+BOT_MEDIA_TIMEOUT = 60.0
+
+# --- RATE LIMITS ---
+# Per user and handler class: (tokens refilled per second, bucket size). The GM is never throttled.
+RATE_LIMITS = {
+    "callback": (2.0, 6),
+    "message": (1.0, 5),
+    "command": (0.5, 4),
+    "inline": (2.0, 10),
+}
+RATE_LIMIT_IDLE_SECONDS = 600
+SLOW_DOWN_TEXT = "Slow down, operative. Comlog is cooling down."
+SLOW_DOWN_CACHE_SECONDS = 3
+
+# --- GM INBOX DIGEST ---
+# Buffers player-to-GM relays and sends them grouped by sender every N seconds or M messages.
+# Categories: registration, message, elli_alert, technocrat_alert, dead
+GM_DIGEST_ENABLED = os.getenv("GM_DIGEST_ENABLED", "false").lower() in ["true", "1", "yes", "on"]
+GM_DIGEST_INTERVAL = int(os.getenv("GM_DIGEST_INTERVAL", "60"))
+GM_DIGEST_MAX_MESSAGES = int(os.getenv("GM_DIGEST_MAX_MESSAGES", "20"))
+GM_DIGEST_URGENT_CATEGORIES = {category.strip() for category in
+                               os.getenv("GM_DIGEST_URGENT_CATEGORIES", "registration,elli_alert").split(",")
+                               if category.strip()}
+
+# --- MEMORY REPORT ---
+# Seconds between "memory gauges" log lines (0 = off); the report itself is on demand via /admin_memory
+MEMORY_GAUGE_INTERVAL = int(os.getenv("MEMORY_GAUGE_INTERVAL", "0"))
+# Traceback depth recorded by /admin_memory start; deeper is slower but tells callers apart
+MEMORY_TRACE_FRAMES = int(os.getenv("MEMORY_TRACE_FRAMES", "1"))
+
+# --- EVENT LOOP MONITOR ---
+# Samples loop lag every LOOP_LAG_INTERVAL seconds; a stall longer than LOOP_LAG_THRESHOLD seconds has its
+# stack captured and is reported to the GM, at most once per LOOP_ALERT_INTERVAL seconds
+LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR_ENABLED", "true").lower() in ["true", "1", "yes", "on"]
+LOOP_LAG_INTERVAL = 0.1
+LOOP_LAG_THRESHOLD = float(os.getenv("LOOP_LAG_THRESHOLD", "0.5"))
+LOOP_ALERT_INTERVAL = int(os.getenv("LOOP_ALERT_INTERVAL", "600"))
+
 # --- PLAYER STATUSES ---
 STATUS_ACTIVE_ON_MISSION = "Active (on mission)"
 STATUS_ARRESTED = "Arrested"
@@ -42,6 +132,16 @@ CHOOSE_BROADCAST_TARGET, TYPE_BROADCAST_SENDER_NAME, TYPE_BROADCAST_MESSAGE_TEXT
 SELECT_DM_PLAYER, TYPE_DM_SENDER_NAME, TYPE_DM_MESSAGE_TEXT, CONFIRM_DM_SEND = range(30, 34)
 SELECT_PLAYER_FOR_STATUS, SELECT_NEW_STATUS = range(40, 42)
 SELECT_PLAYER_FOR_SECRET_MISSION, CHOOSE_SECRET_MISSION = range(50, 52)
+BULK_SELECT_PLAYERS, BULK_CHOOSE_STATUS, BULK_CHOOSE_SECRET_MISSION = range(60, 63)
+IMPORT_WAIT_FILE, IMPORT_CONFIRM = range(70, 72)
+
+# --- BULK ADMIN ACTIONS ---
+BULK_PAGE_SIZE = 10
+ROSTER_PAGE_SIZE = 15
+# Player notifications sent at once after a bulk change
+NOTIFY_CONCURRENCY = 10
+# Largest /admin_import upload accepted
+IMPORT_MAX_BYTES = 5 * 1024 * 1024
 
 # Welcome image file_id cache
 WELCOME_IMAGE_FILE_ID = None
\ No newline at end of file
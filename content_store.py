@@ -0,0 +1,254 @@
+import bisect
+import logging
+import mmap
+import os
+import struct
+from collections.abc import Mapping, Sequence
+
+from config import *
+from codec import read_json
+
+logger = logging.getLogger(__name__)
+
+# --- SNAPSHOT FORMAT ---
+# header: magic, version, entry count, blob offset
+# table:  one entry per key, sorted by UTF-8 key bytes:
+#         key offset, key length, value offset, value length, kind (offsets relative to blob start)
+# blob:   UTF-8 keys and values
+# Keys are "/"-joined paths, e.g. "lore/hist_context/sections/fourth_war/title".
+# Dict values hold their child keys joined by KEY_SEPARATOR, list values hold their length.
+MAGIC = b"EVCS"
+VERSION = 1
+HEADER = struct.Struct("<4sHII")
+ENTRY = struct.Struct("<IHIIB")
+KEY_SEPARATOR = "\x1f"
+
+KIND_STR, KIND_DICT, KIND_LIST, KIND_INT, KIND_FLOAT, KIND_BOOL, KIND_NONE = range(7)
+
+# Top-level snapshot sections and the files they are compiled from
+SNAPSHOT_SOURCES = {
+    "lore": LORE_FILE,
+    "missions": MISSIONS_FILE,
+    "secret_missions": SECRET_MISSIONS_FILE,
+}
+
+_MISSING = object()
+
+
+def _flatten(path: str, value, entries: dict) -> None:
+    if isinstance(value, dict):
+        entries[path] = (KIND_DICT, KEY_SEPARATOR.join(value.keys()))
+        for key, item in value.items():
+            _flatten(f"{path}/{key}", item, entries)
+    elif isinstance(value, list):
+        entries[path] = (KIND_LIST, str(len(value)))
+        for index, item in enumerate(value):
+            _flatten(f"{path}/{index}", item, entries)
+    elif isinstance(value, bool):
+        entries[path] = (KIND_BOOL, "1" if value else "")
+    elif isinstance(value, int):
+        entries[path] = (KIND_INT, str(value))
+    elif isinstance(value, float):
+        entries[path] = (KIND_FLOAT, repr(value))
+    elif value is None:
+        entries[path] = (KIND_NONE, "")
+    else:
+        entries[path] = (KIND_STR, str(value))
+
+
+def compile_snapshot(sections: dict, path: str = CONTENT_SNAPSHOT_FILE) -> None:
+    entries = {}
+    for name, data in sections.items():
+        _flatten(name, data, entries)
+
+    blob = bytearray()
+    table = []
+    for key in sorted(entries, key=lambda k: k.encode("utf-8")):
+        kind, value = entries[key]
+        key_bytes, value_bytes = key.encode("utf-8"), value.encode("utf-8")
+        key_offset = len(blob)
+        blob += key_bytes
+        value_offset = len(blob)
+        blob += value_bytes
+        table.append(ENTRY.pack(key_offset, len(key_bytes), value_offset, len(value_bytes), kind))
+
+    blob_offset = HEADER.size + ENTRY.size * len(table)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(table), blob_offset))
+        f.write(b"".join(table))
+        f.write(blob)
+    os.replace(tmp_path, path)
+    logger.info(f"Content snapshot compiled: {len(table)} entries, {len(blob)} bytes of text -> {path}.")
+
+
+def compile_snapshot_from_files(path: str = CONTENT_SNAPSHOT_FILE) -> None:
+    sections = {}
+    for name, source in SNAPSHOT_SOURCES.items():
+        try:
+            sections[name] = read_json(source)
+        except FileNotFoundError:
+            logger.warning(f"File {source} not found, snapshot section '{name}' will be empty.")
+            sections[name] = {}
+    compile_snapshot(sections, path)
+
+
+def ensure_snapshot(path: str = CONTENT_SNAPSHOT_FILE) -> None:
+    """Recompiles the snapshot when it is missing or older than any of its source files."""
+    try:
+        snapshot_mtime = os.stat(path).st_mtime
+    except FileNotFoundError:
+        snapshot_mtime = None
+    sources_mtime = max((os.stat(source).st_mtime for source in SNAPSHOT_SOURCES.values() if os.path.exists(source)),
+                        default=0)
+    if snapshot_mtime is None or sources_mtime > snapshot_mtime:
+        compile_snapshot_from_files(path)
+
+
+class ContentStore:
+    """Read-only view over a memory-mapped content snapshot.
+
+    Values are decoded from the mapping on lookup, so processes that map the same
+    file share a single physical copy through the page cache. Assignments go to a
+    small per-process overlay (e.g. Telegram file_id caching) and never touch the file.
+    """
+
+    def __init__(self, path: str = CONTENT_SNAPSHOT_FILE):
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self._count, self._blob_offset = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} content snapshot.")
+        self.path = path
+        self.overlay = {}
+
+    def close(self) -> None:
+        self._mm.close()
+
+    def _entry(self, index: int) -> tuple:
+        return ENTRY.unpack_from(self._mm, HEADER.size + ENTRY.size * index)
+
+    def _key_at(self, index: int) -> bytes:
+        key_offset, key_len, _, _, _ = self._entry(index)
+        start = self._blob_offset + key_offset
+        return self._mm[start:start + key_len]
+
+    def _find(self, key: str):
+        key_bytes = key.encode("utf-8")
+        index = bisect.bisect_left(_KeyIndex(self), key_bytes)
+        if index < self._count and self._key_at(index) == key_bytes:
+            _, _, value_offset, value_len, kind = self._entry(index)
+            start = self._blob_offset + value_offset
+            return kind, self._mm[start:start + value_len].decode("utf-8")
+        return None
+
+    def lookup(self, key: str, default=_MISSING):
+        if self.overlay:
+            value = self.overlay.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+        found = self._find(key)
+        if found is None:
+            return default
+        kind, raw = found
+        if kind == KIND_STR:
+            return raw
+        if kind == KIND_DICT:
+            return ContentNode(self, key)
+        if kind == KIND_LIST:
+            return ContentList(self, key, int(raw))
+        if kind == KIND_INT:
+            return int(raw)
+        if kind == KIND_FLOAT:
+            return float(raw)
+        if kind == KIND_BOOL:
+            return raw == "1"
+        return None
+
+    def child_keys(self, key: str) -> list[str]:
+        found = self._find(key)
+        keys = found[1].split(KEY_SEPARATOR) if found and found[1] else []
+        prefix = f"{key}/"
+        for overlay_key in self.overlay:
+            if overlay_key.startswith(prefix) and "/" not in overlay_key[len(prefix):]:
+                child = overlay_key[len(prefix):]
+                if child not in keys:
+                    keys.append(child)
+        return keys
+
+    def root(self, name: str) -> "ContentNode":
+        return ContentNode(self, name)
+
+
+class _KeyIndex(Sequence):
+    # Lets bisect search the sorted key table without materializing it.
+    __slots__ = ("_store",)
+
+    def __init__(self, store: ContentStore):
+        self._store = store
+
+    def __len__(self):
+        return self._store._count
+
+    def __getitem__(self, index):
+        return self._store._key_at(index)
+
+
+class ContentNode(Mapping):
+    __slots__ = ("_store", "_path")
+
+    def __init__(self, store: ContentStore, path: str):
+        self._store = store
+        self._path = path
+
+    def __getitem__(self, key):
+        value = self._store.lookup(f"{self._path}/{key}")
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self._store.overlay[f"{self._path}/{key}"] = value
+
+    def __contains__(self, key):
+        return self._store.lookup(f"{self._path}/{key}") is not _MISSING
+
+    def get(self, key, default=None):
+        value = self._store.lookup(f"{self._path}/{key}")
+        return default if value is _MISSING else value
+
+    def __iter__(self):
+        return iter(self._store.child_keys(self._path))
+
+    def __len__(self):
+        return len(self._store.child_keys(self._path))
+
+    def __repr__(self):
+        return f"ContentNode({self._path!r})"
+
+
+class ContentList(Sequence):
+    __slots__ = ("_store", "_path", "_length")
+
+    def __init__(self, store: ContentStore, path: str, length: int):
+        self._store = store
+        self._path = path
+        self._length = length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._length))]
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError(index)
+        return self._store.lookup(f"{self._path}/{index}")
+
+    def __len__(self):
+        return self._length
+
+
+if __name__ == "__main__":
+    # Usage: python content_store.py  -- compiles the snapshot from the lore and mission files
+    logging.basicConfig(format="%(message)s", level=logging.INFO)
+    compile_snapshot_from_files()
@@ -1,6 +1,11 @@
-import json
 import logging
+import os
+import time
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
 from config import *
+from codec import read_json, write_json, DecodeError, BACKEND, VALID_FORMATS, FORMAT_COMPACT
+from callback_codec import encode as encode_callback, CallbackDataError
 
 logger = logging.getLogger(__name__)
 
@@ -11,9 +16,38 @@ missions_data = {}
 secret_missions_data = {}
 message_recipients = []
 
+# Snapshot-backed views of the read-only content, filled when USE_CONTENT_SNAPSHOT is on
+content_store = None
+content_nodes = {}
+
+# Seconds spent loading each file during the last load_data() call
+load_timings = {}
+
+# Bumped whenever player_data may have changed; cached roster views are rebuilt on the next read.
+player_revision = 0
+_roster_views = {}
+_roster_views_revision = -1
+# Bumped whenever missions_data may have changed; keys the rendered mission pages in render_cache.
+missions_revision = 0
+
+# --- SHARDING STATE ---
+# In sharded mode this process owns the players with shard_for(id) == shard_index.
+# Players owned by other shards are kept as a read-through copy (foreign_player_ids).
+shard_index = 0
+shard_count = 1
+foreign_player_ids = set()
+_foreign_snapshots = {}
+_foreign_file_mtimes = {}
+_foreign_update_sink = None
+_base_players_file = PLAYERS_FILE
+
+if DATA_FORMAT not in VALID_FORMATS:
+    logger.warning(f"Unknown DATA_FORMAT '{DATA_FORMAT}', falling back to '{FORMAT_COMPACT}'.")
+    DATA_FORMAT = FORMAT_COMPACT
+
 
 def get_lore_data():
-    return lore_data
+    return content_nodes.get("lore", lore_data)
 
 
 def get_player_data():
@@ -21,87 +55,273 @@ def get_player_data():
 
 
 def get_missions_data():
-    return missions_data
+    return content_nodes.get("missions", missions_data)
 
 
 def get_secret_missions_data():
-    return secret_missions_data
+    return content_nodes.get("secret_missions", secret_missions_data)
 
 
 def get_message_recipients():
     return message_recipients
 
 
-def load_data():
-    global lore_data, player_data, missions_data, message_recipients, secret_missions_data
+def mark_players_changed() -> None:
+    global player_revision
+    player_revision += 1
+
+
+def mark_missions_changed() -> None:
+    global missions_revision
+    missions_revision += 1
 
-    # Load lore data
+
+def player_matches_filter(p_info: dict, filter_key: str) -> bool:
+    """Filter keys: all, active, inactive, secret (has a secret mission), status_<index into VALID_PLAYER_STATUSES>."""
+    if filter_key == "active":
+        return bool(p_info.get("is_active"))
+    if filter_key == "inactive":
+        return not p_info.get("is_active")
+    if filter_key == "secret":
+        return bool(p_info.get("secret_mission_id"))
+    if filter_key.startswith("status_"):
+        return p_info.get("status", STATUS_UNDEFINED) == VALID_PLAYER_STATUSES[int(filter_key[len("status_"):])]
+    return True
+
+
+def get_roster(filter_key: str = "all") -> list[int]:
+    """Player IDs matching filter_key, sorted by character name.
+
+    Views are cached until player_revision changes, so paging through the
+    roster costs O(page size) per page instead of a full sort.
+    """
+    global _roster_views_revision
+    if _roster_views_revision != player_revision:
+        _roster_views.clear()
+        _roster_views_revision = player_revision
+    view = _roster_views.get(filter_key)
+    if view is None:
+        if filter_key == "all":
+            view = [pid for pid, _ in sorted(player_data.items(), key=lambda item: item[1].get('character_name', ''))]
+        else:
+            view = [pid for pid in get_roster("all") if player_matches_filter(player_data[pid], filter_key)]
+        _roster_views[filter_key] = view
+    return view
+
+
+def _load_lore_data():
     try:
-        with open(LORE_FILE, 'r', encoding='utf-8') as f:
-            lore_data = json.load(f)
+        data = read_json(LORE_FILE)
         logger.info(f"Lore data ({LORE_FILE}) loaded successfully.")
+        return data
     except FileNotFoundError:
         logger.error(f"File {LORE_FILE} not found. Please create it.")
-        lore_data = {"error": "Lore data file not found."}
-    except json.JSONDecodeError:
+        return {"error": "Lore data file not found."}
+    except DecodeError:
         logger.error(f"Error decoding JSON in {LORE_FILE}.")
-        lore_data = {"error": "Error reading lore data file."}
+        return {"error": "Error reading lore data file."}
 
-    # Load player data
+
+def _load_player_data():
     try:
-        with open(PLAYERS_FILE, 'r', encoding='utf-8') as f:
-            players_list = json.load(f)
-            player_data = {int(player['telegram_user_id']): player for player in players_list}
+        players_list = read_json(PLAYERS_FILE)
+        data = {int(player['telegram_user_id']): player for player in players_list}
         logger.info(f"Player data ({PLAYERS_FILE}) loaded successfully.")
+        return data
     except FileNotFoundError:
         logger.error(f"File {PLAYERS_FILE} not found. Please create it.")
-        player_data = {}
-    except json.JSONDecodeError:
+        return {}
+    except DecodeError:
         logger.error(f"Error decoding JSON in {PLAYERS_FILE}.")
-        player_data = {}
+        return {}
+
 
-    # Load missions data
+def _load_missions_data():
     try:
-        with open(MISSIONS_FILE, 'r', encoding='utf-8') as f:
-            missions_data = json.load(f)
+        data = read_json(MISSIONS_FILE)
         logger.info(f"Mission data ({MISSIONS_FILE}) loaded successfully.")
+        return data
     except FileNotFoundError:
         logger.error(f"File {MISSIONS_FILE} not found. Please create it.")
-        missions_data = {}
-    except json.JSONDecodeError:
+        return {}
+    except DecodeError:
         logger.error(f"Error decoding JSON in {MISSIONS_FILE}.")
-        missions_data = {}
+        return {}
 
-    # Load secret missions data
+
+def _load_secret_missions_data():
     try:
-        with open(SECRET_MISSIONS_FILE, 'r', encoding='utf-8') as f:
-            secret_missions_data = json.load(f)
+        data = read_json(SECRET_MISSIONS_FILE)
         logger.info(f"Secret mission data ({SECRET_MISSIONS_FILE}) loaded successfully.")
+        return data
     except FileNotFoundError:
         logger.warning(f"File {SECRET_MISSIONS_FILE} not found. No secret missions will be available.")
-        secret_missions_data = {}
-    except json.JSONDecodeError:
+        return {}
+    except DecodeError:
         logger.error(f"Error decoding JSON in {SECRET_MISSIONS_FILE}.")
-        secret_missions_data = {}
+        return {}
+
 
-    # Load recipients data
+def _load_recipients_data():
     try:
-        with open(RECIPIENTS_FILE, 'r', encoding='utf-8') as f:
-            message_recipients = json.load(f)
+        data = read_json(RECIPIENTS_FILE)
         logger.info(f"Recipients list ({RECIPIENTS_FILE}) loaded successfully.")
+        return data
     except FileNotFoundError:
         logger.warning(f"File {RECIPIENTS_FILE} not found. Recipients list will be empty.")
-        message_recipients = []
-    except json.JSONDecodeError:
+        return []
+    except DecodeError:
         logger.error(f"Error decoding JSON in {RECIPIENTS_FILE}.")
-        message_recipients = []
+        return []
+
+
+def _timed(loader):
+    start = time.perf_counter()
+    result = loader()
+    return result, time.perf_counter() - start
+
+
+def _open_content_snapshot():
+    global content_store
+    from content_store import ContentStore, ensure_snapshot, SNAPSHOT_SOURCES
+    ensure_snapshot()
+    if content_store is not None:
+        content_store.close()
+    content_store = ContentStore()
+    content_nodes.update({name: content_store.root(name) for name in SNAPSHOT_SOURCES})
+    logger.info(f"Content snapshot ({content_store.path}) mapped.")
+
+
+def load_data():
+    logger.info(f"Loading data using the {BACKEND} JSON backend.")
+    loaders = {
+        "lore": _load_lore_data,
+        "players": _load_player_data,
+        "missions": _load_missions_data,
+        "secret_missions": _load_secret_missions_data,
+        "recipients": _load_recipients_data,
+    }
+    if USE_CONTENT_SNAPSHOT:
+        # Lore and missions are read straight from the mapped snapshot instead of being parsed.
+        for name in ["lore", "missions", "secret_missions"]:
+            del loaders[name]
+        _open_content_snapshot()
+    with ThreadPoolExecutor(max_workers=len(loaders), thread_name_prefix="load_data") as executor:
+        futures = {name: executor.submit(_timed, loader) for name, loader in loaders.items()}
+        results = {name: future.result() for name, future in futures.items()}
+
+    # Update the containers in place so modules holding a reference to them see the new data.
+    for name, container in [("lore", lore_data), ("players", player_data), ("missions", missions_data),
+                            ("secret_missions", secret_missions_data), ("recipients", message_recipients)]:
+        if name not in results:
+            continue
+        data, seconds = results[name]
+        if isinstance(container, list):
+            container[:] = data
+        else:
+            container.clear()
+            container.update(data)
+        load_timings[name] = seconds
+    mark_players_changed()
+    mark_missions_changed()
+
+    # Re-indexes only the lore pages that changed since the previous load.
+    from lore_search import lore_index
+    lore_index.update(get_lore_data())
+    from render_cache import prerender_missions
+    prerender_missions()
+
+
+def shard_for(user_id: int, count: int) -> int:
+    return user_id % count
+
+
+def shard_players_file(index: int, count: int) -> str:
+    base, ext = os.path.splitext(_base_players_file)
+    return f"{base}.shard-{index}-of-{count}{ext}"
+
+
+def configure_sharding(index: int, count: int, foreign_update_sink) -> None:
+    """Makes this process own one shard of player_data. Call before load_data().
+
+    foreign_update_sink(shard, player_id, changes) is called when this process saves
+    changes to a player owned by another shard.
+    """
+    global shard_index, shard_count, PLAYERS_FILE, _foreign_update_sink
+    PLAYERS_FILE = shard_players_file(index, count)
+    shard_index, shard_count = index, count
+    _foreign_update_sink = foreign_update_sink
+    logger.info(f"Running as shard {index} of {count}, players file {PLAYERS_FILE}.")
+
+
+def refresh_foreign_players() -> None:
+    # Shard files are rewritten atomically on every save, so a changed mtime means fresh data.
+    for index in range(shard_count):
+        if index == shard_index:
+            continue
+        path = shard_players_file(index, shard_count)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            continue
+        if _foreign_file_mtimes.get(path) == mtime:
+            continue
+        try:
+            players_list = read_json(path)
+        except DecodeError:
+            logger.error(f"Error decoding JSON in {path}.")
+            continue
+        _foreign_file_mtimes[path] = mtime
+        for player in players_list:
+            pid = int(player['telegram_user_id'])
+            if pid in player_data and pid not in foreign_player_ids:
+                continue
+            player_data[pid] = player
+            foreign_player_ids.add(pid)
+            _foreign_snapshots[pid] = dict(player)
+        mark_players_changed()
+
+
+def owns_player(player_id: int) -> bool:
+    return shard_count == 1 or shard_for(player_id, shard_count) == shard_index
+
+
+def forward_player_changes(player_id: int, changes: dict) -> None:
+    """Sends changes for a player owned by another shard to that shard and keeps the local copy in step.
+    The owner applies and saves them; this process never writes the player into its own shard file."""
+    player = player_data.setdefault(player_id, {"telegram_user_id": player_id})
+    player.update(changes)
+    foreign_player_ids.add(player_id)
+    _foreign_snapshots[player_id] = dict(player)
+    mark_players_changed()
+    _foreign_update_sink(shard_for(player_id, shard_count), player_id, changes)
+
+
+def apply_foreign_update(player_id: int, changes: dict) -> None:
+    """Applies changes made by another shard to a player owned by this shard."""
+    player_data.setdefault(player_id, {"telegram_user_id": player_id}).update(changes)
+    save_player_data()
+
+
+def _push_foreign_changes() -> None:
+    for pid in foreign_player_ids:
+        player = player_data[pid]
+        snapshot = _foreign_snapshots.get(pid, {})
+        changes = {key: value for key, value in player.items() if key not in snapshot or snapshot[key] != value}
+        if changes:
+            _foreign_update_sink(shard_for(pid, shard_count), pid, changes)
+            _foreign_snapshots[pid] = dict(player)
 
 
 def save_player_data():
+    mark_players_changed()
     try:
-        players_list = list(player_data.values())
-        with open(PLAYERS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(players_list, f, ensure_ascii=False, indent=2)
+        if shard_count > 1:
+            _push_foreign_changes()
+            players_list = [p for pid, p in player_data.items() if pid not in foreign_player_ids]
+        else:
+            players_list = list(player_data.values())
+        write_json(PLAYERS_FILE, players_list, DATA_FORMAT)
         logger.info(f"Player data saved to {PLAYERS_FILE}.")
         return True
     except Exception as e:
@@ -110,9 +330,11 @@ def save_player_data():
 
 
 def save_lore_data():
+    if "lore" in content_nodes:
+        # Snapshot content is read-only; cached file_ids stay in the per-process overlay.
+        return True
     try:
-        with open(LORE_FILE, 'w', encoding='utf-8') as f:
-            json.dump(lore_data, f, ensure_ascii=False, indent=2)
+        write_json(LORE_FILE, lore_data, DATA_FORMAT)
         logger.info(f"Lore data saved to {LORE_FILE}.")
         return True
     except Exception as e:
@@ -121,9 +343,11 @@ def save_lore_data():
 
 
 def save_missions_data():
+    mark_missions_changed()
+    if "missions" in content_nodes:
+        return True
     try:
-        with open(MISSIONS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(missions_data, f, ensure_ascii=False, indent=2)
+        write_json(MISSIONS_FILE, missions_data, DATA_FORMAT)
         logger.info(f"Mission data saved to {MISSIONS_FILE}.")
         return True
     except Exception as e:
@@ -131,12 +355,73 @@ def save_missions_data():
         return False
 
 
+def save_secret_missions_data():
+    if "secret_missions" in content_nodes:
+        return True
+    try:
+        write_json(SECRET_MISSIONS_FILE, secret_missions_data, DATA_FORMAT)
+        logger.info(f"Secret mission data saved to {SECRET_MISSIONS_FILE}.")
+        return True
+    except Exception as e:
+        logger.error(f"Error saving secret mission data: {e}")
+        return False
+
+
 def save_recipients_data():
     try:
-        with open(RECIPIENTS_FILE, 'w', encoding='utf-8') as f:
-            json.dump(message_recipients, f, ensure_ascii=False, indent=2)
+        write_json(RECIPIENTS_FILE, message_recipients, DATA_FORMAT)
         logger.info(f"Recipients list saved to {RECIPIENTS_FILE}.")
         return True
     except Exception as e:
         logger.error(f"Error saving recipients list: {e}")
-        return False
\ No newline at end of file
+        return False
+
+def _local_image_missing(image_url: str | None) -> bool:
+    if not image_url or image_url.startswith("http"):
+        return False
+    return not os.path.exists(os.path.join(BASE_DIR, image_url.lstrip("./")))
+
+
+def validate_data() -> list[str]:
+    """Checks cross-references between the loaded data files and returns a list of problems found."""
+    problems = []
+    lore_data, missions_data, secret_missions_data = get_lore_data(), get_missions_data(), get_secret_missions_data()
+
+    if "error" in lore_data:
+        problems.append(f"Lore: {lore_data['error']}")
+    else:
+        if _local_image_missing(lore_data.get("image_url")):
+            problems.append(f"Lore: image '{lore_data['image_url']}' not found.")
+        nodes = [(key, item) for key, item in lore_data.items() if isinstance(item, Mapping)]
+        while nodes:
+            path, node = nodes.pop()
+            if _local_image_missing(node.get("image_url")):
+                problems.append(f"Lore '{path}': image '{node['image_url']}' not found.")
+            sections = node.get("sections", {})
+            if not isinstance(sections, Mapping):
+                problems.append(f"Lore '{path}': 'sections' must be an object.")
+                continue
+            nodes.extend((f"{path}_sections_{key}", item) for key, item in sections.items() if isinstance(item, Mapping))
+            try:
+                encode_callback("lore", *path.split("_sections_"))
+            except CallbackDataError as e:
+                problems.append(f"Lore '{path}': no button can open it: {e}")
+
+    for mission_id, mission in missions_data.items():
+        if isinstance(mission.get("objectives", []), (str, Mapping)):
+            problems.append(f"Mission '{mission_id}': 'objectives' must be a list.")
+
+    for pid, player in player_data.items():
+        name = player.get("character_name", pid)
+        if player.get("status", STATUS_UNDEFINED) not in VALID_PLAYER_STATUSES:
+            problems.append(f"Player {name} ({pid}): unknown status '{player.get('status')}'.")
+        mission_id = player.get("current_mission_id")
+        if mission_id and mission_id not in missions_data:
+            problems.append(f"Player {name} ({pid}): mission '{mission_id}' not found.")
+        sm_id = player.get("secret_mission_id")
+        if sm_id and sm_id not in secret_missions_data:
+            problems.append(f"Player {name} ({pid}): secret mission '{sm_id}' not found.")
+        if not player.get("character_image_file_id") and _local_image_missing(player.get("character_image_url")):
+            problems.append(f"Player {name} ({pid}): image '{player['character_image_url']}' not found.")
+
+    return problems
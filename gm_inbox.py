@@ -0,0 +1,166 @@
+import logging
+import time
+from collections import OrderedDict
+
+from telegram.ext import Application, ContextTypes
+
+from config import *
+
+logger = logging.getLogger(__name__)
+
+# --- RELAY CATEGORIES ---
+CATEGORY_REGISTRATION = "registration"
+CATEGORY_MESSAGE = "message"
+CATEGORY_ELLI_ALERT = "elli_alert"
+CATEGORY_TECHNOCRAT_ALERT = "technocrat_alert"
+CATEGORY_DEAD = "dead"
+
+CATEGORY_LABELS = {
+    CATEGORY_REGISTRATION: "🆕",
+    CATEGORY_MESSAGE: "✉️",
+    CATEGORY_ELLI_ALERT: "🚨 ELLI",
+    CATEGORY_TECHNOCRAT_ALERT: "💻 TECHNOCRAT",
+    CATEGORY_DEAD: "💀",
+}
+
+MESSAGE_LIMIT = 4096
+
+# sender_id -> [(timestamp, category, text), ...]; senders keep the order of their first buffered message
+_buffer = OrderedDict()
+_buffered_count = 0
+_digest_active = False
+
+
+def _sender_key(sender_id: int | None):
+    return sender_id if sender_id is not None else 0
+
+
+def _format_entry(timestamp: float, category: str, text: str) -> str:
+    return f"[{time.strftime('%H:%M:%S', time.localtime(timestamp))}] {CATEGORY_LABELS.get(category, category)} {text}"
+
+
+def _chunk_sections(sections: list[str]) -> list[str]:
+    # Packs sender sections into as few messages as possible; only a section longer
+    # than one message is split, and then only between its lines.
+    chunks = []
+    current = ""
+    for section in sections:
+        pieces = [section]
+        if len(section) > MESSAGE_LIMIT:
+            pieces, piece = [], ""
+            for line in section.split("\n"):
+                while len(line) > MESSAGE_LIMIT:
+                    if piece:
+                        pieces.append(piece)
+                        piece = ""
+                    pieces.append(line[:MESSAGE_LIMIT])
+                    line = line[MESSAGE_LIMIT:]
+                if piece and len(piece) + 1 + len(line) > MESSAGE_LIMIT:
+                    pieces.append(piece)
+                    piece = ""
+                piece = f"{piece}\n{line}" if piece else line
+            if piece:
+                pieces.append(piece)
+        for piece in pieces:
+            if current and len(current) + 2 + len(piece) > MESSAGE_LIMIT:
+                chunks.append(current)
+                current = ""
+            current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _take(sender_key=None) -> OrderedDict:
+    # Detaches buffered entries (all, or one sender's) before any await, so messages
+    # relayed while a flush is in flight start a fresh buffer instead of being lost.
+    global _buffer, _buffered_count
+    if sender_key is None:
+        taken, _buffer, _buffered_count = _buffer, OrderedDict(), 0
+        return taken
+    taken = OrderedDict()
+    entries = _buffer.pop(sender_key, None)
+    if entries:
+        taken[sender_key] = entries
+        _buffered_count -= len(entries)
+    return taken
+
+
+async def _send_digest(bot, taken: OrderedDict) -> None:
+    if not taken:
+        return
+    total = sum(len(entries) for entries in taken.values())
+    sections = []
+    for entries in taken.values():
+        lines = [_format_entry(*entry) for entry in entries]
+        sections.append("\n".join(lines))
+
+    try:
+        header = await bot.send_message(chat_id=DM_CHAT_ID,
+                                        text=f"📬 Digest: {total} message(s) from {len(taken)} sender(s)")
+    except Exception as e:
+        logger.error(f"Failed to send GM digest header, {total} relayed message(s) lost: {e}")
+        return
+    for chunk in _chunk_sections(sections):
+        try:
+            await bot.send_message(chat_id=DM_CHAT_ID, text=chunk, reply_to_message_id=header.message_id)
+        except Exception as e:
+            logger.error(f"Failed to send GM digest part: {e}")
+
+
+async def flush(bot) -> None:
+    await _send_digest(bot, _take())
+
+
+async def _flush_job(context: ContextTypes.DEFAULT_TYPE) -> None:
+    await flush(context.bot)
+
+
+async def relay_to_gm(context: ContextTypes.DEFAULT_TYPE, text: str, category: str = CATEGORY_MESSAGE,
+                      sender_id: int | None = None) -> None:
+    """Relays a player-originated notice to the GM chat, through the digest buffer when it is enabled.
+
+    Urgent categories are sent right away, after anything already buffered for the
+    same sender, so the GM always sees one sender's messages in order.
+    Raises whatever send_message raises for messages sent immediately.
+    """
+    global _buffered_count
+    if not _digest_active:
+        await context.bot.send_message(chat_id=DM_CHAT_ID, text=text)
+        return
+
+    key = _sender_key(sender_id)
+    if category in GM_DIGEST_URGENT_CATEGORIES:
+        await _send_digest(context.bot, _take(key))
+        await context.bot.send_message(chat_id=DM_CHAT_ID, text=text)
+        return
+
+    _buffer.setdefault(key, []).append((time.time(), category, text))
+    _buffered_count += 1
+    if _buffered_count >= GM_DIGEST_MAX_MESSAGES:
+        await flush(context.bot)
+
+
+def setup_digest(application: Application) -> None:
+    """Starts the periodic digest flush and flushes what is left when the application stops."""
+    global _digest_active
+    if not GM_DIGEST_ENABLED:
+        return
+    if application.job_queue is None:
+        logger.warning("GM digest mode needs the job queue (pip install \"python-telegram-bot[job-queue]\"); "
+                       "relaying GM messages immediately.")
+        return
+    application.job_queue.run_repeating(_flush_job, interval=GM_DIGEST_INTERVAL, first=GM_DIGEST_INTERVAL,
+                                        name="gm_digest_flush")
+
+    previous_post_stop = application.post_stop
+
+    async def flush_on_stop(app: Application) -> None:
+        await flush(app.bot)
+        if previous_post_stop is not None:
+            await previous_post_stop(app)
+
+    application.post_stop = flush_on_stop
+    _digest_active = True
+    logger.info(f"GM digest mode on: flushing every {GM_DIGEST_INTERVAL}s or {GM_DIGEST_MAX_MESSAGES} messages, "
+                f"urgent: {', '.join(sorted(GM_DIGEST_URGENT_CATEGORIES)) or 'none'}.")
@@ -0,0 +1,255 @@
+from telegram.ext import (Application, CommandHandler, MessageHandler, filters, CallbackQueryHandler,
+                          ConversationHandler, InlineQueryHandler, TypeHandler)
+from telegram import Update
+
+from config import *
+from utils import lazy_handler
+from player_handlers import (start_command, lore_command, character_command, mission_command,
+                             send_message_start, choose_recipient, type_message, cancel_send_message,
+                             stale_button_callback)
+from rate_limit import rate_limit_middleware
+from routing import Router
+from callback_codec import pattern as button
+from gm_inbox import setup_digest
+from scenario import setup_scenario
+from comm_policy import load_policy
+from message_log import setup_message_log
+from memory_report import setup_memory_gauges
+from loop_monitor import setup_loop_monitor
+from lore_handlers import lore_callback, lore_main_menu_trigger_callback, lore_search_command, lore_inline_query
+
+
+def admin(func_name: str):
+    # Admin handlers are only needed by the GM, so their module is imported on first admin use.
+    return lazy_handler("admin_handlers", func_name)
+
+
+def register_handlers(application: Application) -> None:
+    # Flood protection runs before every other handler
+    application.add_handler(TypeHandler(Update, rate_limit_middleware), group=-1)
+
+    # Player commands, menu buttons and lore callbacks
+    player_router = Router()
+    player_router.add_command("start", start_command)
+    player_router.add_command("lore", lore_command)
+    player_router.add_command("character", character_command)
+    player_router.add_command("mission", mission_command)
+    player_router.add_command("lore_search", lore_search_command)
+
+    player_router.add_text_prefix("📚 Lore", lore_command)
+    player_router.add_text_prefix("👤 My character", character_command)
+    player_router.add_text_prefix("🎯 My mission", mission_command)
+
+    player_router.add_action("lore_menu", lore_main_menu_trigger_callback)
+    player_router.add_action("lore", lore_callback)
+    application.add_handler(player_router)
+
+    # Lore inline search
+    application.add_handler(InlineQueryHandler(lore_inline_query))
+
+    # Send message conversation
+    send_message_conv_handler = ConversationHandler(
+        entry_points=[
+            CommandHandler("send_message", send_message_start),
+            MessageHandler(filters.Regex("^✉️ Send a message"), send_message_start)
+        ],
+        states={
+            CHOOSE_RECIPIENT: [MessageHandler(filters.TEXT & ~filters.COMMAND, choose_recipient)],
+            TYPE_MESSAGE: [MessageHandler(filters.TEXT & ~filters.COMMAND, type_message)]
+        },
+        fallbacks=[
+            CommandHandler("cancel", cancel_send_message),
+            MessageHandler(filters.Regex(r'(?i)^back$'), cancel_send_message)
+        ],
+    )
+    application.add_handler(send_message_conv_handler)
+
+    # Admin panel navigation
+    admin_panel_router = Router()
+    admin_panel_router.add_command("admin", admin("admin_panel_command"))
+    admin_panel_router.add_text_prefix("⚙️ Admin Panel", admin("admin_panel_command"))
+    admin_panel_router.add_text_prefix("⬅️ Back to Main Menu", admin("back_to_main_menu_command"))
+    application.add_handler(admin_panel_router)
+
+    # Admin player activation/deactivation
+    admin_player_action_conv = ConversationHandler(
+        entry_points=[
+            CommandHandler("admin_activate_player", admin("admin_activate_player_start")),
+            MessageHandler(filters.Text(["Activate Player"]), admin("admin_activate_player_start")),
+            CommandHandler("admin_deactivate_player", admin("admin_deactivate_player_start")),
+            MessageHandler(filters.Text(["Deactivate Player"]), admin("admin_deactivate_player_start"))
+        ],
+        states={
+            SELECT_PLAYER_FOR_ACTION: [
+                CallbackQueryHandler(admin("process_player_action_selection"),
+                                     pattern=button("activate", "deactivate", "activate_cancel", "deactivate_cancel"))
+            ]
+        },
+        fallbacks=[
+            CallbackQueryHandler(admin("cancel_admin_action"), pattern=button("activate_cancel", "deactivate_cancel")),
+            CommandHandler("cancel", admin("cancel_admin_action"))
+        ],
+        conversation_timeout=300
+    )
+    application.add_handler(admin_player_action_conv)
+
+    # Admin Set Player Status Conversation
+    admin_set_status_conv = ConversationHandler(
+        entry_points=[
+            CommandHandler("admin_set_player_status", admin("admin_set_player_status_start")),
+            MessageHandler(filters.Text(["Set Player Status"]), admin("admin_set_player_status_start"))
+        ],
+        states={
+            SELECT_PLAYER_FOR_STATUS: [CallbackQueryHandler(admin("set_player_status_select_player"),
+                                                            pattern=button("setstatus", "setstatus_cancel"))],
+            SELECT_NEW_STATUS: [CallbackQueryHandler(admin("set_player_status_select_new_status"),
+                                                     pattern=button("setstatus_set", "setstatus_cancel"))]
+        },
+        fallbacks=[
+            CallbackQueryHandler(admin("cancel_set_player_status"), pattern=button("setstatus_cancel")),
+            CommandHandler("cancel", admin("cancel_set_player_status"))
+        ],
+        conversation_timeout=300
+    )
+    application.add_handler(admin_set_status_conv)
+
+    # Admin Set Secret Mission Conversation
+    admin_set_secret_mission_conv = ConversationHandler(
+        entry_points=[
+            CommandHandler("admin_set_secret_mission", admin("admin_set_secret_mission_start")),
+            MessageHandler(filters.Text(["Set Secret Mission"]), admin("admin_set_secret_mission_start"))
+        ],
+        states={
+            SELECT_PLAYER_FOR_SECRET_MISSION: [
+                CallbackQueryHandler(admin("secret_mission_select_player"),
+                                     pattern=button("secretmission", "secretmission_cancel"))
+            ],
+            CHOOSE_SECRET_MISSION: [
+                CallbackQueryHandler(admin("secret_mission_choose_mission"),
+                                     pattern=button("secretmission_set", "secretmission_clear", "secretmission_none",
+                                                    "secretmission_cancel"))
+            ]
+        },
+        fallbacks=[
+            CallbackQueryHandler(admin("cancel_admin_action"), pattern=button("secretmission_cancel")),
+            CommandHandler("cancel", admin("cancel_admin_action"))
+        ],
+        conversation_timeout=300
+    )
+    application.add_handler(admin_set_secret_mission_conv)
+
+    # Admin broadcast conversation
+    admin_broadcast_conv = ConversationHandler(
+        entry_points=[
+            CommandHandler("admin_broadcast", admin("admin_broadcast_start")),
+            MessageHandler(filters.Text(["Broadcast Message"]), admin("admin_broadcast_start"))
+        ],
+        states={
+            CHOOSE_BROADCAST_TARGET: [CallbackQueryHandler(admin("broadcast_choose_target"),
+                                                           pattern=button("broadcast_target"))],
+            TYPE_BROADCAST_SENDER_NAME: [MessageHandler(filters.TEXT & ~filters.COMMAND, admin("broadcast_type_sender"))],
+            TYPE_BROADCAST_MESSAGE_TEXT: [MessageHandler(filters.TEXT & ~filters.COMMAND, admin("broadcast_type_message"))],
+            CONFIRM_BROADCAST_SEND: [CallbackQueryHandler(admin("broadcast_confirm_send"),
+                                                          pattern=button("broadcast_confirm_yes", "broadcast_confirm_no"))]
+        },
+        fallbacks=[
+            CallbackQueryHandler(admin("broadcast_cancel"), pattern=button("broadcast_cancel")),
+            CommandHandler("cancel", admin("broadcast_cancel"))
+        ],
+        conversation_timeout=300
+    )
+    application.add_handler(admin_broadcast_conv)
+
+    # Admin direct message conversation
+    admin_direct_message_conv = ConversationHandler(
+        entry_points=[
+            CommandHandler("admin_direct_message", admin("admin_direct_message_start")),
+            MessageHandler(filters.Text(["Send Direct Message"]), admin("admin_direct_message_start"))
+        ],
+        states={
+            SELECT_DM_PLAYER: [CallbackQueryHandler(admin("direct_message_select_player"),
+                                                    pattern=button("dmselect", "dmselect_cancel"))],
+            TYPE_DM_SENDER_NAME: [MessageHandler(filters.TEXT & ~filters.COMMAND, admin("direct_message_type_sender_name"))],
+            TYPE_DM_MESSAGE_TEXT: [MessageHandler(filters.TEXT & ~filters.COMMAND, admin("direct_message_type_text"))],
+            CONFIRM_DM_SEND: [CallbackQueryHandler(admin("direct_message_confirm_send"),
+                                                   pattern=button("dm_confirm_yes", "dm_confirm_no"))]
+        },
+        fallbacks=[
+            CallbackQueryHandler(admin("direct_message_cancel"), pattern=button("dmselect_cancel")),
+            CommandHandler("cancel", admin("direct_message_cancel"))
+        ],
+        conversation_timeout=300
+    )
+    application.add_handler(admin_direct_message_conv)
+
+    # Admin Bulk Actions Conversation
+    admin_bulk_conv = ConversationHandler(
+        entry_points=[
+            CommandHandler("admin_bulk", admin("admin_bulk_start")),
+            MessageHandler(filters.Text(["Bulk Actions"]), admin("admin_bulk_start"))
+        ],
+        states={
+            BULK_SELECT_PLAYERS: [CallbackQueryHandler(admin("bulk_select_players"), pattern=button(
+                "bulk_toggle", "bulk_page", "bulk_filter", "bulk_all", "bulk_none", "bulk_action", "bulk_cancel"))],
+            BULK_CHOOSE_STATUS: [CallbackQueryHandler(admin("bulk_choose_status"),
+                                                      pattern=button("bulkstatus", "bulkstatus_back"))],
+            BULK_CHOOSE_SECRET_MISSION: [CallbackQueryHandler(admin("bulk_choose_secret_mission"),
+                                                            pattern=button("bulksm_set", "bulksm_clear", "bulksm_back"))]
+        },
+        fallbacks=[CommandHandler("cancel", admin("bulk_cancel"))],
+        conversation_timeout=600
+    )
+    application.add_handler(admin_bulk_conv)
+
+    # Admin Import Conversation
+    admin_import_conv = ConversationHandler(
+        entry_points=[CommandHandler("admin_import", admin("admin_import_start"))],
+        states={
+            IMPORT_WAIT_FILE: [MessageHandler(filters.Document.ALL, admin("import_receive_file"))],
+            IMPORT_CONFIRM: [CallbackQueryHandler(admin("import_confirm"),
+                                                  pattern=button("import_confirm_yes", "import_confirm_no"))]
+        },
+        fallbacks=[CommandHandler("cancel", admin("import_cancel"))],
+        conversation_timeout=600
+    )
+    application.add_handler(admin_import_conv)
+
+    # Other admin commands
+    admin_router = Router()
+    admin_router.add_command("admin_list_players", admin("admin_list_players_command"))
+    admin_router.add_text("List Players", admin("admin_list_players_command"))
+    admin_router.add_action("roster", admin("roster_page_callback"))
+
+    admin_router.add_command("admin_update_mission", admin("admin_update_mission_command"))
+    admin_router.add_text("Update Mission", admin("admin_update_mission_command"))
+
+    admin_router.add_command("admin_update_character", admin("admin_update_character_command"))
+    admin_router.add_text("Update Character", admin("admin_update_character_command"))
+
+    admin_router.add_command("admin_recipients", admin("admin_recipients_command"))
+    admin_router.add_text("Manage Recipients", admin("admin_recipients_command"))
+
+    admin_router.add_command("admin_export", admin("admin_export_command"))
+    admin_router.add_command("admin_history", admin("admin_history_command"))
+    admin_router.add_command("admin_history_npc", admin("admin_history_npc_command"))
+    admin_router.add_command("admin_scenario", admin("admin_scenario_command"))
+    admin_router.add_command("admin_policy", admin("admin_policy_command"))
+    admin_router.add_command("admin_memory", admin("admin_memory_command"))
+    admin_router.add_command("admin_loop", admin("admin_loop_command"))
+    application.add_handler(admin_router)
+
+    # Buttons nothing above accepted: forged, from before a key change, or from an expired conversation
+    application.add_handler(CallbackQueryHandler(stale_button_callback))
+
+    # GM inbox digest flush (no-op unless GM_DIGEST_ENABLED)
+    setup_digest(application)
+    # Communication policy: read once at boot so a bad file is reported now; /admin_policy reload re-reads it
+    load_policy()
+    # Message history index directory, created once instead of on every relayed message
+    setup_message_log(application)
+    # Resume a running scenario timeline from its saved cursor
+    setup_scenario(application)
+    # Periodic memory gauge log line (no-op unless MEMORY_GAUGE_INTERVAL)
+    setup_memory_gauges(application)
+    # Event loop lag sampling and stall capture (no-op unless LOOP_MONITOR_ENABLED)
+    setup_loop_monitor(application)
@@ -1,12 +1,30 @@
+from collections.abc import Mapping
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, ReplyKeyboardMarkup
 import logging
 from utils import is_admin
 from data_manager import get_lore_data, get_player_data, get_secret_missions_data, get_message_recipients
-from config import VALID_PLAYER_STATUSES
+from config import VALID_PLAYER_STATUSES, BULK_PAGE_SIZE
+from callback_codec import encode, register_vocabulary
 
 logger = logging.getLogger(__name__)
 
 
+def _lore_keys(node) -> list[str]:
+    keys = []
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Mapping):
+            keys.extend(node)
+            stack.extend(node.values())
+    return keys
+
+
+# Strings that long buttons carry as digests: lore keys and secret mission IDs
+register_vocabulary(lambda: _lore_keys(get_lore_data()))
+register_vocabulary(lambda: list(get_secret_missions_data()))
+
+
 def get_main_reply_keyboard(user_id: int) -> ReplyKeyboardMarkup:
     keyboard = [
         ["📚 Lore"],
@@ -24,6 +42,7 @@ def get_admin_panel_keyboard() -> ReplyKeyboardMarkup:
         ["Set Player Status", "Set Secret Mission"],
         ["Broadcast Message", "Send Direct Message"],
         ["Update Mission", "Update Character", "Manage Recipients"],
+        ["Bulk Actions"],
         ["⬅️ Back to Main Menu"]
     ]
     return ReplyKeyboardMarkup(keyboard, resize_keyboard=True, one_time_keyboard=True)
@@ -35,13 +54,11 @@ def get_lore_main_menu_keyboard() -> InlineKeyboardMarkup | None:
     if "error" in lore_data:
         return None
     for key, item in lore_data.items():
-        if isinstance(item, dict) and "title" in item:
-            cb_key = f"lore_{key}"
-            keyboard_buttons.append([InlineKeyboardButton(item["title"], callback_data=cb_key[:60])])
+        if isinstance(item, Mapping) and "title" in item:
+            keyboard_buttons.append([InlineKeyboardButton(item["title"], callback_data=encode("lore", key))])
         elif isinstance(item, str) and key == "introduction":
-            cb_key = f"lore_{key}"
             keyboard_buttons.append(
-                [InlineKeyboardButton("📜 Introduction to Eventide: Eclipse", callback_data=cb_key[:60])])
+                [InlineKeyboardButton("📜 Introduction to Eventide: Eclipse", callback_data=encode("lore", key))])
     return InlineKeyboardMarkup(keyboard_buttons) if keyboard_buttons else None
 
 
@@ -70,20 +87,16 @@ def get_player_selection_keyboard(action_prefix: str,
                 button_text += f" (SM: {secret_missions_data[current_secret_id].get('title', current_secret_id)[:10]}...)"
             elif current_secret_id:
                 button_text += f" (SM: ID {current_secret_id})"
-        callback_data = f"{action_prefix}_{pid}"
-        if len(callback_data) > 60:
-            logger.warning(f"Callback data for player {pid} too long for action {action_prefix}, might be truncated.")
-        buttons.append([InlineKeyboardButton(button_text, callback_data=callback_data[:60])])
-    buttons.append([InlineKeyboardButton("Cancel Action", callback_data=f"{action_prefix}_cancel")])
+        buttons.append([InlineKeyboardButton(button_text, callback_data=encode(action_prefix, pid))])
+    buttons.append([InlineKeyboardButton("Cancel Action", callback_data=encode(f"{action_prefix}_cancel"))])
     return InlineKeyboardMarkup(buttons) if buttons else None
 
 
 def get_status_selection_keyboard(player_id: int) -> InlineKeyboardMarkup:
     buttons = []
-    for status_val in VALID_PLAYER_STATUSES:
-        encoded_status = status_val.replace('(', '').replace(')', '').replace(' ', '_').lower()
-        buttons.append([InlineKeyboardButton(status_val, callback_data=f"setstatus_{player_id}_{encoded_status}")])
-    buttons.append([InlineKeyboardButton("Cancel Status Change", callback_data=f"setstatus_{player_id}_cancel")])
+    for index, status_val in enumerate(VALID_PLAYER_STATUSES):
+        buttons.append([InlineKeyboardButton(status_val, callback_data=encode("setstatus_set", player_id, index))])
+    buttons.append([InlineKeyboardButton("Cancel Status Change", callback_data=encode("setstatus_cancel"))])
     return InlineKeyboardMarkup(buttons)
 
 
@@ -92,31 +105,85 @@ def get_secret_mission_selection_keyboard(player_id: int) -> InlineKeyboardMarku
 
     buttons = []
     if not secret_missions_data:
-        buttons.append([InlineKeyboardButton("No secret missions defined.", callback_data="secretmission_none")])
+        buttons.append([InlineKeyboardButton("No secret missions defined.", callback_data=encode("secretmission_none"))])
     else:
         for sm_id, sm_data in secret_missions_data.items():
             title = sm_data.get("title", f"Mission {sm_id}")
-            callback_data = f"secretmission_set_{player_id}_{sm_id}"
-            if len(callback_data) > 60:
-                logger.warning(f"Callback data for secret mission {sm_id} too long, might be truncated.")
-            buttons.append([InlineKeyboardButton(title[:40], callback_data=callback_data[:60])])
+            buttons.append([InlineKeyboardButton(title[:40], callback_data=encode("secretmission_set", player_id, sm_id))])
     buttons.append([InlineKeyboardButton("--- Clear Secret Mission for Player ---",
-                                         callback_data=f"secretmission_set_{player_id}_clear")])
-    buttons.append([InlineKeyboardButton("Cancel", callback_data=f"secretmission_set_{player_id}_cancel_selection")])
+                                         callback_data=encode("secretmission_clear", player_id))])
+    buttons.append([InlineKeyboardButton("Cancel", callback_data=encode("secretmission_cancel"))])
+    return InlineKeyboardMarkup(buttons)
+
+
+def get_bulk_selection_keyboard(players: list, selected: set, filter_label: str,
+                                page: int) -> InlineKeyboardMarkup:
+    """Checkbox list for one page of `players` ((pid, info) pairs, already filtered and sorted) plus bulk controls."""
+    pages = max(1, -(-len(players) // BULK_PAGE_SIZE))
+    page = min(max(page, 0), pages - 1)
+    buttons = []
+    for pid, p_info in players[page * BULK_PAGE_SIZE:(page + 1) * BULK_PAGE_SIZE]:
+        mark = "☑️" if pid in selected else "⬜"
+        activity = "Active" if p_info.get('is_active') else "Inactive"
+        button_text = f"{mark} {p_info.get('character_name', f'Player {pid}')} - {activity}, {p_info.get('status', 'Undefined')}"
+        buttons.append([InlineKeyboardButton(button_text, callback_data=encode("bulk_toggle", pid))])
+    if pages > 1:
+        buttons.append([InlineKeyboardButton("◀️", callback_data=encode("bulk_page", (page - 1) % pages)),
+                        InlineKeyboardButton(f"{page + 1}/{pages}", callback_data=encode("bulk_page", page)),
+                        InlineKeyboardButton("▶️", callback_data=encode("bulk_page", (page + 1) % pages))])
+    buttons.append([InlineKeyboardButton(f"Filter: {filter_label}", callback_data=encode("bulk_filter")),
+                    InlineKeyboardButton("Select shown", callback_data=encode("bulk_all")),
+                    InlineKeyboardButton("Clear", callback_data=encode("bulk_none"))])
+    buttons.append([InlineKeyboardButton("✅ Activate", callback_data=encode("bulk_action", "activate")),
+                    InlineKeyboardButton("⛔ Deactivate", callback_data=encode("bulk_action", "deactivate"))])
+    buttons.append([InlineKeyboardButton("Set status", callback_data=encode("bulk_action", "status")),
+                    InlineKeyboardButton("Set secret mission", callback_data=encode("bulk_action", "secret"))])
+    buttons.append([InlineKeyboardButton("Cancel", callback_data=encode("bulk_cancel"))])
+    return InlineKeyboardMarkup(buttons)
+
+
+def get_roster_page_keyboard(filter_index: int, filter_label: str, page: int, pages: int,
+                             filter_count: int) -> InlineKeyboardMarkup:
+    buttons = []
+    if pages > 1:
+        buttons.append([InlineKeyboardButton("◀️", callback_data=encode("roster", filter_index, (page - 1) % pages)),
+                        InlineKeyboardButton(f"{page + 1}/{pages}", callback_data=encode("roster", filter_index, page)),
+                        InlineKeyboardButton("▶️", callback_data=encode("roster", filter_index, (page + 1) % pages))])
+    buttons.append([InlineKeyboardButton(f"Filter: {filter_label}",
+                                         callback_data=encode("roster", (filter_index + 1) % filter_count, 0)),
+                    InlineKeyboardButton("🔄 Refresh", callback_data=encode("roster", filter_index, page))])
+    return InlineKeyboardMarkup(buttons)
+
+
+def get_bulk_status_keyboard() -> InlineKeyboardMarkup:
+    buttons = [[InlineKeyboardButton(status_val, callback_data=encode("bulkstatus", index))]
+               for index, status_val in enumerate(VALID_PLAYER_STATUSES)]
+    buttons.append([InlineKeyboardButton("⬅️ Back to selection", callback_data=encode("bulkstatus_back"))])
+    return InlineKeyboardMarkup(buttons)
+
+
+def get_bulk_secret_mission_keyboard() -> InlineKeyboardMarkup:
+    secret_missions_data = get_secret_missions_data()
+    buttons = []
+    for sm_id, sm_data in secret_missions_data.items():
+        buttons.append([InlineKeyboardButton(sm_data.get("title", f"Mission {sm_id}")[:40],
+                                             callback_data=encode("bulksm_set", sm_id))])
+    buttons.append([InlineKeyboardButton("--- Clear Secret Mission ---", callback_data=encode("bulksm_clear"))])
+    buttons.append([InlineKeyboardButton("⬅️ Back to selection", callback_data=encode("bulksm_back"))])
     return InlineKeyboardMarkup(buttons)
 
 
 def get_broadcast_target_keyboard() -> InlineKeyboardMarkup:
-    keyboard = [[InlineKeyboardButton("All Players", callback_data="broadcast_target_all")],
-                [InlineKeyboardButton("Active Players Only", callback_data="broadcast_target_active")],
-                [InlineKeyboardButton("Inactive Players Only", callback_data="broadcast_target_inactive")],
-                [InlineKeyboardButton("Cancel Broadcast", callback_data="broadcast_cancel")]]
+    keyboard = [[InlineKeyboardButton("All Players", callback_data=encode("broadcast_target", "all"))],
+                [InlineKeyboardButton("Active Players Only", callback_data=encode("broadcast_target", "active"))],
+                [InlineKeyboardButton("Inactive Players Only", callback_data=encode("broadcast_target", "inactive"))],
+                [InlineKeyboardButton("Cancel Broadcast", callback_data=encode("broadcast_cancel"))]]
     return InlineKeyboardMarkup(keyboard)
 
 
-def get_confirmation_keyboard(yes_callback: str, no_callback: str) -> InlineKeyboardMarkup:
-    keyboard = [[InlineKeyboardButton("Yes, proceed", callback_data=yes_callback)],
-                [InlineKeyboardButton("No, cancel", callback_data=no_callback)]]
+def get_confirmation_keyboard(yes_action: str, no_action: str) -> InlineKeyboardMarkup:
+    keyboard = [[InlineKeyboardButton("Yes, proceed", callback_data=encode(yes_action))],
+                [InlineKeyboardButton("No, cancel", callback_data=encode(no_action))]]
     return InlineKeyboardMarkup(keyboard)
 
 
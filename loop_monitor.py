@@ -0,0 +1,233 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+from telegram.ext import Application
+
+from config import *
+
+logger = logging.getLogger(__name__)
+
+# Upper bucket bounds of the lag histogram, in milliseconds; one more bucket counts everything above
+LAG_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+STALL_HISTORY = 20
+STACK_LINES = 12
+# Frames from these modules are plumbing between PTB and the handler that actually runs
+_WRAPPER_MODULES = {"routing", "utils", "rate_limit", "loop_monitor"}
+_ASYNCIO_DIR = os.path.dirname(asyncio.__file__)
+
+
+class LagHistogram:
+    """Loop lag samples counted per bucket, plus their count, sum and max."""
+
+    def __init__(self, bounds_ms: tuple = LAG_BUCKETS_MS):
+        self.bounds_ms = bounds_ms
+        self.reset()
+
+    def reset(self) -> None:
+        self.buckets = [0] * (len(self.bounds_ms) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        milliseconds = seconds * 1000
+        index = 0
+        while index < len(self.bounds_ms) and milliseconds > self.bounds_ms[index]:
+            index += 1
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q: float) -> float | None:
+        """Upper bound in seconds of the bucket holding the q-quantile; the max for the overflow bucket."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank and count:
+                return self.bounds_ms[index] / 1000 if index < len(self.bounds_ms) else self.max
+        return self.max
+
+
+class LoopMonitor:
+    """Measures event loop lag with a sleeping task and catches long stalls from a watchdog thread.
+
+    The task stamps a heartbeat before every sleep; the lag is how late the sleep returns. While the
+    loop is blocked the heartbeat stops moving, so the watchdog thread sees it fall behind and grabs
+    the loop thread's stack at that moment, which is the code doing the blocking. When the loop
+    recovers, the task records the stall with its measured length and alerts the GM.
+    """
+
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL, threshold: float = LOOP_LAG_THRESHOLD,
+                 alert_interval: float = LOOP_ALERT_INTERVAL):
+        self.interval = interval
+        self.threshold = threshold
+        self.alert_interval = alert_interval
+        self.histogram = LagHistogram()
+        self.stalls = deque(maxlen=STALL_HISTORY)
+        self.stall_count = 0
+        self._beat = time.monotonic()
+        self._captured_beat = None
+        self._capture = None
+        self._loop_thread_id = None
+        self._task = None
+        self._watchdog = None
+        self._stop = threading.Event()
+        self._last_alert = float("-inf")
+        self._suppressed = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, application: Application) -> None:
+        """Starts the lag task on the running loop and the watchdog thread."""
+        self._loop_thread_id = threading.get_ident()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._measure(application), name="loop_monitor")
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    # --- loop side ---
+    async def _measure(self, application: Application) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            self._beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - started - self.interval)
+            self.histogram.observe(lag)
+            capture, self._capture = self._capture, None
+            if capture is not None and lag >= self.threshold:
+                self._record_stall(application, lag, *capture)
+
+    def _record_stall(self, application: Application, lag: float, handler: str, stack: str) -> None:
+        self.stall_count += 1
+        self.stalls.append({"at": time.time(), "lag": lag, "handler": handler, "stack": stack})
+        logger.warning(f"Event loop blocked for {lag:.2f}s in {handler}:\n{stack}")
+        now = time.monotonic()
+        if now - self._last_alert < self.alert_interval:
+            self._suppressed += 1
+            return
+        self._last_alert = now
+        text = f"⚠️ Event loop blocked for {lag:.2f}s in {handler}."
+        if self._suppressed:
+            text += f"\n{self._suppressed} more stall(s) since the last alert, see /admin_loop."
+        self._suppressed = 0
+        text += "\n\n" + stack[-3000:]
+        application.create_task(_send_alert(application, text), name="loop_monitor_alert")
+
+    # --- watchdog thread ---
+    def _watch(self) -> None:
+        while not self._stop.wait(self.threshold / 2):
+            beat = self._beat
+            if beat == self._captured_beat or time.monotonic() - beat - self.interval < self.threshold:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            self._captured_beat = beat
+            # asyncio's own frames are the same for every stall
+            frames = [entry for entry in traceback.extract_stack(frame) if _ASYNCIO_DIR not in entry.filename]
+            self._capture = (_running_handler(frame), "".join(traceback.format_list(frames[-STACK_LINES:])))
+            del frame
+
+    # --- reporting ---
+    def gauges(self) -> dict[str, float]:
+        """Flat name -> value readings of the histogram, Prometheus-style cumulative buckets."""
+        values = {"loop.lag_count": self.histogram.count, "loop.lag_sum_seconds": round(self.histogram.total, 6),
+                  "loop.lag_max_seconds": round(self.histogram.max, 6), "loop.stalls": self.stall_count}
+        cumulative = 0
+        for bound, count in zip(self.histogram.bounds_ms, self.histogram.buckets):
+            cumulative += count
+            values[f"loop.lag_bucket_le_{bound}ms"] = cumulative
+        return values
+
+    def format_report(self) -> str:
+        histogram = self.histogram
+        if not self.running:
+            return "⏱ Event loop monitor is off (LOOP_MONITOR_ENABLED)."
+        lines = [f"⏱ Event loop lag: {histogram.count} samples every {self.interval * 1000:.0f} ms, "
+                 f"stall threshold {self.threshold:.2f}s"]
+        if histogram.count:
+            p50, p99 = histogram.quantile(0.5), histogram.quantile(0.99)
+            lines.append(f"p50 ≤ {p50 * 1000:.0f} ms, p99 ≤ {p99 * 1000:.0f} ms, "
+                         f"max {histogram.max * 1000:.0f} ms, mean {histogram.total / histogram.count * 1000:.1f} ms")
+            lower = 0
+            for bound, count in zip((*histogram.bounds_ms, None), histogram.buckets):
+                if count:
+                    lines.append(f"  {lower}–{bound} ms: {count}" if bound is not None else f"  > {lower} ms: {count}")
+                lower = bound
+        lines.append(f"\nStalls: {self.stall_count}")
+        for stall in reversed(self.stalls):
+            when = time.strftime("%m-%d %H:%M:%S", time.localtime(stall["at"]))
+            lines.append(f"[{when}] {stall['lag']:.2f}s in {stall['handler']}")
+            # The innermost frame: the line that was blocking
+            lines.extend(f"    {line.strip()}" for line in stall["stack"].strip().splitlines()[-2:])
+        return "\n".join(lines)
+
+    def reset(self) -> None:
+        self.histogram.reset()
+        self.stalls.clear()
+        self.stall_count = 0
+
+
+monitor = LoopMonitor()
+
+
+def _running_handler(frame) -> str:
+    """module.function of the outermost frame from this project's code, skipping wrapper modules."""
+    handler = None
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(BASE_DIR) and "site-packages" not in filename:
+            module = os.path.splitext(os.path.relpath(filename, BASE_DIR))[0].replace(os.sep, ".")
+            if module not in _WRAPPER_MODULES:
+                handler = f"{module}.{frame.f_code.co_qualname}"
+        frame = frame.f_back
+    return handler or "library code (no handler frame)"
+
+
+async def _send_alert(application: Application, text: str) -> None:
+    try:
+        await application.bot.send_message(chat_id=DM_CHAT_ID, text=text)
+    except Exception as e:
+        logger.error(f"Could not send the event loop alert: {e}")
+
+
+def setup_loop_monitor(application: Application) -> None:
+    """Starts the monitor once the application is initialized and stops it when the application stops."""
+    if not LOOP_MONITOR_ENABLED:
+        return
+    previous_post_init = application.post_init
+    previous_post_stop = application.post_stop
+
+    async def start_monitor(app: Application) -> None:
+        monitor.start(app)
+        logger.info(f"Event loop monitor on: sampling every {monitor.interval * 1000:.0f} ms, "
+                    f"alerting on stalls over {monitor.threshold:.2f}s.")
+        if previous_post_init is not None:
+            await previous_post_init(app)
+
+    async def stop_monitor(app: Application) -> None:
+        monitor.stop()
+        if previous_post_stop is not None:
+            await previous_post_stop(app)
+
+    application.post_init = start_monitor
+    application.post_stop = stop_monitor
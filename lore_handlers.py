@@ -1,29 +1,180 @@
-import os
+import asyncio
+import html
 import logging
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from collections.abc import Mapping, Sequence
+from telegram import (Update, InlineKeyboardButton, InlineKeyboardMarkup, InputMediaPhoto, Message,
+                      InlineQueryResultArticle, InputTextMessageContent)
+from telegram.error import BadRequest
 from telegram.ext import ContextTypes
 from telegram.constants import ParseMode
 from data_manager import get_lore_data, save_lore_data
-from config import BASE_DIR
 from data_manager import lore_data, save_lore_data
 from utils import is_admin, is_player_active
 from keyboards import get_lore_main_menu_keyboard
+from lore_search import lore_index
+from callback_codec import encode, decode, CallbackDataError
+from assets import load_input_file, resolve_local_path
 
 logger = logging.getLogger(__name__)
 
+# Telegram limit for photo captions; longer lore pages are sent as a photo followed by a text message.
+CAPTION_LIMIT = 1024
+SEARCH_RESULTS_LIMIT = 10
+INLINE_CACHE_SECONDS = 30
+# Telegram accepts 2-10 photos per media group
+MEDIA_GROUP_LIMIT = 10
+# chat_data key holding the message IDs of the last lore album sent to the chat
+LORE_ALBUM_KEY = "lore_album"
 
-async def lore_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    query = update.callback_query
-    user_id = query.from_user.id
 
-    if not is_admin(user_id) and not is_player_active(user_id):
-        await query.answer("Your account is awaiting activation by the Game Master.", show_alert=True)
+def _is_not_modified(error: BadRequest) -> bool:
+    # Pressing the button of the page already shown makes Telegram reject the identical edit.
+    return "not modified" in str(error).lower()
+
+
+
+async def show_lore_view(query, context: ContextTypes.DEFAULT_TYPE, text: str,
+                         reply_markup: InlineKeyboardMarkup | None, photo=None) -> Message | None:
+    """Shows a lore page in place of the message whose button was pressed.
+
+    The message is edited when the page keeps its type (text stays text, photo stays photo),
+    which costs one API call. It is deleted and resent only when the type has to change (the Bot
+    API cannot edit a text message into a photo or drop a message's photo) or the text does not
+    fit into a caption. Returns the message carrying the photo, if one was sent.
+    """
+    message = query.message
+    if message is None:
+        # Inline messages can only be edited as text.
+        photo = None
+    chat_id = message.chat_id if message else None
+    is_photo_message = bool(message and message.photo)
+    deleted = False
+
+    if photo is not None:
+        try:
+            if len(text) <= CAPTION_LIMIT:
+                media = InputMediaPhoto(photo, caption=text, parse_mode=ParseMode.HTML)
+                if is_photo_message:
+                    try:
+                        return await query.edit_message_media(media, reply_markup=reply_markup)
+                    except BadRequest as e:
+                        if _is_not_modified(e):
+                            return None
+                        raise
+                await message.delete()
+                deleted = True
+                return await context.bot.send_photo(chat_id=chat_id, photo=photo, caption=text,
+                                                    parse_mode=ParseMode.HTML, reply_markup=reply_markup)
+            await message.delete()
+            deleted = True
+            photo_message = await context.bot.send_photo(chat_id=chat_id, photo=photo)
+        except Exception as e_photo:
+            logger.error(f"Failed to show lore photo: {e_photo}")
+            photo_message = None
+            if not deleted:
+                # The old page is still there; the text page below replaces it rather than adding a second one.
+                await message.delete()
+        await context.bot.send_message(chat_id=chat_id, text=text, reply_markup=reply_markup,
+                                       parse_mode=ParseMode.HTML)
+        return photo_message
+
+    if is_photo_message:
+        await message.delete()
+        deleted = True
+    if deleted:
+        await context.bot.send_message(chat_id=chat_id, text=text, reply_markup=reply_markup,
+                                       parse_mode=ParseMode.HTML)
+        return None
+    try:
+        await query.edit_message_text(text=text, reply_markup=reply_markup, parse_mode=ParseMode.HTML)
+    except BadRequest as e:
+        if not _is_not_modified(e):
+            raise
+    return None
+
+
+def get_album_images(image_container: Mapping | None) -> Sequence | None:
+    """The node's "images" list when it holds an album (two or more images), else None.
+
+    Items are {"image_url": ..., "image_file_id": ...} objects; a plain string is shorthand for an image_url.
+    """
+    if not isinstance(image_container, Mapping):
+        return None
+    images = image_container.get("images")
+    if isinstance(images, Sequence) and not isinstance(images, str) and len(images) >= 2:
+        return images
+    return None
+
+
+async def _album_item_source(item):
+    if isinstance(item, Mapping):
+        if item.get("image_file_id"):
+            return item["image_file_id"]
+        image_url = item.get("image_url")
+    else:
+        image_url = item
+    if not image_url:
+        return None
+    image_path = resolve_local_path(image_url)
+    return await load_input_file(image_path) if image_path else image_url
+
+
+def _cache_album_file_id(images: Sequence, index: int, file_id: str) -> bool:
+    item = images[index]
+    if isinstance(item, Mapping):
+        item["image_file_id"] = file_id
+        return True
+    if isinstance(images, list):
+        images[index] = {"image_url": item, "image_file_id": file_id}
+        return True
+    return False
+
+
+async def clear_lore_album(context: ContextTypes.DEFAULT_TYPE, chat_id: int, *also_delete: int) -> None:
+    """Deletes the album last sent to the chat, plus any `also_delete` messages, in one API call,
+    so paging through lore does not pile albums up."""
+    message_ids = context.chat_data.pop(LORE_ALBUM_KEY, []) + list(also_delete)
+    if not message_ids:
         return
+    try:
+        await context.bot.delete_messages(chat_id=chat_id, message_ids=message_ids)
+    except BadRequest as e:
+        # Bots cannot delete messages older than 48 hours; those albums simply stay in the chat.
+        logger.warning(f"Could not delete the previous lore album: {e}")
 
-    await query.answer()
+
+async def send_lore_album(context: ContextTypes.DEFAULT_TYPE, chat_id: int, images: Sequence) -> bool:
+    """Sends the images as media groups of up to ten, one API call per group, and remembers them for clear_lore_album.
+
+    Local files of uncached items are read concurrently and uploaded within the same
+    request. Returns True if new file_ids were cached into `images`.
+    """
+    sources = await asyncio.gather(*(_album_item_source(item) for item in images))
+    pending = [(index, source) for index, source in enumerate(sources) if source is not None]
+    if len(pending) < len(images):
+        logger.warning(f"{len(images) - len(pending)} lore album image(s) not found, sending the rest.")
+    cached = False
+    message_ids = context.chat_data.setdefault(LORE_ALBUM_KEY, [])
+    for start in range(0, len(pending), MEDIA_GROUP_LIMIT):
+        chunk = pending[start:start + MEDIA_GROUP_LIMIT]
+        if len(chunk) == 1:
+            messages = [await context.bot.send_photo(chat_id=chat_id, photo=chunk[0][1])]
+        else:
+            messages = await context.bot.send_media_group(chat_id=chat_id,
+                                                          media=[InputMediaPhoto(source) for _, source in chunk])
+        message_ids.extend(sent.message_id for sent in messages)
+        for (index, _), sent in zip(chunk, messages):
+            item = images[index]
+            already_cached = isinstance(item, Mapping) and item.get("image_file_id")
+            if not already_cached and sent.photo and _cache_album_file_id(images, index, sent.photo[-1].file_id):
+                cached = True
+    return cached
+
+
+def build_lore_page(callback_path_str: str) -> tuple[str, InlineKeyboardMarkup, Mapping | None] | None:
+    """Resolves a lore callback path to the page text, its navigation keyboard and the node holding its image."""
     lore_data = get_lore_data()
 
-    callback_path_str = query.data[len("lore_"):]
     path_keys = callback_path_str.split("_sections_")
 
     current_level = lore_data
@@ -31,15 +182,15 @@ async def lore_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
 
     navigated_successfully = True
     for i, key in enumerate(path_keys):
-        if isinstance(current_level, dict) and key in current_level:
+        if isinstance(current_level, Mapping) and key in current_level:
             current_level = current_level[key]
             path_objects.append(current_level)
             if i < len(path_keys) - 1:
-                if "sections" in current_level and isinstance(current_level.get("sections"), dict):
+                if "sections" in current_level and isinstance(current_level.get("sections"), Mapping):
                     current_level = current_level["sections"]
                     path_objects.append(current_level)
                 else:
-                    logger.warning(f"Expected 'sections' dict under key '{key}'. Callback: '{query.data}'.")
+                    logger.warning(f"Expected 'sections' dict under key '{key}'. Path: '{callback_path_str}'.")
                     navigated_successfully = False
                     break
         else:
@@ -47,23 +198,21 @@ async def lore_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
                 current_level = lore_data[key]
                 path_objects.append(current_level)
             else:
-                logger.warning(f"Key '{key}' not found in path. Full Callback: '{query.data}'.")
+                logger.warning(f"Key '{key}' not found in path. Path: '{callback_path_str}'.")
                 navigated_successfully = False
             break
 
     if not navigated_successfully:
-        if query.message:
-            await query.edit_message_text(text="Error navigating lore data. Please try /lore again.")
-        return
+        return None
 
     text_content = "Information not found."
     keyboard_buttons = []
     image_container = None
 
     if len(path_keys) == 1:
-        parent_callback_data = "lore_main_menu_trigger"
+        parent_callback_data = encode("lore_menu")
     else:
-        parent_callback_data = "lore_" + "_sections_".join(path_keys[:-1])
+        parent_callback_data = encode("lore", *path_keys[:-1])
 
     keyboard_buttons.append([InlineKeyboardButton("⬅️ Back", callback_data=parent_callback_data)])
 
@@ -71,65 +220,88 @@ async def lore_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         text_content = current_level
         if path_keys and len(path_keys) == 1 and path_keys[0] == "introduction":
             image_container = lore_data
-    elif isinstance(current_level, dict):
+    elif isinstance(current_level, Mapping):
         image_container = current_level
         text_content = current_level.get("description") or current_level.get("text") or current_level.get("title",
                                                                                                           "Select a subsection:")
 
-        if "sections" in current_level and isinstance(current_level.get("sections"), dict):
+        if "sections" in current_level and isinstance(current_level.get("sections"), Mapping):
             for section_key, section_item in current_level["sections"].items():
                 title = section_item.get("title", section_key.replace("_", " ").capitalize())
-                section_cb_data = f"lore_{callback_path_str}_sections_{section_key}"
-                if len(section_cb_data) > 60:
-                    section_cb_data = section_cb_data[:60]
+                try:
+                    section_cb_data = encode("lore", *path_keys, section_key)
+                except CallbackDataError:
+                    logger.warning(f"Lore path too deep for a button: '{callback_path_str}_sections_{section_key}'.")
+                    continue
                 keyboard_buttons.append([InlineKeyboardButton(title, callback_data=section_cb_data)])
 
     keyboard_markup = InlineKeyboardMarkup(keyboard_buttons)
     if isinstance(text_content, str):
         text_content = text_content.replace("<br><br>", "\n\n").replace("<br>", "\n")
+    return text_content, keyboard_markup, image_container
+
+
+async def lore_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    query = update.callback_query
+    user_id = query.from_user.id
+
+    if not is_admin(user_id) and not is_player_active(user_id):
+        await query.answer("Your account is awaiting activation by the Game Master.", show_alert=True)
+        return
+
+    await query.answer()
+    callback_path_str = "_sections_".join(decode(query.data)[1])
+    page = build_lore_page(callback_path_str)
+
+    if page is None:
+        if query.message or query.inline_message_id:
+            await query.edit_message_text(text="Error navigating lore data. Please try /lore again.")
+        return
+    text_content, keyboard_markup, image_container = page
 
     if not query.message:
+        # Pages opened from an inline search result live in an inline message, which stays text-only.
+        if query.inline_message_id:
+            await show_lore_view(query, context, text_content, keyboard_markup)
         return
 
     try:
+        album_images = get_album_images(image_container)
+        if album_images is None:
+            await clear_lore_album(context, query.message.chat_id)
+        else:
+            # Media groups cannot carry a keyboard, so the page text with the buttons goes below the album.
+            # Three calls per view: the old page and the previous album are deleted together, then the
+            # album and the page are sent.
+            chat_id = query.message.chat_id
+            await clear_lore_album(context, chat_id, query.message.message_id)
+            if await send_lore_album(context, chat_id, album_images):
+                logger.info(f"Cached lore album file_ids for path: {callback_path_str}")
+                save_lore_data()
+            await context.bot.send_message(chat_id=chat_id, text=text_content, reply_markup=keyboard_markup,
+                                           parse_mode=ParseMode.HTML)
+            return
+
         has_photo_info = image_container and ("image_url" in image_container or "image_file_id" in image_container)
-        await query.message.delete()
-        sent_message = None
+        photo_to_send = None
+        file_id = None
 
         if has_photo_info:
             file_id = image_container.get("image_file_id")
             image_url = image_container.get("image_url")
 
             photo_to_send = file_id
-            if not photo_to_send:
-                if image_url.startswith("./") or not image_url.startswith("http"):
-                    image_path = os.path.join(BASE_DIR, image_url.lstrip("./"))
-                    if os.path.exists(image_path):
-                        photo_to_send = open(image_path, 'rb')
-                else:
-                    photo_to_send = image_url
+            if not photo_to_send and image_url:
+                image_path = resolve_local_path(image_url)
+                photo_to_send = await load_input_file(image_path) if image_path else image_url
 
-            if photo_to_send:
-                try:
-                    sent_message = await context.bot.send_photo(
-                        chat_id=query.message.chat_id,
-                        photo=photo_to_send
-                    )
-                    if not file_id and sent_message and sent_message.photo:
-                        image_container["image_file_id"] = sent_message.photo[-1].file_id
-                        logger.info(f"Cached lore image file_id for path: {callback_path_str}")
-                        save_lore_data()
-                except Exception as e_photo:
-                    logger.error(f"Failed to send lore photo {image_url}: {e_photo}")
-
-        await context.bot.send_message(
-            chat_id=query.message.chat_id,
-            text=text_content,
-            reply_markup=keyboard_markup,
-            parse_mode=ParseMode.HTML
-        )
+        photo_message = await show_lore_view(query, context, text_content, keyboard_markup, photo_to_send)
+        if has_photo_info and not file_id and photo_message and photo_message.photo:
+            image_container["image_file_id"] = photo_message.photo[-1].file_id
+            logger.info(f"Cached lore image file_id for path: {callback_path_str}")
+            save_lore_data()
     except Exception as e:
-        logger.error(f"Error in lore_callback: {e}. Path: {query.data}")
+        logger.error(f"Error in lore_callback: {e}. Path: {callback_path_str}")
         try:
             await context.bot.send_message(query.message.chat_id, "An error occurred. Try /lore again.")
         except Exception as e2:
@@ -146,12 +318,69 @@ async def lore_main_menu_trigger_callback(update: Update, context: ContextTypes.
 
     await query.answer()
     reply_markup = get_lore_main_menu_keyboard()
+    if query.message:
+        await clear_lore_album(context, query.message.chat_id)
 
-    if reply_markup and query.message:
+    if reply_markup and (query.message or query.inline_message_id):
         try:
-            await query.edit_message_text('Select a section to study:', reply_markup=reply_markup)
+            await show_lore_view(query, context, 'Select a section to study:', reply_markup)
         except Exception as e:
             logger.error(f"Error editing message in lore_main_menu_trigger_callback: {e}")
-            await query.message.reply_text('Select a section to study:', reply_markup=reply_markup)
-    elif query.message:
-        await query.edit_message_text("Lore sections not found.")
\ No newline at end of file
+            if query.message:
+                await query.message.reply_text('Select a section to study:', reply_markup=reply_markup)
+    elif query.message or query.inline_message_id:
+        await show_lore_view(query, context, "Lore sections not found.", None)
+
+
+async def lore_search_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    user_id = update.effective_user.id
+    if not is_admin(user_id) and not is_player_active(user_id):
+        await update.message.reply_text("Your account is awaiting activation by the Game Master.")
+        return
+
+    query_text = " ".join(context.args)
+    if not query_text:
+        await update.message.reply_text("Usage: /lore_search <words>")
+        return
+
+    results = lore_index.search(query_text, limit=SEARCH_RESULTS_LIMIT)
+    if not results:
+        await update.message.reply_text("Nothing found in the archives.")
+        return
+
+    lines = [f"🔎 Results for <b>{html.escape(query_text)}</b>:"]
+    buttons = []
+    for node_id, title, snippet in results:
+        lines.append(f"\n<b>{html.escape(title)}</b>\n<i>{html.escape(snippet)}</i>")
+        try:
+            callback_data = encode("lore", *node_id.split("_sections_"))
+        except CallbackDataError:
+            logger.warning(f"Lore page {node_id} too deep for a button, result has no button.")
+            continue
+        buttons.append([InlineKeyboardButton(title, callback_data=callback_data)])
+    await update.message.reply_text("\n".join(lines), parse_mode=ParseMode.HTML,
+                                    reply_markup=InlineKeyboardMarkup(buttons) if buttons else None)
+
+
+async def lore_inline_query(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    inline_query = update.inline_query
+    user_id = inline_query.from_user.id
+    if not is_admin(user_id) and not is_player_active(user_id):
+        await inline_query.answer([], cache_time=0, is_personal=True)
+        return
+
+    results = []
+    for index, (node_id, title, snippet) in enumerate(lore_index.search(inline_query.query,
+                                                                        limit=SEARCH_RESULTS_LIMIT)):
+        page = build_lore_page(node_id)
+        if page is None:
+            continue
+        text_content, keyboard_markup, _ = page
+        results.append(InlineQueryResultArticle(
+            id=str(index),
+            title=title,
+            description=snippet,
+            input_message_content=InputTextMessageContent(text_content[:4096], parse_mode=ParseMode.HTML),
+            reply_markup=keyboard_markup
+        ))
+    await inline_query.answer(results, cache_time=INLINE_CACHE_SECONDS, is_personal=True)
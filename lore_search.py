@@ -0,0 +1,146 @@
+import bisect
+import logging
+import re
+from collections.abc import Mapping
+
+logger = logging.getLogger(__name__)
+
+TITLE_WEIGHT = 3
+BODY_WEIGHT = 1
+SNIPPET_LENGTH = 120
+INTRODUCTION_TITLE = "📜 Introduction to Eventide: Eclipse"
+
+_TOKEN_RE = re.compile(r"\w+")
+_TAG_RE = re.compile(r"<[^>]+>")
+
+# Common inflection endings, longest first. Stripping them is enough to make
+# "марсиане"/"марсианами" or "faction"/"factions" meet in the index.
+_SUFFIXES = sorted([
+    "иями", "ями", "ами", "ого", "его", "ому", "ему", "ыми", "ими", "ией",
+    "ая", "яя", "ое", "ее", "ые", "ие", "ый", "ий", "ой", "ей", "ов", "ев", "ам", "ям",
+    "ах", "ях", "ом", "ем", "ью", "ия", "ию", "ии", "ть", "ся",
+    "а", "я", "о", "е", "ы", "и", "у", "ю", "ь",
+    "ing", "ed", "es", "s",
+], key=len, reverse=True)
+MIN_STEM_LENGTH = 3
+
+
+def normalize(text: str) -> str:
+    return _TAG_RE.sub(" ", text).lower().replace("ё", "е")
+
+
+def tokenize(text: str) -> list[str]:
+    return [token for token in _TOKEN_RE.findall(normalize(text)) if len(token) > 1]
+
+
+def stem(token: str) -> str:
+    for suffix in _SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= MIN_STEM_LENGTH:
+            return token[:-len(suffix)]
+    return token
+
+
+def iter_lore_nodes(lore_data: Mapping):
+    """Yields (node_id, title, body) for every lore page; node_id is the callback path used by lore_callback."""
+    if "error" in lore_data:
+        return
+    stack = []
+    for key, item in lore_data.items():
+        if isinstance(item, str) and key == "introduction":
+            yield key, INTRODUCTION_TITLE, item
+        elif isinstance(item, Mapping) and "title" in item:
+            stack.append((key, item))
+    while stack:
+        node_id, node = stack.pop()
+        title = node.get("title", node_id)
+        body = node.get("description") or node.get("text") or ""
+        yield node_id, title, body
+        sections = node.get("sections")
+        if isinstance(sections, Mapping):
+            stack.extend((f"{node_id}_sections_{key}", item) for key, item in sections.items()
+                         if isinstance(item, Mapping))
+
+
+class LoreSearchIndex:
+    """In-memory inverted index over lore titles and bodies with prefix matching."""
+
+    def __init__(self):
+        self.postings = {}
+        self.nodes = {}
+        self._node_terms = {}
+        self._fingerprints = {}
+        self._sorted_terms = []
+
+    def _add(self, node_id: str, title: str, body: str) -> None:
+        terms = {}
+        for weight, text in ((TITLE_WEIGHT, title), (BODY_WEIGHT, body)):
+            for token in tokenize(text):
+                term = stem(token)
+                terms[term] = terms.get(term, 0) + weight
+        for term, weight in terms.items():
+            self.postings.setdefault(term, {})[node_id] = weight
+        self._node_terms[node_id] = terms
+        snippet = " ".join(_TAG_RE.sub(" ", body).split())
+        if len(snippet) > SNIPPET_LENGTH:
+            snippet = snippet[:SNIPPET_LENGTH - 1] + "…"
+        self.nodes[node_id] = (title, snippet)
+
+    def _remove(self, node_id: str) -> None:
+        for term in self._node_terms.pop(node_id, {}):
+            node_postings = self.postings.get(term)
+            if node_postings is not None:
+                node_postings.pop(node_id, None)
+                if not node_postings:
+                    del self.postings[term]
+        self.nodes.pop(node_id, None)
+
+    def update(self, lore_data: Mapping) -> None:
+        """Brings the index in line with lore_data, re-indexing only pages whose title or body changed."""
+        seen = set()
+        changed = 0
+        for node_id, title, body in iter_lore_nodes(lore_data):
+            seen.add(node_id)
+            fingerprint = hash((title, body))
+            if self._fingerprints.get(node_id) == fingerprint:
+                continue
+            self._remove(node_id)
+            self._add(node_id, title, body)
+            self._fingerprints[node_id] = fingerprint
+            changed += 1
+        removed = [node_id for node_id in self._fingerprints if node_id not in seen]
+        for node_id in removed:
+            self._remove(node_id)
+            del self._fingerprints[node_id]
+        if changed or removed:
+            self._sorted_terms = sorted(self.postings)
+        logger.info(f"Lore search index updated: {changed} pages (re)indexed, {len(removed)} removed, "
+                    f"{len(self.nodes)} pages, {len(self.postings)} terms.")
+
+    def _prefix_terms(self, prefix: str) -> list[str]:
+        start = bisect.bisect_left(self._sorted_terms, prefix)
+        end = bisect.bisect_left(self._sorted_terms, prefix + "\uffff", start)
+        return self._sorted_terms[start:end]
+
+    def search(self, query: str, limit: int = 10) -> list[tuple[str, str, str]]:
+        """Returns up to `limit` (node_id, title, snippet) tuples, best match first.
+
+        Pages matching more query words rank first, then by weighted hits;
+        exact stem hits count double over prefix hits.
+        """
+        matched_words = {}
+        scores = {}
+        for token in set(tokenize(query)):
+            term_stem = stem(token)
+            word_hits = set()
+            for term in self._prefix_terms(term_stem):
+                boost = 2 if term == term_stem else 1
+                for node_id, weight in self.postings[term].items():
+                    scores[node_id] = scores.get(node_id, 0) + weight * boost
+                    word_hits.add(node_id)
+            for node_id in word_hits:
+                matched_words[node_id] = matched_words.get(node_id, 0) + 1
+        ranked = sorted(scores, key=lambda node_id: (-matched_words[node_id], -scores[node_id]))
+        return [(node_id, *self.nodes[node_id]) for node_id in ranked[:limit]]
+
+
+lore_index = LoreSearchIndex()
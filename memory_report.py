@@ -0,0 +1,247 @@
+import asyncio
+import gc
+import logging
+import os
+import sys
+import time
+import tracemalloc
+from collections import deque
+from types import BuiltinFunctionType, FunctionType, MethodType, ModuleType
+
+from telegram import Bot
+from telegram.ext import Application, ContextTypes, ConversationHandler, Job
+
+from config import *
+
+logger = logging.getLogger(__name__)
+
+# (label, module, attribute) of the long-lived structures worth watching. Modules that are not
+# imported yet are skipped, so the report never loads code the bot does not otherwise use.
+STRUCTURES = [
+    ("lore_data", "data_manager", "lore_data"),
+    ("player_data", "data_manager", "player_data"),
+    ("missions_data", "data_manager", "missions_data"),
+    ("secret_missions_data", "data_manager", "secret_missions_data"),
+    ("message_recipients", "data_manager", "message_recipients"),
+    ("content_nodes", "data_manager", "content_nodes"),
+    ("roster views", "data_manager", "_roster_views"),
+    ("foreign player snapshots", "data_manager", "_foreign_snapshots"),
+    ("lore search index", "lore_search", "lore_index"),
+    ("image cache", "assets", "_cache"),
+    ("character cards", "render_cache", "_card_cache"),
+    ("mission pages", "render_cache", "_mission_pages"),
+    ("callback refs", "callback_codec", "_refs"),
+    ("callback decode cache", "callback_codec", "_decoded"),
+    ("rate limit buckets", "rate_limit", "_buckets"),
+    ("GM digest buffer", "gm_inbox", "_buffer"),
+    ("communication policy", "comm_policy", "_rules"),
+    ("scenario", "scenario", "scenario"),
+]
+# Code and interpreter objects are shared by everything and not owned by any structure. So are PTB's
+# runtime objects: a scheduled Job (e.g. Scenario._job) leads into the scheduler and the whole Application.
+_OPAQUE = (type, ModuleType, FunctionType, BuiltinFunctionType, MethodType, logging.Logger, Application, Bot, Job)
+
+TOP_ALLOCATIONS = 25
+_IGNORED_TRACES = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+# The last two snapshots as (time taken, snapshot); diffs compare them
+snapshots = deque(maxlen=2)
+
+
+def deep_size(obj, seen: set | None = None) -> tuple[int, int]:
+    """(bytes, objects) reachable from obj through containers and instance attributes.
+
+    Objects already in `seen` are not counted again, so sharing one set across several calls
+    attributes a shared object to the first structure that reaches it.
+    """
+    if seen is None:
+        seen = set()
+    total = count = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen or isinstance(item, _OPAQUE):
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        count += 1
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset, deque)):
+            stack.extend(item)
+        elif not isinstance(item, (str, bytes, bytearray, int, float, bool, memoryview)) and item is not None:
+            attributes = getattr(item, "__dict__", None)
+            if attributes is not None:
+                stack.append(attributes)
+            for slot in getattr(type(item), "__slots__", ()):
+                value = getattr(item, slot, None)
+                if value is not None:
+                    stack.append(value)
+    return total, count
+
+
+def application_structures(application: Application | None) -> list[tuple[str, object]]:
+    """PTB state that grows with the number of users: per-user/chat data and conversation keys."""
+    if application is None:
+        return []
+    # user_data and chat_data are read-only proxies; a dict copy has the same size and the same contents
+    structures = [("context.user_data", dict(application.user_data)), ("context.chat_data", dict(application.chat_data)),
+                  ("context.bot_data", application.bot_data)]
+    conversations = {}
+    for handlers in application.handlers.values():
+        for handler in handlers:
+            if isinstance(handler, ConversationHandler):
+                conversations[handler.name or f"conversation #{len(conversations) + 1}"] = handler._conversations
+    structures.append(("conversation states", conversations))
+    return structures
+
+
+def structure_sizes(application: Application | None = None) -> list[tuple[str, int, int]]:
+    """(label, bytes, objects) for every watched structure, in STRUCTURES order."""
+    seen = set()
+    sizes = []
+    candidates = [(label, getattr(sys.modules[module], attribute, None))
+                  for label, module, attribute in STRUCTURES if module in sys.modules]
+    for label, obj in candidates + application_structures(application):
+        if obj is not None:
+            sizes.append((label, *deep_size(obj, seen)))
+    return sizes
+
+
+def process_rss() -> int | None:
+    """Resident set size in bytes, where the platform exposes it."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Peak rather than current on platforms without /proc; kilobytes on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def gauges(application: Application | None = None) -> dict[str, int]:
+    """Flat name -> value readings for logging or an external metrics collector."""
+    values = {"memory.gc_objects": len(gc.get_objects())}
+    rss = process_rss()
+    if rss is not None:
+        values["memory.rss_bytes"] = rss
+    if tracemalloc.is_tracing():
+        values["memory.traced_bytes"], values["memory.traced_peak_bytes"] = tracemalloc.get_traced_memory()
+    for label, size, _ in structure_sizes(application):
+        values[f"memory.structure.{label.lower().replace(' ', '_')}_bytes"] = size
+    return values
+
+
+# --- TRACEMALLOC ---
+def start_tracing(frames: int = MEMORY_TRACE_FRAMES) -> bool:
+    """Starts tracing allocations. Returns False if it was already on. Tracing slows allocation noticeably."""
+    if tracemalloc.is_tracing():
+        return False
+    tracemalloc.start(frames)
+    return True
+
+
+def stop_tracing() -> None:
+    tracemalloc.stop()
+    snapshots.clear()
+
+
+def take_snapshot() -> tracemalloc.Snapshot:
+    """Snapshots the traced allocations and keeps it as the newest of the two diff points."""
+    snapshot = tracemalloc.take_snapshot().filter_traces(_IGNORED_TRACES)
+    snapshots.append((time.time(), snapshot))
+    return snapshot
+
+
+def format_top(snapshot: tracemalloc.Snapshot, limit: int = TOP_ALLOCATIONS) -> str:
+    stats = snapshot.statistics("lineno")
+    lines = [f"Top {min(limit, len(stats))} allocation sites "
+             f"({_format_bytes(sum(stat.size for stat in stats))} in {len(stats)} sites):"]
+    for stat in stats[:limit]:
+        lines.append(f"{_format_bytes(stat.size):>10} {stat.count:>8} blocks  {stat.traceback}")
+    return "\n".join(lines)
+
+
+def format_diff(limit: int = TOP_ALLOCATIONS) -> str:
+    """Growth between the last two snapshots, largest changes first."""
+    (old_at, old), (new_at, new) = snapshots
+    stats = new.compare_to(old, "lineno")
+    lines = [f"Allocation changes over {int(new_at - old_at)}s "
+             f"({_format_bytes(sum(stat.size_diff for stat in stats), signed=True)} in total):"]
+    for stat in stats[:limit]:
+        lines.append(f"{_format_bytes(stat.size_diff, signed=True):>10} {stat.count_diff:>+8} blocks  "
+                     f"now {_format_bytes(stat.size)}  {stat.traceback}")
+    return "\n".join(lines)
+
+
+# --- REPORT ---
+def _format_bytes(size: int, signed: bool = False) -> str:
+    sign = ("+" if size >= 0 else "-") if signed else ("-" if size < 0 else "")
+    size = abs(size)
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:
+            return f"{sign}{size:.0f} {unit}" if unit == "B" else f"{sign}{size:.1f} {unit}"
+        size /= 1024
+    return f"{sign}{size:.1f} GiB"
+
+
+def summary(application: Application | None = None) -> str:
+    rss = process_rss()
+    tracked = sum(size for _, size, _ in structure_sizes(application))
+    parts = [f"RSS {_format_bytes(rss)}" if rss is not None else "RSS unknown",
+             f"watched structures {_format_bytes(tracked)}"]
+    if tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        parts.append(f"traced {_format_bytes(current)} (peak {_format_bytes(peak)})")
+    return ", ".join(parts)
+
+
+def build_report(application: Application | None = None) -> str:
+    """Plain-text memory report: process totals, per-structure deep sizes and tracemalloc state."""
+    lines = [f"Memory report {time.strftime('%Y-%m-%d %H:%M:%S')}", summary(application), ""]
+    sizes = structure_sizes(application)
+    lines.append(f"{'structure':<28} {'size':>10} {'objects':>9}")
+    for label, size, count in sorted(sizes, key=lambda entry: entry[1], reverse=True):
+        lines.append(f"{label:<28} {_format_bytes(size):>10} {count:>9}")
+    lines.append("(objects shared between structures are counted once, under the first listed in STRUCTURES)")
+
+    collections = gc.get_count()
+    lines.append(f"\nGC: {len(gc.get_objects())} tracked objects, generation counts {collections}, "
+                 f"{len(gc.garbage)} uncollectable")
+    if tracemalloc.is_tracing():
+        lines.append(f"tracemalloc: on, {tracemalloc.get_traceback_limit()} frames, "
+                     f"{len(snapshots)} snapshot(s) kept")
+        if snapshots:
+            lines += ["", format_top(snapshots[-1][1])]
+    else:
+        lines.append("tracemalloc: off (/admin_memory start, or PYTHONTRACEMALLOC=1 from startup)")
+    return "\n".join(lines)
+
+
+# --- PERIODIC GAUGES ---
+async def _log_gauges(context: ContextTypes.DEFAULT_TYPE) -> None:
+    # Walking the structures takes a while on a large roster; keep it off the event loop
+    values = await asyncio.to_thread(gauges, context.application)
+    logger.info("memory gauges: " + " ".join(f"{name}={value}" for name, value in values.items()))
+
+
+def setup_memory_gauges(application: Application) -> None:
+    """Logs the gauges every MEMORY_GAUGE_INTERVAL seconds (off when 0)."""
+    if not MEMORY_GAUGE_INTERVAL:
+        return
+    if application.job_queue is None:
+        logger.warning("Memory gauges need the job queue (pip install \"python-telegram-bot[job-queue]\"); "
+                       "use /admin_memory instead.")
+        return
+    application.job_queue.run_repeating(_log_gauges, interval=MEMORY_GAUGE_INTERVAL, first=MEMORY_GAUGE_INTERVAL,
+                                        name="memory_gauges")
@@ -0,0 +1,159 @@
+import asyncio
+import hashlib
+import logging
+import os
+import struct
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import *
+from codec import dumps, loads
+
+logger = logging.getLogger(__name__)
+
+# --- LOG FORMAT ---
+# MESSAGE_LOG_FILE holds one compact JSON record per line and is only ever appended to.
+# Each conversation thread has an index file in MESSAGE_INDEX_DIR holding the byte offsets
+# of its records in the log as little-endian uint64s, oldest first, so a page of any thread
+# is found with one seek into the index and one seek per record into the log.
+#   player_<telegram id>.idx  messages sent by or to the player
+#   npc_<sha1 of name>.idx    messages sent to the NPC recipient
+OFFSET = struct.Struct("<Q")
+HISTORY_PAGE_SIZE = 10
+
+# One writer thread keeps the appends off the event loop and in the order the messages were relayed
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="message_log")
+
+
+def player_thread(player_id: int) -> str:
+    return f"player_{int(player_id)}"
+
+
+def npc_thread(name: str) -> str:
+    digest = hashlib.sha1(name.strip().casefold().encode("utf-8")).hexdigest()[:16]
+    return f"npc_{digest}"
+
+
+def _index_path(thread: str) -> str:
+    return os.path.join(MESSAGE_INDEX_DIR, f"{thread}.idx")
+
+
+def _threads_for(record: dict) -> list[str]:
+    threads = [player_thread(record["sender_id"])]
+    if record.get("recipient_type") == "player" and record.get("recipient_id"):
+        recipient_thread = player_thread(record["recipient_id"])
+        if recipient_thread not in threads:
+            threads.append(recipient_thread)
+    elif record.get("recipient_type") == "npc":
+        threads.append(npc_thread(record["recipient_name"]))
+    return threads
+
+
+def _append(path: str, data: bytes) -> int:
+    # O_APPEND keeps concurrent writers (sharded workers) from interleaving records;
+    # the returned offset is where this write landed.
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, data)
+        return os.lseek(fd, 0, os.SEEK_CUR) - len(data)
+    finally:
+        os.close(fd)
+
+
+def _index(threads: list[str], offset: int) -> None:
+    for thread in threads:
+        _append(_index_path(thread), OFFSET.pack(offset))
+
+
+def _write_record(record: dict) -> bool:
+    try:
+        offset = _append(MESSAGE_LOG_FILE, dumps(record) + b"\n")
+        _index(_threads_for(record), offset)
+        return True
+    except OSError as e:
+        logger.error(f"Error writing message history: {e}")
+        return False
+
+
+async def log_message(sender_id: int, sender_name: str, sender_status: str, recipient_type: str,
+                      recipient_id: int | None, recipient_name: str, text: str) -> bool:
+    """Appends a relayed message to the history log on the writer thread. Never raises; returns False if the
+    log could not be written."""
+    record = {
+        "ts": int(time.time()),
+        "sender_id": sender_id,
+        "sender_name": sender_name,
+        "sender_status": sender_status,
+        "recipient_type": recipient_type,
+        "recipient_id": recipient_id,
+        "recipient_name": recipient_name,
+        "text": text,
+    }
+    return await asyncio.get_running_loop().run_in_executor(_writer, _write_record, record)
+
+
+def setup_message_log(application) -> None:
+    """Creates the index directory once at startup, so relaying a message only appends to files."""
+    try:
+        os.makedirs(MESSAGE_INDEX_DIR, exist_ok=True)
+    except OSError as e:
+        logger.error(f"Cannot create the message history index directory {MESSAGE_INDEX_DIR}: {e}")
+
+
+def thread_size(thread: str) -> int:
+    try:
+        return os.path.getsize(_index_path(thread)) // OFFSET.size
+    except FileNotFoundError:
+        return 0
+
+
+def read_page(thread: str, page: int = 1, page_size: int = HISTORY_PAGE_SIZE) -> tuple[list[dict], int]:
+    """Returns (records, total pages) for one page of a thread, newest page first, records oldest first.
+
+    Only the offsets and records of the requested page are read from disk.
+    """
+    total = thread_size(thread)
+    pages = max(1, -(-total // page_size))
+    if total == 0 or not 1 <= page <= pages:
+        return [], pages
+    end = total - (page - 1) * page_size
+    start = max(0, end - page_size)
+
+    with open(_index_path(thread), 'rb') as index_file:
+        index_file.seek(start * OFFSET.size)
+        raw_offsets = index_file.read((end - start) * OFFSET.size)
+    records = []
+    with open(MESSAGE_LOG_FILE, 'rb') as log_file:
+        for (offset,) in OFFSET.iter_unpack(raw_offsets):
+            log_file.seek(offset)
+            records.append(loads(log_file.readline()))
+    return records, pages
+
+
+def rebuild_index() -> int:
+    """Rebuilds every thread index from the log, e.g. after the index directory was lost. Returns the record count."""
+    os.makedirs(MESSAGE_INDEX_DIR, exist_ok=True)
+    for name in os.listdir(MESSAGE_INDEX_DIR):
+        if name.endswith(".idx"):
+            os.remove(os.path.join(MESSAGE_INDEX_DIR, name))
+    count = 0
+    if not os.path.exists(MESSAGE_LOG_FILE):
+        return count
+    with open(MESSAGE_LOG_FILE, 'rb') as log_file:
+        offset = 0
+        for line in log_file:
+            if line.endswith(b"\n"):
+                _index(_threads_for(loads(line)), offset)
+                count += 1
+            offset += len(line)
+    logger.info(f"Message history index rebuilt: {count} records.")
+    return count
+
+
+if __name__ == "__main__":
+    # Usage: python message_log.py rebuild
+    logging.basicConfig(format="%(message)s", level=logging.INFO)
+    if sys.argv[1:] != ["rebuild"]:
+        exit("Usage: python message_log.py rebuild")
+    rebuild_index()
@@ -1,4 +1,3 @@
-import os
 import logging
 from telegram import Update, Message
 from telegram.ext import ContextTypes, ConversationHandler
@@ -9,6 +8,12 @@ from config import *
 from data_manager import *
 from utils import is_admin, is_player_active, get_player_status
 from keyboards import *
+from gm_inbox import relay_to_gm, CATEGORY_REGISTRATION, CATEGORY_MESSAGE
+from comm_policy import (resolve as resolve_policy, ACTION_INTERCEPT, ACTION_FAKE_ACK, ACTION_DROP, ACTION_DELAY,
+                         ACTION_REDIRECT, RECIPIENT_NPC, RECIPIENT_PLAYER, DELIVER_GM_TEXT, DELIVERED_REPLY)
+from message_log import log_message
+from assets import load_input_file, resolve_local_path
+from render_cache import get_character_card, get_mission_page, MEDIA_LOCAL
 
 logger = logging.getLogger(__name__)
 
@@ -46,18 +51,19 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         save_player_data()
         logger.info(f"New player registered: {user_id} - {user.first_name}")
 
-        await context.bot.send_message(
-            chat_id=DM_CHAT_ID,
-            text=f"New player registered: {user.first_name} (ID: {user_id}, @{user.username or 'N/A'}).\n"
-                 f"Status: {STATUS_UNDEFINED}. Awaiting activation."
+        await relay_to_gm(
+            context,
+            f"New player registered: {user.first_name} (ID: {user_id}, @{user.username or 'N/A'}).\n"
+            f"Status: {STATUS_UNDEFINED}. Awaiting activation.",
+            CATEGORY_REGISTRATION, user_id
         )
 
         image_url = "./assets/character/lore/bg.png"
         caption_text = "Welcome! Your account is created and awaits activation."
 
         photo_to_send = WELCOME_IMAGE_FILE_ID
-        if not photo_to_send and os.path.exists(image_url):
-            photo_to_send = open(image_url, 'rb')
+        if not photo_to_send:
+            photo_to_send = await load_input_file(resolve_local_path(image_url))
 
         if photo_to_send:
             try:
@@ -84,6 +90,7 @@ async def lore_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     if not is_admin(user_id) and not is_player_active(user_id):
         await update.message.reply_text("Your account is awaiting activation for the mission.")
         return
+    lore_data = get_lore_data()
     if "error" in lore_data:
         await update.message.reply_text(lore_data["error"])
         return
@@ -100,33 +107,17 @@ async def character_command(update: Update, context: ContextTypes.DEFAULT_TYPE)
         await update.message.reply_text("Your account is awaiting activation by the Game Master.")
         return
 
+    player_data = get_player_data()
+    secret_missions_data = get_secret_missions_data()
     if user_id in player_data:
         char = player_data[user_id]
-        caption = (f"👤 **Name:** {char.get('character_name', 'Undefined')}\n"
-                   f"🛠️ **Role:** {char.get('character_role', 'Undefined')}\n"
-                   f"📝 **Bio:** {char.get('character_bio', 'No information.')}\n"
-                   f"🚦 **Ver:** {char.get('ver', '1.0.0')}\n")
-
-        secret_mission_id = char.get("secret_mission_id")
-        if secret_mission_id and secret_mission_id in secret_missions_data:
-            sm = secret_missions_data[secret_mission_id]
-            caption += f"\n🔒 **Secret Mission:** {sm.get('title', 'N/A')}\n"
-            if sm.get('details'):
-                caption += f"    **Details:** {sm.get('details')}\n"
-        elif secret_mission_id:
-            caption += f"\n🔒 **Secret Mission ID:** {secret_mission_id} (Details not found)\n"
+        caption, media = get_character_card(user_id, char, secret_missions_data)
 
+        photo_to_send = None
+        if media is not None:
+            media_kind, media_ref = media
+            photo_to_send = await load_input_file(media_ref) if media_kind == MEDIA_LOCAL else media_ref
         char_image_file_id = char.get("character_image_file_id")
-        char_image_url = char.get("character_image_url")
-
-        photo_to_send = char_image_file_id
-        if not photo_to_send and char_image_url:
-            if char_image_url.startswith("./") or not char_image_url.startswith("http"):
-                image_path = os.path.join(BASE_DIR, char_image_url.lstrip("./"))
-                if os.path.exists(image_path):
-                    photo_to_send = open(image_path, 'rb')
-            else:
-                photo_to_send = char_image_url
 
         if photo_to_send:
             try:
@@ -154,14 +145,11 @@ async def mission_command(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         await update.message.reply_text("Your account is awaiting activation by the Game Master.")
         return
 
+    player_data = get_player_data()
     if user_id in player_data:
         mission_id = player_data[user_id].get("current_mission_id")
-        if mission_id and mission_id in missions_data:
-            mission = missions_data[mission_id]
-            objectives_text = "\n".join([f"- {obj}" for obj in mission.get('objectives', [])])
-            text = (f"🎯 **Mission:** {mission.get('title', 'Untitled')}\n\n"
-                    f"📜 **Description:**\n{mission.get('description', 'No description.')}\n\n"
-                    f"📋 **Objectives:**\n{objectives_text if objectives_text else 'Objectives are not defined.'}")
+        text = get_mission_page(mission_id) if mission_id else None
+        if text is not None:
             await update.message.reply_text(text, parse_mode=ParseMode.MARKDOWN)
         else:
             await update.message.reply_text("Your current mission is not found or not defined.")
@@ -203,9 +191,9 @@ async def choose_recipient(update: Update, context: ContextTypes.DEFAULT_TYPE) -
             break
 
     if target_player_id:
-        context.user_data['recipient'] = {"name": recipient_name, "type": "player", "id": target_player_id}
+        context.user_data['recipient'] = {"name": recipient_name, "type": RECIPIENT_PLAYER, "id": target_player_id}
     elif recipient_name in message_recipients:
-        context.user_data['recipient'] = {"name": recipient_name, "type": "npc", "id": None}
+        context.user_data['recipient'] = {"name": recipient_name, "type": RECIPIENT_NPC, "id": None}
     else:
         reply_markup_retry = get_recipient_choice_keyboard(update.effective_user.id)
         await update.message.reply_text("Recipient not found. Please choose from the provided list or select 'Back'.",
@@ -217,9 +205,34 @@ async def choose_recipient(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     return TYPE_MESSAGE
 
 
+async def _deliver_message(context: ContextTypes.DEFAULT_TYPE, fields: dict, recipient_type: str,
+                           recipient_id: int | None, sender_id: int) -> str:
+    """Relays a message to the GM and forwards it to a player recipient. Returns the feedback for the sender."""
+    try:
+        await relay_to_gm(context, DELIVER_GM_TEXT.format(**fields), CATEGORY_MESSAGE, sender_id)
+    except Exception as e:
+        logger.error(f"Error sending message to DM: {e}")
+        return "Failed to send the message to the Game Master. Please try again later."
+
+    if recipient_type == RECIPIENT_PLAYER and recipient_id:
+        try:
+            player_to_player_message = f"Message from **{fields['sender_name']}**:\n\n{fields['text']}"
+            await context.bot.send_message(chat_id=recipient_id, text=player_to_player_message,
+                                           parse_mode=ParseMode.MARKDOWN)
+        except Exception as e:
+            logger.error(f"Failed to forward message to player {recipient_id}: {e}")
+            return "The message was delivered to the Game Master, but could not be delivered to the player."
+    return DELIVERED_REPLY
+
+
+async def _delayed_delivery(context: ContextTypes.DEFAULT_TYPE) -> None:
+    fields, recipient_type, recipient_id, sender_id = context.job.data
+    await _deliver_message(context, fields, recipient_type, recipient_id, sender_id)
+
+
 async def type_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     message_text = update.message.text
-    recipient_info = context.user_data.get('recipient')
+    recipient_info = context.user_data.pop('recipient', None)
     sender = update.effective_user
     sender_id = sender.id
     markup_main = get_main_reply_keyboard(sender_id)
@@ -235,48 +248,38 @@ async def type_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
     recipient_type = recipient_info["type"]
     recipient_id = recipient_info["id"]
 
-    dm_notification_prefix = f"--- Msg from {sender_char_name}(ID:{sender_id},Status:{player_current_status}) to {recipient_name} ---\n"
-    player_feedback_message = "Message delivered. Please wait for a response."
-
-    if player_current_status == STATUS_ARRESTED:
-        await context.bot.send_message(DM_CHAT_ID,
-                                       f"ELLI ALERT: Arrested {sender_char_name}(ID:{sender_id}) attempted comm.\nTo:{recipient_name}\nMsg:{message_text}")
-        await update.message.reply_text(
-            "You are under arrest. All communication attempts are being monitored by ELLI. Await further instructions.",
-            reply_markup=markup_main)
-    elif player_current_status == STATUS_HACKED:
-        await context.bot.send_message(DM_CHAT_ID,
-                                       f"TECHNOCRAT ALERT: Hacked {sender_char_name}(ID:{sender_id}) sent.\nOriginal To:{recipient_name}\nIntercepted:{message_text}")
-        await update.message.reply_text("Message sent - wait.", reply_markup=markup_main)
-    elif player_current_status == STATUS_DEAD:
-        await context.bot.send_message(DM_CHAT_ID,
-                                       f"INFO: DEAD Player {sender_char_name}(ID:{sender_id}) tried to send to {recipient_name}: {message_text}")
-        await update.message.reply_text("No response... silence on the airwaves...", reply_markup=markup_main)
-    else:
+    await log_message(sender_id, sender_char_name, player_current_status, recipient_type, recipient_id,
+                      recipient_name, message_text)
+
+    recipient_status = get_player_status(recipient_id) if recipient_type == RECIPIENT_PLAYER else None
+    rule = resolve_policy(player_current_status, recipient_type, recipient_status)
+    action = rule["action"]
+    fields = {"sender_name": sender_char_name, "sender_id": sender_id, "sender_status": player_current_status,
+              "recipient": recipient_name, "original_recipient": recipient_name, "text": message_text}
+
+    if action == ACTION_INTERCEPT:
         try:
-            await context.bot.send_message(chat_id=DM_CHAT_ID,
-                                           text=dm_notification_prefix + f"Message:\n{message_text}")
+            await relay_to_gm(context, rule.get("gm_text", DELIVER_GM_TEXT).format(**fields),
+                              rule.get("category", CATEGORY_MESSAGE), sender_id)
         except Exception as e:
-            logger.error(f"Error sending message to DM: {e}")
-            player_feedback_message = "Failed to send the message to the Game Master. Please try again later."
-            await update.message.reply_text(player_feedback_message, reply_markup=markup_main)
-            if 'recipient' in context.user_data:
-                del context.user_data['recipient']
-            return ConversationHandler.END
-
-        if recipient_type == "player" and recipient_id:
-            try:
-                player_to_player_message = f"Message from **{sender_char_name}**:\n\n{message_text}"
-                await context.bot.send_message(chat_id=recipient_id, text=player_to_player_message,
-                                               parse_mode=ParseMode.MARKDOWN)
-            except Exception as e:
-                logger.error(f"Failed to forward message to player {recipient_id}: {e}")
-                player_feedback_message = "The message was delivered to the Game Master, but could not be delivered to the player."
-
-        await update.message.reply_text(player_feedback_message, reply_markup=markup_main)
+            logger.error(f"Error sending intercepted message to DM: {e}")
+        feedback = rule.get("reply", DELIVERED_REPLY)
+    elif action == ACTION_FAKE_ACK:
+        feedback = DELIVERED_REPLY
+    elif action == ACTION_DROP:
+        feedback = rule.get("reply", DELIVERED_REPLY)
+    elif action == ACTION_DELAY and context.job_queue is not None:
+        context.job_queue.run_once(_delayed_delivery, when=rule["delay"],
+                                   data=(fields, recipient_type, recipient_id, sender_id),
+                                   name=f"delayed_message_{sender_id}")
+        feedback = rule.get("reply", DELIVERED_REPLY)
+    else:
+        if action == ACTION_REDIRECT:
+            fields["recipient"] = rule["redirect_to"]
+            recipient_type, recipient_id = RECIPIENT_NPC, None
+        feedback = await _deliver_message(context, fields, recipient_type, recipient_id, sender_id)
 
-    if 'recipient' in context.user_data:
-        del context.user_data['recipient']
+    await update.message.reply_text(feedback, reply_markup=markup_main)
     return ConversationHandler.END
 
 
@@ -285,4 +288,8 @@ async def cancel_send_message(update: Update, context: ContextTypes.DEFAULT_TYPE
     await update.message.reply_text("Message sending cancelled.", reply_markup=markup_main)
     if 'recipient' in context.user_data:
         del context.user_data['recipient']
-    return ConversationHandler.END
\ No newline at end of file
+    return ConversationHandler.END
+
+
+async def stale_button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    await update.callback_query.answer("This button is no longer active. Open the menu again.")
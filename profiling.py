@@ -0,0 +1,28 @@
+import time
+from contextlib import contextmanager
+
+
+class StartupProfiler:
+    def __init__(self):
+        self.phases = []
+        self.started_at = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - start))
+
+    def report(self, details: dict[str, float] | None = None) -> str:
+        lines = ["Startup profile:"]
+        for name, seconds in self.phases:
+            lines.append(f"  {name:<28} {seconds * 1000:>9.1f} ms")
+        for name, seconds in (details or {}).items():
+            lines.append(f"    {name:<26} {seconds * 1000:>9.1f} ms")
+        lines.append(f"  {'total':<28} {(time.perf_counter() - self.started_at) * 1000:>9.1f} ms")
+        return "\n".join(lines)
+
+
+startup_profiler = StartupProfiler()
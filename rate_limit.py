@@ -0,0 +1,77 @@
+import logging
+import time
+from collections import OrderedDict
+
+from telegram import Update
+from telegram.ext import ContextTypes, ApplicationHandlerStop
+
+from config import DM_CHAT_ID, RATE_LIMITS, RATE_LIMIT_IDLE_SECONDS, SLOW_DOWN_TEXT, SLOW_DOWN_CACHE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# (user_id, handler class) -> [tokens, last refill time]; ordered by last use so idle buckets sit at the front.
+_buckets = OrderedDict()
+dropped_updates = {}
+
+
+def classify_update(update: Update) -> str | None:
+    if update.callback_query:
+        return "callback"
+    if update.inline_query:
+        return "inline"
+    message = update.message
+    if message:
+        if message.text and message.text.startswith("/"):
+            return "command"
+        return "message"
+    return None
+
+
+def _evict_idle(now: float) -> None:
+    while _buckets:
+        key, bucket = next(iter(_buckets.items()))
+        if now - bucket[1] < RATE_LIMIT_IDLE_SECONDS:
+            break
+        del _buckets[key]
+
+
+def allow(user_id: int, handler_class: str, now: float | None = None) -> bool:
+    """Takes one token from the user's bucket for this handler class; False when the bucket is empty."""
+    rate, burst = RATE_LIMITS[handler_class]
+    now = time.monotonic() if now is None else now
+    _evict_idle(now)
+
+    key = (user_id, handler_class)
+    bucket = _buckets.get(key)
+    if bucket is None:
+        bucket = _buckets[key] = [float(burst), now]
+    else:
+        bucket[0] = min(burst, bucket[0] + (now - bucket[1]) * rate)
+        bucket[1] = now
+        _buckets.move_to_end(key)
+
+    if bucket[0] >= 1:
+        bucket[0] -= 1
+        return True
+    return False
+
+
+async def rate_limit_middleware(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Runs before all other handlers (group -1) and stops updates from users over their limit."""
+    user = update.effective_user
+    if user is None or user.id == DM_CHAT_ID:
+        return
+    handler_class = classify_update(update)
+    if handler_class is None or handler_class not in RATE_LIMITS:
+        return
+    if allow(user.id, handler_class):
+        return
+
+    dropped_updates[handler_class] = dropped_updates.get(handler_class, 0) + 1
+    if update.callback_query:
+        # cache_time lets the client repeat this toast for further presses without asking the bot.
+        try:
+            await update.callback_query.answer(SLOW_DOWN_TEXT, cache_time=SLOW_DOWN_CACHE_SECONDS)
+        except Exception as e:
+            logger.debug(f"Failed to answer throttled callback from {user.id}: {e}")
+    raise ApplicationHandlerStop
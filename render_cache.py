@@ -0,0 +1,109 @@
+import logging
+import os
+
+from config import *
+import data_manager
+from assets import resolve_local_path
+
+logger = logging.getLogger(__name__)
+
+MEDIA_FILE_ID = "file_id"
+MEDIA_URL = "url"
+MEDIA_LOCAL = "local"
+
+# --- CHARACTER CARDS ---
+# player_id -> (caption key, caption, media key, media); the keys hold every value the card
+# is built from, so an entry is reused until that player's record or their secret mission changes.
+_card_cache = {}
+
+
+def _caption_key(char: dict, secret_mission) -> tuple:
+    sm_key = (secret_mission.get('title'), secret_mission.get('details')) if secret_mission is not None else None
+    return (char.get('character_name'), char.get('character_role'), char.get('character_bio'), char.get('ver'),
+            char.get("secret_mission_id"), sm_key)
+
+
+def _render_card(char: dict, secret_mission) -> str:
+    caption = (f"👤 **Name:** {char.get('character_name', 'Undefined')}\n"
+               f"🛠️ **Role:** {char.get('character_role', 'Undefined')}\n"
+               f"📝 **Bio:** {char.get('character_bio', 'No information.')}\n"
+               f"🚦 **Ver:** {char.get('ver', '1.0.0')}\n")
+
+    secret_mission_id = char.get("secret_mission_id")
+    if secret_mission is not None:
+        caption += f"\n🔒 **Secret Mission:** {secret_mission.get('title', 'N/A')}\n"
+        if secret_mission.get('details'):
+            caption += f"    **Details:** {secret_mission.get('details')}\n"
+    elif secret_mission_id:
+        caption += f"\n🔒 **Secret Mission ID:** {secret_mission_id} (Details not found)\n"
+    return caption
+
+
+def _resolve_media(char: dict) -> tuple[str, str] | None:
+    char_image_file_id = char.get("character_image_file_id")
+    if char_image_file_id:
+        return MEDIA_FILE_ID, char_image_file_id
+    char_image_url = char.get("character_image_url")
+    if not char_image_url:
+        return None
+    image_path = resolve_local_path(char_image_url)
+    if image_path is None:
+        return MEDIA_URL, char_image_url
+    # Checked once per card; a missing file stays missing until the record changes.
+    return (MEDIA_LOCAL, image_path) if os.path.exists(image_path) else None
+
+
+def get_character_card(player_id: int, char: dict, secret_missions_data) -> tuple[str, tuple[str, str] | None]:
+    """Returns (Markdown caption, media) for a player's card; media is (kind, reference) or None."""
+    secret_mission_id = char.get("secret_mission_id")
+    secret_mission = secret_missions_data.get(secret_mission_id) if secret_mission_id else None
+    caption_key = _caption_key(char, secret_mission)
+    media_key = (char.get("character_image_file_id"), char.get("character_image_url"))
+    cached = _card_cache.get(player_id)
+    if cached is not None and cached[0] == caption_key and cached[2] == media_key:
+        return cached[1], cached[3]
+    # Caching a freshly uploaded file_id changes only the media, so the caption is kept.
+    caption = cached[1] if cached is not None and cached[0] == caption_key else _render_card(char, secret_mission)
+    media = cached[3] if cached is not None and cached[2] == media_key else _resolve_media(char)
+    _card_cache[player_id] = (caption_key, caption, media_key, media)
+    return caption, media
+
+
+# --- MISSION PAGES ---
+# mission_id -> rendered /mission text, shared by every player on that mission.
+# Cleared whenever data_manager.missions_revision moves on.
+_mission_pages = {}
+_mission_pages_revision = -1
+
+
+def _render_mission(mission) -> str:
+    objectives_text = "\n".join([f"- {obj}" for obj in mission.get('objectives', [])])
+    return (f"🎯 **Mission:** {mission.get('title', 'Untitled')}\n\n"
+            f"📜 **Description:**\n{mission.get('description', 'No description.')}\n\n"
+            f"📋 **Objectives:**\n{objectives_text if objectives_text else 'Objectives are not defined.'}")
+
+
+def _check_missions_revision() -> None:
+    global _mission_pages_revision
+    if _mission_pages_revision != data_manager.missions_revision:
+        _mission_pages.clear()
+        _mission_pages_revision = data_manager.missions_revision
+
+
+def get_mission_page(mission_id: str) -> str | None:
+    """Rendered Markdown page for a mission, or None if the mission does not exist."""
+    _check_missions_revision()
+    page = _mission_pages.get(mission_id)
+    if page is None:
+        mission = data_manager.get_missions_data().get(mission_id)
+        if mission is None:
+            return None
+        page = _mission_pages[mission_id] = _render_mission(mission)
+    return page
+
+
+def prerender_missions() -> None:
+    _check_missions_revision()
+    for mission_id, mission in data_manager.get_missions_data().items():
+        if mission_id not in _mission_pages:
+            _mission_pages[mission_id] = _render_mission(mission)
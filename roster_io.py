@@ -0,0 +1,294 @@
+import csv
+import io
+import logging
+from collections.abc import Mapping, Sequence
+
+from config import *
+from codec import dumps, loads, DecodeError, FORMAT_PRETTY
+from data_manager import (get_player_data, get_missions_data, get_secret_missions_data, save_player_data,
+                          save_missions_data, save_secret_missions_data, owns_player, forward_player_changes)
+
+logger = logging.getLogger(__name__)
+
+# Player fields an import may set, in CSV column order after telegram_user_id
+PLAYER_FIELDS = ["character_name", "character_role", "character_bio", "character_image_url", "is_active", "status",
+                 "secret_mission_id", "current_mission_id"]
+NULLABLE_FIELDS = {"character_image_url", "secret_mission_id"}
+# Present in exported JSON but owned by the bot, so ignored on import
+IGNORED_FIELDS = {"character_image_file_id", "ver"}
+NULL_WORDS = {"none", "clear", "null", "remove"}
+TRUE_WORDS = {"true", "1", "yes", "on"}
+FALSE_WORDS = {"false", "0", "no", "off"}
+MAX_REPORTED_ERRORS = 20
+
+
+def new_player(user_id: int) -> dict:
+    # Same defaults as a player registered through /start
+    return {
+        "telegram_user_id": user_id,
+        "character_name": f"Player {user_id}",
+        "character_role": "Undefined",
+        "character_bio": "No information.",
+        "character_image_url": None,
+        "character_image_file_id": None,
+        "is_active": False,
+        "status": STATUS_UNDEFINED,
+        "secret_mission_id": None,
+        "current_mission_id": "default_mission"
+    }
+
+
+class ImportPlan:
+    """Validated changes from an import document, ready to be previewed and applied."""
+
+    def __init__(self):
+        self.player_changes = {}
+        self.new_players = set()
+        self.missions = {}
+        self.secret_missions = {}
+        self.errors = []
+
+    def error(self, message: str) -> None:
+        self.errors.append(message)
+
+    @property
+    def empty(self) -> bool:
+        return not (self.player_changes or self.missions or self.secret_missions)
+
+
+def parse_document(file_name: str, data: bytes) -> dict:
+    """Returns {"players": [...], "missions": {...}, "secret_missions": {...}} (sections optional). Raises ValueError."""
+    name = (file_name or "").lower()
+    if name.endswith(".csv"):
+        try:
+            text = data.decode("utf-8-sig")
+        except UnicodeDecodeError:
+            raise ValueError("CSV file must be UTF-8 encoded.")
+        reader = csv.DictReader(io.StringIO(text))
+        if not reader.fieldnames or "telegram_user_id" not in reader.fieldnames:
+            raise ValueError("CSV header must include a telegram_user_id column.")
+        # Empty cells leave the field unchanged
+        return {"players": [{key: value for key, value in row.items() if key and value not in (None, "")}
+                            for row in reader]}
+    if name.endswith(".json"):
+        try:
+            document = loads(data)
+        except DecodeError as e:
+            raise ValueError(f"Invalid JSON: {e}")
+        if isinstance(document, list):
+            return {"players": document}
+        if isinstance(document, dict) and document.keys() & {"players", "missions", "secret_missions"}:
+            return document
+        raise ValueError("JSON must be a list of players or an object with players, missions and/or secret_missions.")
+    raise ValueError("Unsupported file type. Upload a .csv or .json file.")
+
+
+def _coerce(field: str, value):
+    if isinstance(value, str):
+        value = value.strip()
+        if field in NULLABLE_FIELDS and value.lower() in NULL_WORDS:
+            return None
+        if field == "is_active":
+            if value.lower() in TRUE_WORDS:
+                return True
+            if value.lower() in FALSE_WORDS:
+                return False
+            raise ValueError(f"is_active must be true or false, got '{value}'")
+        return value
+    if value is None and field in NULLABLE_FIELDS:
+        return None
+    if field == "is_active" and isinstance(value, bool):
+        return value
+    raise ValueError(f"{field} has an invalid value {value!r}")
+
+
+def _plan_content(plan: ImportPlan, section: str, items, current: dict, target: dict) -> None:
+    if not isinstance(items, dict):
+        plan.error(f"{section} must be an object keyed by ID.")
+        return
+    for item_id, item in items.items():
+        if not isinstance(item, dict) or not isinstance(item.get("title"), str):
+            plan.error(f"{section}.{item_id}: must be an object with a title.")
+        elif "objectives" in item and not isinstance(item["objectives"], list):
+            plan.error(f"{section}.{item_id}: objectives must be a list.")
+        elif current.get(item_id) != item:
+            target[item_id] = item
+
+
+def build_import_plan(file_name: str, data: bytes, players: dict, missions: dict, secret_missions: dict) -> ImportPlan:
+    """Parses, validates and diffs an import document against copies of the current data.
+
+    Pure function of its arguments, so it can run in a worker thread.
+    """
+    plan = ImportPlan()
+    try:
+        sections = parse_document(file_name, data)
+    except ValueError as e:
+        plan.error(str(e))
+        return plan
+
+    if "missions" in sections:
+        _plan_content(plan, "missions", sections["missions"], missions, plan.missions)
+    if "secret_missions" in sections:
+        _plan_content(plan, "secret_missions", sections["secret_missions"], secret_missions, plan.secret_missions)
+    mission_ids = missions.keys() | plan.missions.keys()
+    secret_mission_ids = secret_missions.keys() | plan.secret_missions.keys()
+
+    records = sections.get("players", [])
+    if not isinstance(records, list):
+        plan.error("players must be a list.")
+        records = []
+    seen = set()
+    for row_number, record in enumerate(records, start=1):
+        where = f"players row {row_number}"
+        if not isinstance(record, dict):
+            plan.error(f"{where}: must be an object.")
+            continue
+        try:
+            pid = int(record.get("telegram_user_id"))
+        except (TypeError, ValueError):
+            plan.error(f"{where}: telegram_user_id must be a number.")
+            continue
+        if pid in seen:
+            plan.error(f"{where}: duplicate telegram_user_id {pid}.")
+            continue
+        seen.add(pid)
+
+        current = players.get(pid) or new_player(pid)
+        changes = {}
+        for field, raw_value in record.items():
+            if field == "telegram_user_id" or field in IGNORED_FIELDS:
+                continue
+            if field not in PLAYER_FIELDS:
+                plan.error(f"{where}: unknown field '{field}'.")
+                continue
+            try:
+                value = _coerce(field, raw_value)
+            except ValueError as e:
+                plan.error(f"{where}: {e}.")
+                continue
+            # Unchanged values pass even if they predate validation (e.g. a legacy status)
+            if current.get(field) == value:
+                continue
+            if field == "status" and value not in VALID_PLAYER_STATUSES:
+                plan.error(f"{where}: invalid status '{value}'.")
+            elif field == "secret_mission_id" and value is not None and value not in secret_mission_ids:
+                plan.error(f"{where}: secret mission '{value}' not found.")
+            elif field == "current_mission_id" and value not in mission_ids:
+                plan.error(f"{where}: mission '{value}' not found.")
+            else:
+                changes[field] = value
+        if "character_image_url" in changes:
+            changes["character_image_file_id"] = None
+        if pid not in players:
+            plan.new_players.add(pid)
+            plan.player_changes[pid] = changes
+        elif changes:
+            plan.player_changes[pid] = changes
+    return plan
+
+
+def format_import_plan(plan: ImportPlan, players: dict) -> str:
+    if plan.errors:
+        shown = plan.errors[:MAX_REPORTED_ERRORS]
+        more = len(plan.errors) - len(shown)
+        return "Import rejected:\n" + "\n".join(f"- {e}" for e in shown) + (f"\n...and {more} more." if more else "")
+    if plan.empty:
+        return "Import contains no changes."
+
+    lines = ["--IMPORT PREVIEW--"]
+    if plan.player_changes:
+        updated = len(plan.player_changes) - len(plan.new_players)
+        lines.append(f"Players: {len(plan.new_players)} new, {updated} updated.")
+        for pid, changes in sorted(plan.player_changes.items())[:MAX_REPORTED_ERRORS]:
+            name = changes.get("character_name") or players.get(pid, {}).get("character_name", pid)
+            label = "NEW" if pid in plan.new_players else ", ".join(field for field in changes
+                                                                    if field != "character_image_file_id")
+            lines.append(f"- {name} (ID: {pid}): {label}")
+        if len(plan.player_changes) > MAX_REPORTED_ERRORS:
+            lines.append(f"...and {len(plan.player_changes) - MAX_REPORTED_ERRORS} more.")
+    if plan.missions:
+        lines.append(f"Missions added or replaced: {', '.join(sorted(plan.missions))}")
+    if plan.secret_missions:
+        lines.append(f"Secret missions added or replaced: {', '.join(sorted(plan.secret_missions))}")
+    lines.append("\nNothing is deleted by an import. Apply?")
+    return "\n".join(lines)
+
+
+def apply_import_plan(plan: ImportPlan) -> bool:
+    """Applies the plan in memory and writes each affected file once. On any failure everything is rolled back.
+
+    In sharded mode only this shard's players are changed and saved here; changes to players of other
+    shards are forwarded to their owners once the local saves have succeeded.
+    """
+    player_data = get_player_data()
+    local_changes = {pid: changes for pid, changes in plan.player_changes.items() if owns_player(pid)}
+    foreign_changes = {pid: changes for pid, changes in plan.player_changes.items() if not owns_player(pid)}
+    sections = [(get_secret_missions_data(), plan.secret_missions, save_secret_missions_data),
+                (get_missions_data(), plan.missions, save_missions_data)]
+    previous_players = {pid: dict(player_data[pid]) for pid in local_changes if pid in player_data}
+    previous_content = [{item_id: container.get(item_id) for item_id in items} for container, items, _ in sections]
+
+    for container, items, _ in sections:
+        container.update(items)
+    for pid, changes in local_changes.items():
+        player_data.setdefault(pid, new_player(pid)).update(changes)
+
+    saved = []
+    for save, needed in [(save_secret_missions_data, bool(plan.secret_missions)),
+                         (save_missions_data, bool(plan.missions)),
+                         (save_player_data, bool(local_changes))]:
+        if not needed:
+            continue
+        if save():
+            saved.append(save)
+            continue
+        logger.error("Import failed while saving, rolling back.")
+        for (container, items, _), previous in zip(sections, previous_content):
+            for item_id, item in previous.items():
+                if item is None:
+                    container.pop(item_id, None)
+                else:
+                    container[item_id] = item
+        for pid in local_changes:
+            if pid in previous_players:
+                player_data[pid] = previous_players[pid]
+            else:
+                player_data.pop(pid, None)
+        for done in saved:
+            done()
+        return False
+    for pid, changes in foreign_changes.items():
+        # The owner creates new players from the full record, so they match a locally imported one
+        forward_player_changes(pid, changes if pid in player_data else {**new_player(pid), **changes})
+    logger.info(f"Import applied: {len(plan.player_changes)} players, {len(plan.missions)} missions, "
+                f"{len(plan.secret_missions)} secret missions.")
+    return True
+
+
+def to_plain(value):
+    """Deep copy of data_manager content as plain dicts and lists (snapshot-backed content included)."""
+    if isinstance(value, Mapping):
+        return {key: to_plain(item) for key, item in value.items()}
+    if isinstance(value, Sequence) and not isinstance(value, (str, bytes)):
+        return [to_plain(item) for item in value]
+    return value
+
+
+def export_json(players: dict, missions: dict, secret_missions: dict) -> bytes:
+    return dumps({"players": list(players.values()), "missions": missions, "secret_missions": secret_missions},
+                 FORMAT_PRETTY)
+
+
+def export_csv(players: dict) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["telegram_user_id"] + PLAYER_FIELDS)
+    for pid, p_info in sorted(players.items()):
+        row = [pid]
+        for field in PLAYER_FIELDS:
+            value = p_info.get(field)
+            row.append("" if value is None else str(value).lower() if isinstance(value, bool) else value)
+        writer.writerow(row)
+    # BOM so spreadsheet apps detect UTF-8 (Cyrillic names)
+    return buffer.getvalue().encode("utf-8-sig")
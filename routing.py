@@ -0,0 +1,112 @@
+import re
+
+from telegram import Update
+from telegram.ext import BaseHandler, CallbackQueryHandler, CommandHandler, MessageHandler, filters
+
+import callback_codec
+
+
+class Router(BaseHandler):
+    """One handler that dispatches commands, reply-keyboard button texts and button actions through dicts.
+
+    PTB checks every registered handler in order until one matches, so a plain text message or a
+    button press pays for every regex in front of its handler. A Router answers with a couple of
+    dict lookups instead (a button press is decoded once, the result is cached for its handler);
+    text prefixes and patterns registered with add_regex are still scanned, and only after the
+    indexed lookups miss.
+
+    Routers do not replace ConversationHandlers, which track per-chat state. Registering a Router
+    where the original handlers stood keeps their precedence relative to the conversations.
+    """
+
+    def __init__(self):
+        # There is no single callback: handle_update calls the one picked by check_update.
+        super().__init__(None)
+        self.commands = {}
+        self.texts = {}
+        self.text_prefixes = []
+        self.actions = {}
+        self.regex_routes = []
+
+    # --- registration ---
+    def add_command(self, command: str, callback) -> None:
+        self.commands[command.lower()] = callback
+
+    def add_text(self, text: str, callback) -> None:
+        """Exact message text, as sent by a reply-keyboard button."""
+        self.texts[text] = callback
+
+    def add_text_prefix(self, text: str, callback) -> None:
+        """Message text starting with `text`, like a `^text` regex; checked in registration order after exact texts."""
+        self.text_prefixes.append((text, callback))
+
+    def add_action(self, action: str, callback) -> None:
+        """Inline button action, as encoded by callback_codec; its arguments are also passed as context.args."""
+        self.actions[action] = callback
+
+    def add_regex(self, pattern: str, callback) -> None:
+        """Fallback for genuinely dynamic message texts; checked in registration order after the indexed routes."""
+        self.regex_routes.append((re.compile(pattern), callback))
+
+    # --- dispatch ---
+    def _route_command(self, message) -> tuple | None:
+        command, *args = message.text.split()
+        name, _, username = command[1:].partition("@")
+        callback = self.commands.get(name.lower())
+        if callback is None:
+            return None
+        if username and username.lower() != message.get_bot().username.lower():
+            return None
+        return callback, args, None
+
+    def check_update(self, update: object) -> tuple | None:
+        """Returns (callback, command args, regex match) or None."""
+        if not isinstance(update, Update):
+            return None
+        query = update.callback_query
+        if query is not None:
+            decoded = callback_codec.decode(query.data)
+            if decoded is None:
+                return None
+            callback = self.actions.get(decoded[0])
+            return (callback, list(decoded[1]), None) if callback is not None else None
+        message = update.message
+        if message is None or not message.text:
+            return None
+        text = message.text
+        if text[0] == "/":
+            return self._route_command(message)
+        callback = self.texts.get(text)
+        if callback is not None:
+            return callback, None, None
+        for prefix, callback in self.text_prefixes:
+            if text.startswith(prefix):
+                return callback, None, None
+        for pattern, callback in self.regex_routes:
+            match = pattern.match(text)
+            if match:
+                return callback, None, match
+        return None
+
+    def collect_additional_context(self, context, update, application, check_result) -> None:
+        _, args, match = check_result
+        context.args = args
+        if match is not None:
+            context.matches = [match]
+
+    async def handle_update(self, update, application, check_result, context):
+        self.collect_additional_context(context, update, application, check_result)
+        return await check_result[0](update, context)
+
+    # --- equivalents ---
+    def as_handlers(self) -> list[BaseHandler]:
+        """The same routes as one ordinary PTB handler each, as they would be registered without a Router."""
+        handlers = [CommandHandler(command, callback) for command, callback in self.commands.items()]
+        handlers += [MessageHandler(filters.Regex(f"^{re.escape(text)}$"), callback)
+                     for text, callback in self.texts.items()]
+        handlers += [MessageHandler(filters.Regex(f"^{re.escape(text)}"), callback)
+                     for text, callback in self.text_prefixes]
+        handlers += [MessageHandler(filters.Regex(pattern), callback) for pattern, callback in self.regex_routes]
+        handlers += [CallbackQueryHandler(callback, pattern=callback_codec.pattern(action))
+                     for action, callback in self.actions.items()]
+        return handlers
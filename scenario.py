@@ -0,0 +1,366 @@
+import heapq
+import logging
+import os
+import time
+from datetime import datetime
+
+from telegram.constants import ParseMode
+from telegram.ext import Application, ContextTypes
+
+from config import *
+from codec import read_json, write_json, DecodeError
+import data_manager
+from data_manager import get_player_data, get_missions_data, get_secret_missions_data, save_player_data
+from utils import notify_players
+
+logger = logging.getLogger(__name__)
+
+# --- SCENARIO FILE FORMAT ---
+# {"events": [
+#   {"id": "blackout", "at": "0:30:00", "action": "broadcast", "target": "active", "sender": "ELLI", "text": "..."},
+#   {"id": "arrest", "after": "blackout", "at": 300, "action": "status", "target": [123], "status": "Arrested",
+#    "if": {"player": 123, "is_active": true}},
+#   {"id": "twist", "at_time": "2026-10-24T21:00:00", "action": "reveal_secret", "target": "all",
+#    "secret_mission_id": "sm_betrayal_protocol"}
+# ]}
+# "at" is an offset (seconds or H:MM:SS) from the scenario start, or from the firing of the
+# "after" event. "at_time" is an absolute local time. Events whose "if" condition does not hold
+# when due are skipped, or re-checked every "retry_every" seconds when that is set.
+# Actions: mission (mission_id), status (status), broadcast (sender, text), reveal_secret (secret_mission_id).
+# Targets: "all", "active", "inactive", a player ID, a list of IDs, or {"status": "<status>"}.
+ACTIONS = {"mission", "status", "broadcast", "reveal_secret"}
+
+
+class Scenario:
+    """Timeline state: the event list, the persisted cursor and one heap of pending due times."""
+
+    def __init__(self):
+        self.events = {}
+        self.children = {}
+        self.started_at = None
+        self.running = False
+        self.fired = {}
+        self.skipped = {}
+        self._heap = []
+        self._job = None
+
+    # --- loading ---
+    def load_events(self, path: str = SCENARIO_FILE) -> list[str]:
+        """Loads and validates the scenario file. Returns a list of problems; nothing is replaced if there are any."""
+        try:
+            document = read_json(path)
+        except FileNotFoundError:
+            return [f"Scenario file {path} not found."]
+        except DecodeError as e:
+            return [f"Invalid JSON in {path}: {e}"]
+        raw_events = document.get("events") if isinstance(document, dict) else None
+        if not isinstance(raw_events, list):
+            return ["Scenario file must be an object with an \"events\" list."]
+
+        errors, events, children = [], {}, {}
+        for number, event in enumerate(raw_events, start=1):
+            event_id = str(event.get("id", f"#{number}")) if isinstance(event, dict) else f"#{number}"
+            problem = _validate_event(event, event_id)
+            if problem is None and event_id in events:
+                problem = "duplicate id"
+            if problem:
+                errors.append(f"Event {event_id}: {problem}.")
+                continue
+            events[event_id] = event
+        for event_id, event in events.items():
+            parent = event.get("after")
+            if parent is not None:
+                if parent not in events:
+                    errors.append(f"Event {event_id}: \"after\" refers to unknown event {parent}.")
+                children.setdefault(parent, []).append(event_id)
+            condition = event.get("if")
+            if isinstance(condition, dict) and "fired" in condition and condition["fired"] not in events:
+                errors.append(f"Event {event_id}: \"if\" refers to unknown event {condition['fired']}.")
+        if errors:
+            return errors
+        self.events, self.children = events, children
+        return []
+
+    def load_state(self) -> None:
+        try:
+            state = read_json(SCENARIO_STATE_FILE)
+        except FileNotFoundError:
+            return
+        except DecodeError:
+            logger.error(f"Error decoding JSON in {SCENARIO_STATE_FILE}, scenario state ignored.")
+            return
+        self.started_at = state.get("started_at")
+        self.running = bool(state.get("running"))
+        self.fired = state.get("fired", {})
+        self.skipped = state.get("skipped", {})
+
+    def save_state(self) -> bool:
+        try:
+            write_json(SCENARIO_STATE_FILE, {"started_at": self.started_at, "running": self.running,
+                                             "fired": self.fired, "skipped": self.skipped}, DATA_FORMAT)
+            return True
+        except Exception as e:
+            logger.error(f"Error saving scenario state: {e}")
+            return False
+
+    # --- timeline ---
+    def _due(self, event_id: str) -> float | None:
+        event = self.events[event_id]
+        if "at_time" in event:
+            return datetime.fromisoformat(event["at_time"]).timestamp()
+        parent = event.get("after")
+        if parent is None:
+            anchor = self.started_at
+        else:
+            anchor = self.fired.get(parent)
+        return None if anchor is None else anchor + _parse_offset(event.get("at", 0))
+
+    def skip(self, event_id: str, when: float, reason: str) -> None:
+        """Marks the event skipped, and every event anchored on it with "after", since they can never fire."""
+        self.skipped[event_id] = when
+        logger.info(f"Scenario event {event_id} skipped, {reason}.")
+        for child_id in self.children.get(event_id, []):
+            if child_id not in self.fired and child_id not in self.skipped:
+                self.skip(child_id, when, f"it runs after {event_id}")
+
+    def _push(self, event_id: str, due: float) -> None:
+        heapq.heappush(self._heap, (due, event_id))
+
+    def rebuild_heap(self) -> None:
+        """Pending events from the cursor: everything not fired or skipped whose anchor is known."""
+        self._heap = []
+        # Dependants of events skipped before they were cascaded (or before an edited file added them)
+        for event_id, event in self.events.items():
+            parent = event.get("after")
+            if parent in self.skipped and event_id not in self.fired and event_id not in self.skipped:
+                self.skip(event_id, self.skipped[parent], f"it runs after {parent}")
+        for event_id in self.events:
+            if event_id in self.fired or event_id in self.skipped:
+                continue
+            due = self._due(event_id)
+            if due is not None:
+                self._heap.append((due, event_id))
+        heapq.heapify(self._heap)
+
+    def pending(self, limit: int = 5) -> list[tuple[float, str]]:
+        return heapq.nsmallest(limit, self._heap)
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._heap)
+
+    # --- scheduling ---
+    def arm(self, application: Application) -> None:
+        """Schedules the single timer job for the earliest pending event."""
+        if self._job is not None:
+            self._job.schedule_removal()
+            self._job = None
+        if not self.running or not self._heap or application.job_queue is None:
+            return
+        delay = max(0.0, self._heap[0][0] - time.time())
+        self._job = application.job_queue.run_once(_scenario_job, when=delay, name="scenario_timer")
+
+    async def run_due(self, context: ContextTypes.DEFAULT_TYPE) -> None:
+        now = time.time()
+        player_changes = False
+        while self.running and self._heap and self._heap[0][0] <= now:
+            _, event_id = heapq.heappop(self._heap)
+            event = self.events.get(event_id)
+            if event is None or event_id in self.fired or event_id in self.skipped:
+                continue
+            try:
+                if not _condition_holds(event.get("if")):
+                    if event.get("retry_every"):
+                        self._push(event_id, now + float(event["retry_every"]))
+                    else:
+                        self.skip(event_id, now, "condition not met")
+                    continue
+                player_changes |= await _execute(event, context)
+            except Exception as e:
+                logger.error(f"Scenario event {event_id} failed: {e}")
+            self.fired[event_id] = now
+            logger.info(f"Scenario event {event_id} ({event['action']}) fired.")
+            for child_id in self.children.get(event_id, []):
+                due = self._due(child_id)
+                if due is not None:
+                    self._push(child_id, due)
+        if player_changes:
+            save_player_data()
+        self.save_state()
+
+
+scenario = Scenario()
+
+
+def _parse_offset(value) -> float:
+    if isinstance(value, (int, float)):
+        return float(value)
+    seconds = 0.0
+    for part in str(value).split(":"):
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+
+def _validate_event(event, event_id: str) -> str | None:
+    if not isinstance(event, dict):
+        return "must be an object"
+    action = event.get("action")
+    if action not in ACTIONS:
+        return f"unknown action {action!r}"
+    try:
+        if "at_time" in event:
+            datetime.fromisoformat(event["at_time"])
+        else:
+            _parse_offset(event.get("at", 0))
+    except (TypeError, ValueError):
+        return "invalid at/at_time"
+    required = {"mission": "mission_id", "status": "status", "broadcast": "text", "reveal_secret": "secret_mission_id"}
+    if not event.get(required[action]):
+        return f"{action} needs {required[action]}"
+    if action == "status" and event["status"] not in VALID_PLAYER_STATUSES:
+        return f"invalid status {event['status']!r}"
+    if action != "broadcast" and "target" not in event:
+        return "needs a target"
+    retry_every = event.get("retry_every")
+    if retry_every is not None and (not isinstance(retry_every, (int, float)) or retry_every <= 0):
+        return "retry_every must be a positive number of seconds"
+    return _validate_condition(event.get("if"))
+
+
+def _validate_condition(condition) -> str | None:
+    if condition is None:
+        return None
+    if not isinstance(condition, dict) or not condition:
+        return "\"if\" must be an object"
+    if "fired" in condition:
+        return None if isinstance(condition["fired"], str) else "\"if\" fired needs an event id"
+    player = condition.get("player")
+    if isinstance(player, bool) or not isinstance(player, (int, str)) or not str(player).isdigit():
+        return "\"if\" needs a numeric player ID"
+    if len(condition) < 2:
+        return "\"if\" needs at least one player field to compare"
+    return None
+
+
+def _resolve_targets(target) -> list[int]:
+    player_data = get_player_data()
+    if target in (None, "all"):
+        return list(player_data)
+    if target == "active":
+        return [pid for pid, p in player_data.items() if p.get("is_active")]
+    if target == "inactive":
+        return [pid for pid, p in player_data.items() if not p.get("is_active")]
+    if isinstance(target, dict) and "status" in target:
+        return [pid for pid, p in player_data.items() if p.get("status") == target["status"]]
+    ids = target if isinstance(target, list) else [target]
+    return [int(pid) for pid in ids if int(pid) in player_data]
+
+
+def _condition_holds(condition) -> bool:
+    if not condition:
+        return True
+    if "fired" in condition:
+        return condition["fired"] in scenario.fired
+    player = get_player_data().get(int(condition.get("player", 0)))
+    if player is None:
+        return False
+    return all(player.get(field) == value for field, value in condition.items() if field != "player")
+
+
+async def _execute(event: dict, context: ContextTypes.DEFAULT_TYPE) -> bool:
+    """Runs one event. Returns True if player_data changed (saved once per batch by the caller)."""
+    action = event["action"]
+    targets = _resolve_targets(event.get("target"))
+    player_data = get_player_data()
+
+    if action == "broadcast":
+        text = f"📢 **{event.get('sender', 'Game Master')}:**\n\n{event['text']}"
+        await notify_players(context.bot, targets, text, parse_mode=ParseMode.MARKDOWN)
+        return False
+
+    field, value = {"mission": ("current_mission_id", event.get("mission_id")),
+                    "status": ("status", event.get("status")),
+                    "reveal_secret": ("secret_mission_id", event.get("secret_mission_id"))}[action]
+    if action == "mission" and value not in get_missions_data():
+        raise ValueError(f"mission {value} not found")
+    if action == "reveal_secret" and value not in get_secret_missions_data():
+        raise ValueError(f"secret mission {value} not found")
+    changed = [pid for pid in targets if player_data[pid].get(field) != value]
+    for pid in changed:
+        player_data[pid][field] = value
+
+    if action == "mission":
+        await notify_players(context.bot, changed, "❗ Your mission has been updated! Check /mission.")
+    elif action == "reveal_secret":
+        sm_title = get_secret_missions_data()[value].get("title", value)
+        await notify_players(context.bot, changed,
+                             f"You have a new secret mission: **{sm_title}**. Check `/character` for details.",
+                             parse_mode=ParseMode.MARKDOWN)
+    return bool(changed)
+
+
+async def _scenario_job(context: ContextTypes.DEFAULT_TYPE) -> None:
+    scenario._job = None
+    await scenario.run_due(context)
+    scenario.arm(context.application)
+
+
+def owns_scenario() -> bool:
+    count = data_manager.shard_count
+    return count == 1 or data_manager.shard_index == data_manager.shard_for(DM_CHAT_ID, count)
+
+
+def setup_scenario(application: Application) -> None:
+    """Resumes a running scenario from its persisted cursor. Overdue events fire right after startup.
+
+    In sharded mode only the worker that owns the GM's ID runs the timeline; /admin_scenario is routed
+    to that same worker, so every other shard leaves the scenario alone.
+    """
+    if not owns_scenario():
+        return
+    scenario.load_state()
+    if not scenario.running:
+        return
+    if application.job_queue is None:
+        logger.warning("Scenario is running but the job queue is unavailable "
+                       "(pip install \"python-telegram-bot[job-queue]\"); timeline paused.")
+        return
+    errors = scenario.load_events()
+    if errors:
+        logger.error(f"Scenario not resumed, {SCENARIO_FILE} is invalid: {'; '.join(errors)}")
+        return
+    scenario.rebuild_heap()
+    scenario.arm(application)
+    logger.info(f"Scenario resumed: {len(scenario.fired)} events done, {scenario.pending_count} pending.")
+
+
+def start_scenario(application: Application) -> list[str]:
+    """(Re)loads the scenario file and starts or resumes the timeline. Returns validation errors, if any."""
+    errors = scenario.load_events()
+    if errors:
+        return errors
+    if application.job_queue is None:
+        return ["The job queue is unavailable (pip install \"python-telegram-bot[job-queue]\")."]
+    if scenario.started_at is None:
+        scenario.started_at = time.time()
+    scenario.running = True
+    scenario.rebuild_heap()
+    scenario.save_state()
+    scenario.arm(application)
+    return []
+
+
+def stop_scenario(application: Application) -> None:
+    scenario.running = False
+    scenario.save_state()
+    scenario.arm(application)
+
+
+def reset_scenario(application: Application) -> None:
+    scenario.started_at = None
+    scenario.running = False
+    scenario.fired, scenario.skipped = {}, {}
+    scenario._heap = []
+    scenario.arm(application)
+    if os.path.exists(SCENARIO_STATE_FILE):
+        os.remove(SCENARIO_STATE_FILE)
@@ -0,0 +1,212 @@
+import asyncio
+import glob
+import logging
+import multiprocessing
+import os
+import re
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import *
+from codec import loads, read_json, write_json, DecodeError
+import data_manager
+
+logger = logging.getLogger(__name__)
+
+CONTROL_PLAYER_UPDATE = "player_update"
+
+
+def extract_user_id(update: dict) -> int:
+    # Every update type carries its originating user as "from" or "user" on its payload object.
+    for key, payload in update.items():
+        if key == "update_id" or not isinstance(payload, dict):
+            continue
+        for user_key in ("from", "user"):
+            user = payload.get(user_key)
+            if isinstance(user, dict) and "id" in user:
+                return int(user["id"])
+        chat = payload.get("chat")
+        if isinstance(chat, dict) and "id" in chat:
+            return int(chat["id"])
+    return 0
+
+
+def split_player_data(count: int) -> None:
+    """Writes one players file per shard from the main players file."""
+    try:
+        players_list = read_json(PLAYERS_FILE)
+    except FileNotFoundError:
+        players_list = []
+    shards = [[] for _ in range(count)]
+    for player in players_list:
+        shards[data_manager.shard_for(int(player['telegram_user_id']), count)].append(player)
+    for index, shard_players in enumerate(shards):
+        write_json(data_manager.shard_players_file(index, count), shard_players, data_manager.DATA_FORMAT)
+    logger.info(f"Split {len(players_list)} players into {count} shards.")
+
+
+def merge_player_data(count: int) -> bool:
+    """Writes the shard files back into the main players file so single-process mode sees the latest data.
+    Returns False, leaving the main file untouched, if any shard file is missing or unreadable."""
+    players_list = []
+    for index in range(count):
+        path = data_manager.shard_players_file(index, count)
+        try:
+            players_list.extend(read_json(path))
+        except (FileNotFoundError, *DecodeError) as e:
+            logger.error(f"Could not read shard file {path}: {e}. Keeping {PLAYERS_FILE} unchanged.")
+            return False
+    write_json(PLAYERS_FILE, players_list, data_manager.DATA_FORMAT)
+    logger.info(f"Merged {count} shards ({len(players_list)} players) into {PLAYERS_FILE}.")
+    return True
+
+
+def recover_shard_files() -> None:
+    """Merges shard files left newer than the main players file (a front process that died before its
+    final merge), so the split at startup does not overwrite them. Exits if they cannot be merged."""
+    base, ext = os.path.splitext(PLAYERS_FILE)
+    try:
+        merged_at = os.path.getmtime(PLAYERS_FILE)
+    except FileNotFoundError:
+        merged_at = float("-inf")
+    counts = {}
+    for path in glob.glob(f"{glob.escape(base)}.shard-*-of-*{glob.escape(ext)}"):
+        match = re.search(r"\.shard-\d+-of-(\d+)" + re.escape(ext) + "$", path)
+        if match:
+            count = int(match.group(1))
+            counts[count] = max(counts.get(count, float("-inf")), os.path.getmtime(path))
+    # Oldest set first, so the newest one is merged last and wins
+    for count, changed_at in sorted(counts.items(), key=lambda item: item[1]):
+        if changed_at <= merged_at:
+            continue
+        logger.warning(f"Shard files for {count} workers are newer than {PLAYERS_FILE}; merging them first.")
+        if not merge_player_data(count):
+            exit(f"Shard files for {count} workers hold unmerged player changes but cannot be read. "
+                 f"Fix or remove them before starting sharded mode.")
+        merged_at = os.path.getmtime(PLAYERS_FILE)
+
+
+# --- WORKER PROCESS ---
+async def _worker_main(index: int, count: int, inboxes: list) -> None:
+    from telegram import Update
+    from telegram.ext import TypeHandler
+    from bot_api import application_builder
+    from handler_registry import register_handlers
+
+    def send_foreign_update(target_shard: int, player_id: int, changes: dict) -> None:
+        inboxes[target_shard].put((CONTROL_PLAYER_UPDATE, player_id, changes))
+
+    async def refresh_foreign_players(update: Update, context) -> None:
+        data_manager.refresh_foreign_players()
+
+    data_manager.configure_sharding(index, count, send_foreign_update)
+    data_manager.load_data()
+
+    application = application_builder().updater(None).build()
+    application.add_handler(TypeHandler(Update, refresh_foreign_players), group=-2)
+    register_handlers(application)
+
+    loop = asyncio.get_running_loop()
+    async with application:
+        # Same hook order as run_polling, which this path replaces: the loop monitor starts in post_init
+        # and the GM digest is flushed in post_stop.
+        if application.post_init is not None:
+            await application.post_init(application)
+        await application.start()
+        logger.info(f"Shard {index} ready.")
+        while True:
+            item = await loop.run_in_executor(None, inboxes[index].get)
+            if item is None:
+                break
+            if isinstance(item, tuple):
+                _, player_id, changes = item
+                data_manager.apply_foreign_update(player_id, changes)
+                continue
+            await application.update_queue.put(Update.de_json(loads(item), application.bot))
+        await application.stop()
+        if application.post_stop is not None:
+            await application.post_stop(application)
+    if application.post_shutdown is not None:
+        await application.post_shutdown(application)
+
+
+def run_worker(index: int, count: int, inboxes: list) -> None:
+    logging.basicConfig(
+        format=f"%(asctime)s - shard {index} - %(name)s - %(levelname)s - %(message)s",
+        level=logging.INFO
+    )
+    try:
+        asyncio.run(_worker_main(index, count, inboxes))
+    except KeyboardInterrupt:
+        pass
+
+
+# --- FRONT PROCESS ---
+class _UpdateRequestHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        server = self.server
+        if server.secret_token and self.headers.get("X-Telegram-Bot-Api-Secret-Token") != server.secret_token:
+            self.send_response(403)
+            self.end_headers()
+            return
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        try:
+            user_id = extract_user_id(loads(body))
+        except DecodeError:
+            self.send_response(400)
+            self.end_headers()
+            return
+        server.inboxes[data_manager.shard_for(user_id, len(server.inboxes))].put(body)
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+async def _set_webhook(url: str, secret_token: str | None) -> None:
+    from telegram import Bot, Update
+    async with Bot(BOT_TOKEN) as bot:
+        await bot.set_webhook(url=url, secret_token=secret_token, allowed_updates=Update.ALL_TYPES)
+
+
+def run_front(worker_count: int, url: str, listen: str, port: int, secret_token: str | None) -> None:
+    """Receives webhook updates and routes each one to the worker that owns its user."""
+    recover_shard_files()
+    split_player_data(worker_count)
+    if USE_CONTENT_SNAPSHOT:
+        # Compile once here so every worker maps the same file instead of parsing the JSON itself.
+        from content_store import ensure_snapshot
+        ensure_snapshot()
+
+    mp_context = multiprocessing.get_context("spawn")
+    inboxes = [mp_context.Queue() for _ in range(worker_count)]
+    workers = [mp_context.Process(target=run_worker, args=(index, worker_count, inboxes), name=f"shard-{index}")
+               for index in range(worker_count)]
+    for worker in workers:
+        worker.start()
+
+    asyncio.run(_set_webhook(url, secret_token))
+    server = ThreadingHTTPServer((listen, port), _UpdateRequestHandler)
+    server.inboxes = inboxes
+    server.secret_token = secret_token
+    logger.info(f"Front process listening on {listen}:{port}, routing to {worker_count} workers.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        for inbox in inboxes:
+            inbox.put(None)
+        for worker in workers:
+            worker.join(timeout=30)
+        # A worker still running could save after the merge; stop it before reading the shard files
+        for worker in workers:
+            if worker.is_alive():
+                logger.warning(f"{worker.name} did not stop within 30s; terminating it.")
+                worker.terminate()
+                worker.join(timeout=10)
+        if any(worker.is_alive() for worker in workers):
+            logger.error("Some workers are still running; not merging. The shard files are merged on the next start.")
+        else:
+            merge_player_data(worker_count)
@@ -0,0 +1,75 @@
+import base64
+
+import pytest
+
+import callback_codec
+from callback_codec import encode, decode, pattern, CallbackDataError
+
+
+@pytest.fixture(autouse=True)
+def fresh_tables(monkeypatch):
+    monkeypatch.setattr(callback_codec, "_refs", {})
+    monkeypatch.setattr(callback_codec, "_decoded", {})
+    monkeypatch.setattr(callback_codec, "_vocabularies", [])
+
+
+def _tamper(data: str) -> str:
+    raw = bytearray(base64.urlsafe_b64decode(data + "=" * (-len(data) % 4)))
+    raw[1] ^= 0x01
+    return base64.urlsafe_b64encode(bytes(raw)).rstrip(b"=").decode("ascii")
+
+
+@pytest.mark.parametrize("action, args", [
+    ("lore_menu", ()),
+    ("lore", ("mars_uicm", "factions_mars")),
+    ("setstatus_set", (123456789, "Arrested")),
+    ("bulk_page", (-3,)),
+    ("roster", (None, 0, "марс")),
+    ("dmselect", (2 ** 40,)),
+])
+def test_round_trip(action, args):
+    assert decode(encode(action, *args)) == (action, args)
+
+
+def test_encoded_data_fits_telegram_limit():
+    data = encode("lore", *[f"section_name_{index}" for index in range(8)])
+    assert len(data) <= 64
+    assert decode(data)[1] == tuple(f"section_name_{index}" for index in range(8))
+
+
+def test_too_many_arguments_raise():
+    with pytest.raises(CallbackDataError):
+        encode("lore", *[f"section_name_{index}" for index in range(12)])
+
+
+def test_tampered_and_foreign_data_rejected():
+    data = encode("setstatus_set", 42, "Active")
+    assert decode(_tamper(data)) is None
+    assert decode("setstatus_42_Active") is None
+    assert decode("") is None
+    assert decode(None) is None
+
+
+def test_refs_resolve_after_restart_through_vocabulary():
+    names = [f"a_rather_long_section_name_{index}" for index in range(6)]
+    data = encode("lore", *names)
+    callback_codec._refs.clear()
+    assert decode(data) is None
+    callback_codec._decoded.clear()
+    callback_codec.register_vocabulary(lambda: names)
+    assert decode(data) == ("lore", tuple(names))
+
+
+def test_refs_table_is_bounded(monkeypatch):
+    monkeypatch.setattr(callback_codec, "_REFS_LIMIT", 10)
+    for index in range(50):
+        encode("lore", *[f"a_rather_long_section_name_{index}_{part}" for part in range(6)])
+    assert len(callback_codec._refs) <= 10
+
+
+def test_pattern_matches_only_its_actions():
+    matches = pattern("activate", "deactivate")
+    assert matches(encode("activate", 1))
+    assert not matches(encode("setstatus", 1))
+    assert not matches("activate_1")
+    assert not matches(None)
@@ -0,0 +1,106 @@
+import json
+
+import pytest
+
+import comm_policy
+from comm_policy import (compile_policy, load_policy, resolve, DEFAULT_POLICY, ACTION_DELIVER, ACTION_INTERCEPT,
+                         ACTION_DROP, ACTION_REDIRECT)
+from config import STATUS_ACTIVE_ON_MISSION, STATUS_ARRESTED, STATUS_HACKED, STATUS_DEAD, STATUS_TRAITOR
+
+
+@pytest.fixture(autouse=True)
+def built_in_policy(monkeypatch, tmp_path):
+    monkeypatch.setattr(comm_policy, "COMM_POLICY_FILE", str(tmp_path / "comm_policy.json"))
+    comm_policy._use_default_policy()
+    yield
+    comm_policy._use_default_policy()
+
+
+def _write_policy(rules) -> None:
+    with open(comm_policy.COMM_POLICY_FILE, "w", encoding="utf-8") as f:
+        f.write(rules if isinstance(rules, str) else json.dumps(rules))
+
+
+def _first_match(rules, sender, recipient_type, recipient_status):
+    # Reference semantics: the first rule whose given keys all match
+    for rule in rules:
+        if rule.get("sender", "*") not in ("*", sender):
+            continue
+        if rule.get("recipient", "*") not in ("*", recipient_type):
+            continue
+        if rule.get("recipient_status", "*") not in ("*", recipient_status):
+            continue
+        return rule
+    return None
+
+
+def test_default_policy_intercepts_by_sender_status():
+    assert resolve(STATUS_ARRESTED, "npc", None)["action"] == ACTION_INTERCEPT
+    assert resolve(STATUS_HACKED, "player", STATUS_ACTIVE_ON_MISSION)["action"] == ACTION_INTERCEPT
+    assert resolve(STATUS_DEAD, "player", STATUS_DEAD)["action"] == ACTION_INTERCEPT
+    assert resolve(STATUS_ACTIVE_ON_MISSION, "npc", None)["action"] == ACTION_DELIVER
+    assert resolve("Some unknown status", "player", "Another one")["action"] == ACTION_DELIVER
+
+
+def test_table_matches_first_matching_rule():
+    rules = [
+        {"sender": STATUS_TRAITOR, "recipient": "npc", "action": ACTION_REDIRECT, "redirect_to": "ELLI"},
+        {"recipient": "player", "recipient_status": STATUS_DEAD, "action": ACTION_DROP, "reply": "..."},
+        {"sender": STATUS_TRAITOR, "action": ACTION_INTERCEPT},
+        {"action": ACTION_DELIVER},
+    ]
+    _write_policy(rules)
+    assert load_policy() == []
+    for sender in [*comm_policy.VALID_PLAYER_STATUSES, "unknown"]:
+        for recipient_type, recipient_status in [("npc", None), *(("player", status) for status in
+                                                                   [*comm_policy.VALID_PLAYER_STATUSES, "unknown"])]:
+            expected = _first_match(rules, sender, recipient_type, recipient_status)
+            assert resolve(sender, recipient_type, recipient_status) == expected
+
+
+def test_hits_are_counted_per_rule():
+    resolve(STATUS_ARRESTED, "npc", None)
+    resolve(STATUS_ARRESTED, "npc", None)
+    resolve(STATUS_ACTIVE_ON_MISSION, "npc", None)
+    assert comm_policy.hits == [2, 0, 0, 1]
+
+
+def test_policy_without_catch_all_is_rejected():
+    table, errors = compile_policy([{"sender": STATUS_ARRESTED, "action": ACTION_DROP}])
+    assert table == [] and errors
+
+
+@pytest.mark.parametrize("rules", [
+    [{"action": "explode"}],
+    [{"sender": "Pirate", "action": ACTION_DELIVER}],
+    [{"action": ACTION_INTERCEPT, "gm_text": "{unknown_field}"}],
+    [{"action": "delay"}, {"action": ACTION_DELIVER}],
+    "not a list",
+])
+def test_invalid_rules_are_rejected(rules):
+    assert compile_policy(rules)[1]
+
+
+def test_invalid_file_keeps_the_built_in_policy():
+    _write_policy("{not json")
+    assert load_policy()
+    assert comm_policy.policy_source == "built-in"
+    assert resolve(STATUS_ARRESTED, "npc", None)["action"] == ACTION_INTERCEPT
+
+    _write_policy([{"sender": STATUS_ARRESTED, "action": ACTION_DROP}])
+    assert load_policy()
+    assert resolve(STATUS_ACTIVE_ON_MISSION, "player", STATUS_ACTIVE_ON_MISSION)["action"] == ACTION_DELIVER
+
+
+def test_invalid_reload_keeps_the_previous_file_policy():
+    _write_policy([{"action": ACTION_DROP}])
+    assert load_policy() == []
+    _write_policy([{"action": "explode"}])
+    assert load_policy()
+    assert resolve(STATUS_ARRESTED, "npc", None)["action"] == ACTION_DROP
+
+
+def test_missing_file_loads_the_built_in_policy():
+    assert load_policy() == []
+    assert comm_policy.policy_source == "built-in"
+    assert comm_policy._rules is DEFAULT_POLICY
@@ -0,0 +1,117 @@
+import json
+import os
+
+import pytest
+
+import content_store
+from content_store import ContentStore, compile_snapshot, ensure_snapshot
+
+SECTIONS = {
+    "lore": {
+        "introduction": "Добро пожаловать",
+        "image_url": "./assets/lore/intro.png",
+        "mars_uicm": {"title": "Mars", "sections": {"factions_mars": {"title": "Фракции", "text": "..."},
+                                                     "Zulu": {"title": "upper case sorts first"},
+                                                     "émigrés": {"title": "non-ASCII sorts last"}}},
+    },
+    "missions": {
+        "default_mission": {"title": "Wait", "reward": 10, "weight": 0.5, "secret": False, "target": None,
+                            "steps": ["arrive", {"step": "report"}, 3]},
+    },
+    "secret_missions": {},
+}
+
+
+def to_plain(value):
+    if isinstance(value, content_store.ContentNode):
+        return {key: to_plain(value[key]) for key in value}
+    if isinstance(value, content_store.ContentList):
+        return [to_plain(item) for item in value]
+    return value
+
+
+@pytest.fixture
+def store(tmp_path):
+    path = str(tmp_path / "content.snapshot")
+    compile_snapshot(SECTIONS, path)
+    opened = ContentStore(path)
+    yield opened
+    opened.close()
+
+
+def test_snapshot_reads_back_as_the_source_data(store):
+    for name, data in SECTIONS.items():
+        assert to_plain(store.root(name)) == data
+
+
+def test_lookup_bisects_every_key(store):
+    # Keys are sorted by UTF-8 bytes, so upper case, lower case and non-ASCII keys must all be found
+    sections = store.root("lore")["mars_uicm"]["sections"]
+    assert sections["Zulu"]["title"] == "upper case sorts first"
+    assert sections["émigrés"]["title"] == "non-ASCII sorts last"
+    assert store.lookup("lore/mars_uicm/sections/factions_mars/title") == "Фракции"
+    assert store.lookup("lore/mars_uicm/sections/nowhere", None) is None
+    assert store.lookup("", None) is None
+    assert store.lookup("￿", None) is None
+
+
+def test_missing_keys_behave_like_a_dict(store):
+    mission = store.root("missions")["default_mission"]
+    assert "title" in mission and "nope" not in mission
+    assert mission.get("nope", "fallback") == "fallback"
+    with pytest.raises(KeyError):
+        mission["nope"]
+
+
+def test_lists(store):
+    steps = store.root("missions")["default_mission"]["steps"]
+    assert len(steps) == 3
+    assert steps[-1] == 3
+    assert to_plain(steps[1]) == {"step": "report"}
+    assert steps[0:2][0] == "arrive"
+    with pytest.raises(IndexError):
+        steps[3]
+
+
+def test_overlay_shadows_and_extends_the_snapshot(store):
+    node = store.root("lore")["mars_uicm"]
+    node["image_file_id"] = "cached-id"
+    node["title"] = "Mars (edited)"
+    assert node["image_file_id"] == "cached-id"
+    assert node.get("title") == "Mars (edited)"
+    assert list(node) == ["title", "sections", "image_file_id"]
+    assert len(node) == 3
+    # Only the overlay changed; a fresh mapping of the file does not see it
+    fresh = ContentStore(store.path)
+    assert "image_file_id" not in fresh.root("lore")["mars_uicm"]
+    fresh.close()
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "not_a_snapshot"
+    path.write_bytes(b"JSON" + bytes(20))
+    with pytest.raises(ValueError):
+        ContentStore(str(path))
+
+
+def test_ensure_snapshot_recompiles_when_sources_change(tmp_path, monkeypatch):
+    sources = {}
+    for name, data in SECTIONS.items():
+        sources[name] = str(tmp_path / f"{name}.json")
+        with open(sources[name], "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+    monkeypatch.setattr(content_store, "SNAPSHOT_SOURCES", sources)
+    path = str(tmp_path / "content.snapshot")
+
+    ensure_snapshot(path)
+    compiled_at = os.stat(path).st_mtime_ns
+    ensure_snapshot(path)
+    assert os.stat(path).st_mtime_ns == compiled_at
+
+    with open(sources["missions"], "w", encoding="utf-8") as f:
+        json.dump({"new_mission": {"title": "New"}}, f)
+    os.utime(sources["missions"], ns=(compiled_at + 10 ** 9, compiled_at + 10 ** 9))
+    ensure_snapshot(path)
+    store = ContentStore(path)
+    assert to_plain(store.root("missions")) == {"new_mission": {"title": "New"}}
+    store.close()
@@ -0,0 +1,105 @@
+import warnings
+
+import pytest
+from telegram import Update, User
+from telegram.ext import ApplicationBuilder, ConversationHandler
+
+from callback_codec import encode
+from routing import Router
+
+USER = {"id": 7, "is_bot": False, "first_name": "Tester"}
+CHAT = {"id": 7, "type": "private"}
+
+
+def make_update(bot, text: str | None = None, data: str | None = None) -> Update:
+    if data is not None:
+        message = {"message_id": 1, "date": 0, "chat": CHAT, "text": "menu"}
+        payload = {"callback_query": {"id": "1", "from": USER, "chat_instance": "1", "data": data, "message": message}}
+    else:
+        message = {"message_id": 1, "date": 0, "chat": CHAT, "from": USER, "text": text}
+        if text.startswith("/"):
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+        payload = {"message": message}
+    return Update.de_json({"update_id": 1, **payload}, bot)
+
+
+def winner(handlers, update):
+    """What process_update picks within a group: the callback of the first handler whose check passes."""
+    for handler in handlers:
+        check = handler.check_update(update)
+        if check is None or check is False:
+            continue
+        if isinstance(handler, Router):
+            return check[0]
+        # A conversation is one handler in both setups; compare the handler itself
+        return handler if isinstance(handler, ConversationHandler) else handler.callback
+    return None
+
+
+@pytest.fixture(scope="module")
+def registry():
+    from handler_registry import register_handlers
+
+    application = ApplicationBuilder().token("1:test").build()
+    # Offline stand-in for getMe, needed by command parsing
+    application.bot._bot_user = User(id=1, first_name="Test", is_bot=True, username="test_bot")
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        register_handlers(application)
+    routed = [handler for group in sorted(application.handlers) if group >= 0
+              for handler in application.handlers[group]]
+    legacy = [expanded for handler in routed
+              for expanded in (handler.as_handlers() if isinstance(handler, Router) else [handler])]
+    return application.bot, routed, legacy
+
+
+SAMPLES = [
+    {"text": "📚 Lore"}, {"text": "👤 My character"}, {"text": "🎯 My mission"},
+    # Reply-keyboard texts were matched by "^text" before the routers; decorated variants still route
+    {"text": "📚 Lore (2 new)"}, {"text": "🎯 My mission ✅"}, {"text": "⚙️ Admin Panel"},
+    {"text": "⬅️ Back to Main Menu now"}, {"text": "✉️ Send a message to ELLI"},
+    {"text": "List Players"}, {"text": "List Players please"}, {"text": "Manage Recipients"},
+    {"text": "/start"}, {"text": "/lore"}, {"text": "/LORE"}, {"text": "/lore@test_bot"}, {"text": "/lore@other_bot"},
+    {"text": "/lore_search mars"}, {"text": "/admin_policy reload"}, {"text": "/admin_scenario status"},
+    {"text": "/unknown"}, {"text": "hello there"}, {"text": "back"},
+    {"data": encode("lore", "introduction")}, {"data": encode("lore_menu")}, {"data": encode("roster", 0, 3)},
+    {"data": encode("activate", 5)}, {"data": encode("bulk_page", 1)}, {"data": "lore_introduction"},
+]
+
+
+@pytest.mark.parametrize("sample", SAMPLES, ids=lambda sample: sample.get("text") or "callback")
+def test_routers_pick_the_same_handler_as_one_handler_per_route(registry, sample):
+    bot, routed, legacy = registry
+    update = make_update(bot, **sample)
+    assert winner(routed, update) is winner(legacy, update)
+
+
+def test_menu_texts_match_by_prefix(registry):
+    from player_handlers import lore_command, mission_command
+
+    bot, routed, _ = registry
+    assert winner(routed, make_update(bot, text="📚 Lore (2 new)")) is lore_command
+    assert winner(routed, make_update(bot, text="🎯 My mission")) is mission_command
+    assert winner(routed, make_update(bot, text="Lore")) is None
+
+
+def test_router_lookup_order():
+    router = Router()
+    router.add_text("Status", "exact")
+    router.add_text_prefix("Stat", "prefix")
+    router.add_regex(r"^S(\w+)", "regex")
+    bot = ApplicationBuilder().token("1:test").build().bot
+    assert router.check_update(make_update(bot, text="Status"))[0] == "exact"
+    assert router.check_update(make_update(bot, text="Statistics"))[0] == "prefix"
+    check = router.check_update(make_update(bot, text="Sigma"))
+    assert check[0] == "regex" and check[2].group(1) == "igma"
+    assert router.check_update(make_update(bot, text="other")) is None
+
+
+def test_router_passes_action_arguments():
+    router = Router()
+    router.add_action("setstatus_set", "set")
+    bot = ApplicationBuilder().token("1:test").build().bot
+    callback, args, _ = router.check_update(make_update(bot, data=encode("setstatus_set", 42, "Dead")))
+    assert callback == "set" and args == [42, "Dead"]
+    assert router.check_update(make_update(bot, data=encode("setstatus", 42))) is None
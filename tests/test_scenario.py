@@ -0,0 +1,154 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import data_manager
+import scenario as scenario_module
+from scenario import Scenario
+
+
+class RecordingBot:
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.sent.append((chat_id, text))
+
+
+@pytest.fixture
+def timeline(monkeypatch, tmp_path):
+    players = {1: {"telegram_user_id": 1, "is_active": True, "status": "Active (on mission)"},
+               2: {"telegram_user_id": 2, "is_active": False, "status": "Undefined"}}
+    monkeypatch.setattr(data_manager, "player_data", players)
+    monkeypatch.setattr(scenario_module, "save_player_data", lambda: True)
+    monkeypatch.setattr(scenario_module, "get_missions_data", lambda: {"m1": {"title": "M1"}})
+    monkeypatch.setattr(scenario_module, "SCENARIO_STATE_FILE", str(tmp_path / "scenario_state.json"))
+    fresh = Scenario()
+    monkeypatch.setattr(scenario_module, "scenario", fresh)
+
+    def load(events) -> list[str]:
+        path = tmp_path / "scenario.json"
+        path.write_text(json.dumps({"events": events}), encoding="utf-8")
+        return fresh.load_events(str(path))
+
+    fresh.load = load
+    fresh.players = players
+    return fresh
+
+
+def run(timeline: Scenario, started_ago: float = 10.0) -> RecordingBot:
+    bot = RecordingBot()
+    timeline.started_at = time.time() - started_ago
+    timeline.running = True
+    timeline.rebuild_heap()
+    asyncio.run(timeline.run_due(SimpleNamespace(bot=bot)))
+    return bot
+
+
+def broadcast(event_id: str, **extra) -> dict:
+    return {"id": event_id, "action": "broadcast", "text": event_id, "at": 0, **extra}
+
+
+@pytest.mark.parametrize("event, problem", [
+    ({"id": "a", "action": "explode"}, "unknown action"),
+    ({"id": "a", "action": "status", "status": "Sleeping", "target": "all"}, "invalid status"),
+    ({"id": "a", "action": "mission", "mission_id": "m1"}, "needs a target"),
+    (broadcast("a", at="soon"), "invalid at"),
+    (broadcast("a", **{"if": "player 1 is active"}), "must be an object"),
+    (broadcast("a", **{"if": {"player": "one", "is_active": True}}), "numeric player ID"),
+    (broadcast("a", **{"if": {"player": 1}}), "at least one player field"),
+    (broadcast("a", **{"if": {"fired": "nowhere"}}), "unknown event"),
+    (broadcast("a", after="nowhere"), "unknown event"),
+    (broadcast("a", retry_every="often"), "retry_every"),
+])
+def test_invalid_events_are_rejected(timeline, event, problem):
+    errors = timeline.load([event])
+    assert len(errors) == 1 and problem in errors[0]
+    assert timeline.events == {}
+
+
+def test_after_chain_fires_in_order(timeline):
+    assert timeline.load([broadcast("c", after="b", at=0), broadcast("a"), broadcast("b", after="a", at=0)]) == []
+    bot = run(timeline)
+    assert [text.rsplit("\n", 1)[-1] for chat_id, text in bot.sent if chat_id == 1] == ["a", "b", "c"]
+    assert list(timeline.fired) == ["a", "b", "c"]
+    assert timeline.pending_count == 0
+
+
+def test_child_waits_for_its_offset(timeline):
+    timeline.load([broadcast("a"), broadcast("b", after="a", at=3600)])
+    run(timeline)
+    assert list(timeline.fired) == ["a"]
+    assert [event_id for _, event_id in timeline.pending()] == ["b"]
+
+
+def test_condition_gates_the_event(timeline):
+    timeline.load([
+        {"id": "jail", "action": "status", "status": "Arrested", "target": 1, "at": 0,
+         "if": {"player": 1, "is_active": True}},
+        {"id": "jail_inactive", "action": "status", "status": "Arrested", "target": 2, "at": 0,
+         "if": {"player": 2, "is_active": True}},
+        broadcast("after_jail", at=1, **{"if": {"fired": "jail"}}),
+    ])
+    run(timeline)
+    assert timeline.players[1]["status"] == "Arrested"
+    assert timeline.players[2]["status"] == "Undefined"
+    assert set(timeline.fired) == {"jail", "after_jail"}
+    assert set(timeline.skipped) == {"jail_inactive"}
+
+
+def test_skipping_an_event_skips_its_dependants(timeline):
+    timeline.load([broadcast("a", **{"if": {"player": 2, "is_active": True}}),
+                   broadcast("b", after="a"), broadcast("c", after="b"), broadcast("d")])
+    bot = run(timeline)
+    assert set(timeline.skipped) == {"a", "b", "c"}
+    assert list(timeline.fired) == ["d"]
+    assert timeline.pending_count == 0
+    assert {text for _, text in bot.sent} == {"📢 **Game Master:**\n\nd"}
+
+
+def test_failed_condition_is_retried(timeline):
+    timeline.load([broadcast("a", retry_every=60, **{"if": {"player": 2, "is_active": True}})])
+    run(timeline)
+    assert not timeline.fired and not timeline.skipped
+    assert [event_id for _, event_id in timeline.pending()] == ["a"]
+    timeline.players[2]["is_active"] = True
+    timeline._heap = [(time.time() - 1, "a")]
+    asyncio.run(timeline.run_due(SimpleNamespace(bot=RecordingBot())))
+    assert "a" in timeline.fired
+
+
+def test_a_failing_event_does_not_stop_the_batch(timeline, monkeypatch):
+    def broken_condition(condition):
+        if condition:
+            raise RuntimeError("player data unavailable")
+        return True
+
+    monkeypatch.setattr(scenario_module, "_condition_holds", broken_condition)
+    timeline.load([broadcast("a", **{"if": {"player": 1, "is_active": True}}), broadcast("b", at=1)])
+    run(timeline)
+    assert "b" in timeline.fired
+    with open(scenario_module.SCENARIO_STATE_FILE, encoding="utf-8") as f:
+        assert set(json.load(f)["fired"]) == set(timeline.fired)
+
+
+def test_state_resumes_without_refiring(timeline):
+    timeline.load([broadcast("a"), broadcast("b", after="a", at=3600)])
+    run(timeline)
+    resumed = Scenario()
+    resumed.events, resumed.children = timeline.events, timeline.children
+    resumed.load_state()
+    resumed.rebuild_heap()
+    assert resumed.running and list(resumed.fired) == ["a"]
+    assert [event_id for _, event_id in resumed.pending()] == ["b"]
+
+
+def test_dependants_of_events_skipped_before_a_restart_are_skipped(timeline):
+    timeline.load([broadcast("a"), broadcast("b", after="a")])
+    timeline.skipped = {"a": 1.0}
+    timeline.rebuild_heap()
+    assert timeline.skipped == {"a": 1.0, "b": 1.0}
+    assert timeline.pending_count == 0
@@ -1,6 +1,11 @@
-from config import DM_CHAT_ID, STATUS_UNDEFINED
+import asyncio
+import importlib
+import logging
+from config import DM_CHAT_ID, STATUS_UNDEFINED, NOTIFY_CONCURRENCY
 from data_manager import get_player_data
 
+logger = logging.getLogger(__name__)
+
 def is_admin(user_id: int) -> bool:
     return user_id == DM_CHAT_ID
 
@@ -14,4 +19,35 @@ def get_player_status(user_id: int) -> str:
 def is_player_active(user_id: int) -> bool:
     player_data = get_player_data()
     player = player_data.get(user_id)
-    return player.get("is_active", False) if player else False
\ No newline at end of file
+    return player.get("is_active", False) if player else False
+
+def lazy_handler(module_name: str, func_name: str):
+    """Returns a handler that imports `module_name` on its first call and then delegates to `func_name`."""
+    target = None
+
+    async def handler(update, context):
+        nonlocal target
+        if target is None:
+            target = getattr(importlib.import_module(module_name), func_name)
+        return await target(update, context)
+
+    handler.__name__ = func_name
+    handler.__qualname__ = func_name
+    return handler
+
+
+async def notify_players(bot, player_ids: list[int], text: str, **kwargs) -> int:
+    """Sends `text` to every player concurrently (at most NOTIFY_CONCURRENCY at a time). Returns the number delivered."""
+    semaphore = asyncio.Semaphore(NOTIFY_CONCURRENCY)
+
+    async def notify(pid: int) -> bool:
+        async with semaphore:
+            try:
+                await bot.send_message(pid, text, **kwargs)
+                return True
+            except Exception as e:
+                logger.warning(f"Failed to notify player {pid}: {e}")
+                return False
+
+    results = await asyncio.gather(*(notify(pid) for pid in player_ids))
+    return sum(results)